@@ -3,6 +3,9 @@ import json
 from src.core.hybrid_moderator import HybridModerator
 from src.core.database import ContentModerationDB
 from src.utils.notifications import NotificationSystem
+from src.utils.lru_cache import LRUCache, SQLiteCacheBackend
+from src.utils.alternatives_store import AlternativesStore
+from src.rag_system.embedding_cache import make_embedding_cache
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
@@ -22,7 +25,29 @@ def run_app():
     # Initialize components
     @st.cache_resource
     def init_components():
-        return HybridModerator(), ContentModerationDB(), NotificationSystem()
+        # Verdicts for repeated messages are kept on disk so they survive restarts
+        verdict_cache = LRUCache(
+            max_size=10000,
+            ttl_seconds=24 * 3600,
+            backend=SQLiteCacheBackend("data/database/verdict_cache.db", table="verdicts")
+        )
+        # AI alternatives are memoized on disk, prewarmed from the rule tables and topped up in the background
+        alternatives_store = AlternativesStore("data/database/alternatives_cache.db")
+        # Query embeddings are shared on disk so every worker reuses the others' encodings
+        embedding_cache = make_embedding_cache("data/database/embedding_cache.db")
+
+        def start_alternatives_refresh(ready_moderator):
+            if ready_moderator.knowledge_injection.ollama_available:
+                alternatives_store.start_background_refresh(ready_moderator.knowledge_injection.context_analyzer.regenerate_alternatives)
+
+        # Models and stores load in the background; keyword checks serve requests until they are warm
+        moderator = HybridModerator(verdict_cache=verdict_cache, alternatives_store=alternatives_store,
+                                    rag_options={'embedding_cache': embedding_cache},
+                                    lazy=True, on_ready=start_alternatives_refresh)
+        moderator.knowledge_injection.prewarm_alternatives()
+        # Clean messages are group-committed off the request path; flagged ones still return their id at once
+        db = ContentModerationDB(write_behind=True)
+        return moderator, db, NotificationSystem(db)
 
     moderator, db, notifications = init_components()
 
@@ -70,6 +95,8 @@ def run_app():
 
     # Display current user
     st.sidebar.write(f"**Current User:** {st.session_state.user_id}")
+    if not moderator.is_ready():
+        st.sidebar.info("⏳ AI models are warming up - using keyword checks for now")
     if "show_modal" not in st.session_state:
         st.session_state.show_modal = False
     if "modal_data" not in st.session_state:
@@ -145,8 +172,8 @@ def run_app():
                     st.error("🚨 Message blocked - inappropriate content detected!")
                     
                 else:
-                    # Store clean message in database
-                    db.store_clean_message(st.session_state.user_id, user_input)
+                    # Store clean message in database (buffered; nothing here needs its id)
+                    db.submit_clean_message(st.session_state.user_id, user_input)
                     
                     # Add to chat history if not flagged (message IS delivered)
                     st.session_state.messages.append(("You", user_input))
@@ -349,7 +376,21 @@ def run_app():
         
         # Show pending challenges
         st.subheader("Pending Challenges")
-        challenges = db.get_pending_challenges()
+        # Keyset cursors of the pages visited so far; the last one is the current page
+        if "challenge_cursors" not in st.session_state:
+            st.session_state.challenge_cursors = [None]
+        page = db.get_pending_challenges_page(limit=20, cursor=st.session_state.challenge_cursors[-1])
+        challenges = page['items']
+        
+        nav_newer, nav_older = st.columns(2)
+        with nav_newer:
+            if len(st.session_state.challenge_cursors) > 1 and st.button("⬅️ Newer challenges"):
+                st.session_state.challenge_cursors.pop()
+                st.rerun()
+        with nav_older:
+            if page['next_cursor'] and st.button("Older challenges ➡️"):
+                st.session_state.challenge_cursors.append(page['next_cursor'])
+                st.rerun()
         
         if challenges:
             for challenge in challenges:
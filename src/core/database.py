@@ -1,247 +1,371 @@
+import atexit
 import sqlite3
 import json
-import threading
-from datetime import datetime
-from typing import List, Dict, Optional
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from contextlib import contextmanager
+from .migrations import USER_MESSAGE_STATS_FROM_MESSAGES, check_query_plans, migrate
+from .sqlite_pool import ReadConnectionPool, SingleWriter, WriteBehindBuffer, connect
+
+# Keyset cursor: (timestamp, id) of the last row of a page; the next page starts strictly after it
+Cursor = Tuple[str, int]
+
+def _utc_timestamp() -> str:
+    """Arrival time in SQLite's CURRENT_TIMESTAMP format, so buffered rows keep it"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
 
 class ContentModerationDB:
-    def __init__(self, db_path: str = "data/database/content_moderation.db"):
+    def __init__(self, db_path: str = "data/database/content_moderation.db", read_pool_size: int = 4,
+                 write_behind: bool = False, flush_rows: int = 256, flush_interval_ms: float = 50.0):
+        """
+        write_behind buffers message inserts and group-commits them with
+        executemany every flush_rows rows or flush_interval_ms, whichever
+        comes first. submit_* calls return a future at once; store_* calls
+        commit their row immediately, together with whatever is buffered,
+        and return its id as before.
+        Buffered rows become visible to reads when their group commits, and
+        close(), also registered with atexit, writes out whatever is left.
+        """
         self.db_path = db_path
-        self._lock = threading.Lock()
+        # One writer thread owns the only write connection; reads borrow long-lived pooled connections
+        self._writer = SingleWriter(db_path)
+        self._read_pool = ReadConnectionPool(db_path, size=read_pool_size)
+        self._write_behind = None
         self.init_database()
+        
+        if write_behind:
+            self._write_behind = WriteBehindBuffer(self._writer, self._insert_batch, flush_rows, flush_interval_ms)
+            atexit.register(self.close)
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections with proper cleanup"""
-        conn = None
+        """Borrow a pooled read-only connection; writes go through _write"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
-            conn.execute("PRAGMA journal_mode=WAL")  # Use WAL mode for better concurrency
-            conn.execute("PRAGMA synchronous=NORMAL")  # Faster writes
-            conn.execute("PRAGMA cache_size=10000")  # Larger cache
-            conn.execute("PRAGMA temp_store=MEMORY")  # Use memory for temp tables
-            yield conn
+            with self._read_pool.connection() as conn:
+                yield conn
         except Exception as e:
             print(f"Database connection error: {e}")
-            if conn:
-                conn.rollback()
             raise
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except Exception as e:
-                    print(f"Error closing connection: {e}")
+    
+    def _write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(conn) on the writer thread in one transaction and wait for its commit"""
+        if self._write_behind is not None:
+            # Buffered inserts go first so updates never overtake them
+            self._write_behind.dispatch()
+        return self._writer.run(fn)
+    
+    def flush(self):
+        """Commit any buffered inserts now"""
+        if self._write_behind is not None:
+            self._write_behind.flush()
+    
+    def get_write_stats(self) -> Dict:
+        """Group commit counters (enabled False without write_behind)"""
+        if self._write_behind is None:
+            return {'enabled': False}
+        return {'enabled': True, **self._write_behind.stats()}
+    
+    def close(self):
+        """Flush buffered inserts, finish queued writes and close every connection"""
+        if self._write_behind is not None:
+            self._write_behind.close()
+        self._writer.close()
+        self._read_pool.close()
     
     def init_database(self):
-        """Initialize the database with required tables"""
+        """Create or upgrade the schema to the latest migration"""
+        self._write(migrate)
+    
+    def check_query_plans(self) -> Dict[str, List[str]]:
+        """EXPLAIN QUERY PLAN of each hot query; raises QueryPlanRegression if one lost its index"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Create all messages table (stores every message)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS all_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    is_flagged BOOLEAN DEFAULT FALSE,
-                    flagged_message_id INTEGER,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (flagged_message_id) REFERENCES flagged_messages (id)
-                )
-            ''')
-            
-            # Create flagged messages table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS flagged_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    flagged_words TEXT NOT NULL,
-                    categories TEXT NOT NULL,
-                    confidence REAL NOT NULL,
-                    alternatives TEXT NOT NULL,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    is_challenged BOOLEAN DEFAULT FALSE,
-                    challenge_status TEXT DEFAULT 'pending'
-                )
-            ''')
-            
-            # Create user violations table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_violations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    violation_count INTEGER DEFAULT 0,
-                    last_violation DATETIME,
-                    is_banned BOOLEAN DEFAULT FALSE,
-                    training_completed BOOLEAN DEFAULT FALSE
-                )
-            ''')
-            
-            # Create challenge requests table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS challenge_requests (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    flagged_message_id INTEGER,
-                    user_id TEXT NOT NULL,
-                    challenge_reason TEXT NOT NULL,
-                    status TEXT DEFAULT 'pending',
-                    reviewer_notes TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    reviewed_at DATETIME,
-                    FOREIGN KEY (flagged_message_id) REFERENCES flagged_messages (id)
-                )
-            ''')
-            
-            conn.commit()
+            return check_query_plans(conn)
+    
+    def submit_message(self, user_id: str, message: str, is_flagged: bool = False, flagged_message_id: int = None) -> Future:
+        """Queue a message insert; the future resolves to its all_messages id once committed"""
+        return self._submit(('message', (user_id, message, is_flagged, flagged_message_id, _utc_timestamp())))
+    
+    def submit_flagged_message(self, user_id: str, message: str, flagged_words: List[str],
+                               categories: List[str], confidence: float, alternatives: List[str]) -> Future:
+        """Queue a flagged message insert; the future resolves to its flagged_messages id once committed"""
+        return self._submit(('flagged', (user_id, message, json.dumps(flagged_words), json.dumps(categories),
+                                         confidence, json.dumps(alternatives), _utc_timestamp())))
+    
+    def submit_clean_message(self, user_id: str, message: str) -> Future:
+        """Queue a message that was not flagged"""
+        return self.submit_message(user_id, message, is_flagged=False)
+    
+    def _submit(self, item) -> Future:
+        if self._write_behind is not None:
+            return self._write_behind.add(item)
+        return self._writer.submit(lambda conn: self._insert_batch(conn, [item])[0])
+    
+    def _wait(self, future: Future) -> int:
+        """Row id for a caller that needs it now: flush its group instead of waiting for the timer"""
+        if self._write_behind is not None:
+            self._write_behind.dispatch()
+        return future.result()
     
     def store_message(self, user_id: str, message: str, is_flagged: bool = False, flagged_message_id: int = None) -> int:
         """Store any message (flagged or unflagged) in the database"""
-        with self._lock:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                try:
-                    cursor.execute('''
-                        INSERT INTO all_messages (user_id, message, is_flagged, flagged_message_id)
-                        VALUES (?, ?, ?, ?)
-                    ''', (user_id, message, is_flagged, flagged_message_id))
-                    
-                    message_id = cursor.lastrowid
-                    conn.commit()
-                    return message_id
-                except Exception as e:
-                    print(f"Database error in store_message: {e}")
-                    conn.rollback()
-                    return 0
+        try:
+            return self._wait(self.submit_message(user_id, message, is_flagged, flagged_message_id))
+        except Exception as e:
+            print(f"Database error in store_message: {e}")
+            return 0
     
     def store_flagged_message(self, user_id: str, message: str, flagged_words: List[str], 
                             categories: List[str], confidence: float, alternatives: List[str]) -> int:
         """Store a flagged message in the database"""
-        with self._lock:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                try:
-                    # Store in flagged_messages table
-                    cursor.execute('''
-                        INSERT INTO flagged_messages (user_id, message, flagged_words, categories, confidence, alternatives)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (user_id, message, json.dumps(flagged_words), json.dumps(categories), confidence, json.dumps(alternatives)))
-                    
-                    flagged_message_id = cursor.lastrowid
-                    
-                    # Also store in all_messages table
-                    cursor.execute('''
-                        INSERT INTO all_messages (user_id, message, is_flagged, flagged_message_id)
-                        VALUES (?, ?, ?, ?)
-                    ''', (user_id, message, True, flagged_message_id))
-                    
-                    conn.commit()
-                    
-                    # Update user violation count
-                    self.update_user_violation(user_id)
-                    
-                    return flagged_message_id
-                except Exception as e:
-                    print(f"Database error in store_flagged_message: {e}")
-                    conn.rollback()
-                    return 0
+        try:
+            return self._wait(self.submit_flagged_message(user_id, message, flagged_words, categories, confidence, alternatives))
+        except Exception as e:
+            print(f"Database error in store_flagged_message: {e}")
+            return 0
+    
+    def _insert_batch(self, conn: sqlite3.Connection, items: List) -> List[int]:
+        """
+        Insert a group of ('message' | 'flagged', fields) items in one transaction
+        
+        Ids are assigned up front so each table takes a single executemany;
+        BEGIN IMMEDIATE holds the write lock, so no other writer can claim
+        them. Returns the id each store_* call would have returned.
+        """
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        next_flagged_id = self._last_id(cursor, 'flagged_messages') + 1
+        next_message_id = self._last_id(cursor, 'all_messages') + 1
+        
+        flagged_rows, message_rows, results = [], [], []
+        violations = Counter()
+        flagged_counts, clean_counts = Counter(), Counter()
+        for kind, fields in items:
+            if kind == 'flagged':
+                user_id, message, flagged_words, categories, confidence, alternatives, timestamp = fields
+                flagged_rows.append((next_flagged_id, user_id, message, flagged_words, categories,
+                                     confidence, alternatives, timestamp))
+                # Also store in all_messages table
+                message_rows.append((next_message_id, user_id, message, True, next_flagged_id, timestamp))
+                violations[user_id] += 1
+                flagged_counts[user_id] += 1
+                results.append(next_flagged_id)
+                next_flagged_id += 1
+            else:
+                user_id, message, is_flagged, flagged_message_id, timestamp = fields
+                message_rows.append((next_message_id, user_id, message, is_flagged, flagged_message_id, timestamp))
+                (flagged_counts if is_flagged else clean_counts)[user_id] += 1
+                results.append(next_message_id)
+            next_message_id += 1
+        
+        if flagged_rows:
+            cursor.executemany('''
+                INSERT INTO flagged_messages (id, user_id, message, flagged_words, categories, confidence, alternatives, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', flagged_rows)
+        cursor.executemany('''
+            INSERT INTO all_messages (id, user_id, message, is_flagged, flagged_message_id, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', message_rows)
+        
+        # Update user violation counts and message counters in the same transaction
+        for user_id, count in violations.items():
+            self._record_violation(cursor, user_id, count)
+        self._add_message_stats(cursor, [
+            (user_id, flagged_counts[user_id] + clean_counts[user_id], flagged_counts[user_id], clean_counts[user_id])
+            for user_id in set(flagged_counts) | set(clean_counts)
+        ])
+        
+        return results
+    
+    def _add_message_stats(self, cursor: sqlite3.Cursor, deltas: List):
+        """Apply (user_id, total, flagged, clean) deltas to user_message_stats"""
+        cursor.executemany('''
+            INSERT INTO user_message_stats (user_id, total_messages, flagged_messages, clean_messages)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_messages = total_messages + excluded.total_messages,
+                flagged_messages = flagged_messages + excluded.flagged_messages,
+                clean_messages = clean_messages + excluded.clean_messages
+        ''', deltas)
+    
+    def _last_id(self, cursor: sqlite3.Cursor, table: str) -> int:
+        """Highest id ever handed out for an AUTOINCREMENT table"""
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        sequence = cursor.fetchone()
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        return max(sequence[0] if sequence else 0, cursor.fetchone()[0])
     
     def store_clean_message(self, user_id: str, message: str) -> int:
         """Store a message that was not flagged"""
         return self.store_message(user_id, message, is_flagged=False)
     
     def get_all_messages(self, user_id: str = None, limit: int = 100) -> List[Dict]:
-        """Get all messages (flagged and unflagged)"""
+        """Get all messages (flagged and unflagged), newest first"""
+        return self.get_messages_page(user_id, limit)['items']
+    
+    def get_messages_page(self, user_id: str = None, limit: int = 100, cursor: Optional[Cursor] = None) -> Dict:
+        """
+        One page of messages, newest first
+        
+        Pass the returned next_cursor back to get the following page; it is
+        None after the last one. Pages seek on (timestamp, id) through the
+        index instead of an OFFSET, so page 1000 costs the same as page 1
+        and rows arriving meanwhile never shift or repeat a page.
+        """
+        sql, params = self._messages_query(user_id, cursor)
+        return self._page(sql + ' LIMIT ?', params + [limit + 1], limit, self._message_row)
+    
+    def iter_messages(self, user_id: str = None, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream every message, newest first, batch_size rows in memory at a time"""
+        sql, params = self._messages_query(user_id, None)
+        return self._stream(sql, params, batch_size, self._message_row)
+    
+    def _messages_query(self, user_id: Optional[str], cursor: Optional[Cursor]) -> Tuple[str, List]:
+        conditions, params = [], []
+        if user_id:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if cursor:
+            conditions.append('(timestamp, id) < (?, ?)')
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return f'''
+            SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp
+            FROM all_messages 
+            {where}
+            ORDER BY timestamp DESC, id DESC
+        ''', params
+    
+    @staticmethod
+    def _message_row(row) -> Dict:
+        return {
+            'id': row[0],
+            'user_id': row[1],
+            'message': row[2],
+            'is_flagged': bool(row[3]),
+            'flagged_message_id': row[4],
+            'timestamp': row[5]
+        }
+    
+    def _page(self, sql: str, params: List, limit: int, to_dict: Callable[[tuple], Dict],
+              cursor_keys: Tuple[str, str] = ('timestamp', 'id')) -> Dict:
+        """Run a keyset query for limit + 1 rows; the extra row only tells whether another page follows"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if user_id:
-                cursor.execute('''
-                    SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp
-                    FROM all_messages 
-                    WHERE user_id = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (user_id, limit))
-            else:
-                cursor.execute('''
-                    SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp
-                    FROM all_messages 
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (limit,))
-            
-            results = cursor.fetchall()
-            return [
-                {
-                    'id': row[0],
-                    'user_id': row[1],
-                    'message': row[2],
-                    'is_flagged': bool(row[3]),
-                    'flagged_message_id': row[4],
-                    'timestamp': row[5]
-                }
-                for row in results
-            ]
+            rows = conn.execute(sql, params).fetchall()
+        
+        items = [to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and items:
+            next_cursor = (items[-1][cursor_keys[0]], items[-1][cursor_keys[1]])
+        return {'items': items, 'next_cursor': next_cursor}
+    
+    def _stream(self, sql: str, params: List, batch_size: int, to_dict: Callable[[tuple], Dict]) -> Iterator[Dict]:
+        """
+        Yield rows lazily with fetchmany on a dedicated read connection
+        
+        The whole walk reads one consistent snapshot. It does not borrow
+        from the read pool, so a slow consumer never starves request-path
+        reads; the connection closes when the generator is exhausted,
+        closed or garbage collected.
+        """
+        conn = connect(self.db_path, read_only=True)
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield to_dict(row)
+        finally:
+            conn.close()
     
     def get_message_stats(self, user_id: str = None) -> Dict:
-        """Get statistics about messages"""
+        """Get statistics about messages, read from the per-user counters"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
             if user_id:
                 cursor.execute('''
-                    SELECT 
-                        COUNT(*) as total_messages,
-                        SUM(CASE WHEN is_flagged THEN 1 ELSE 0 END) as flagged_messages,
-                        SUM(CASE WHEN NOT is_flagged THEN 1 ELSE 0 END) as clean_messages
-                    FROM all_messages 
+                    SELECT total_messages, flagged_messages, clean_messages
+                    FROM user_message_stats
                     WHERE user_id = ?
                 ''', (user_id,))
             else:
                 cursor.execute('''
-                    SELECT 
-                        COUNT(*) as total_messages,
-                        SUM(CASE WHEN is_flagged THEN 1 ELSE 0 END) as flagged_messages,
-                        SUM(CASE WHEN NOT is_flagged THEN 1 ELSE 0 END) as clean_messages
-                    FROM all_messages
+                    SELECT SUM(total_messages), SUM(flagged_messages), SUM(clean_messages)
+                    FROM user_message_stats
                 ''')
             
-            result = cursor.fetchone()
+            result = cursor.fetchone() or (0, 0, 0)
+            total = result[0] or 0
             return {
-                'total_messages': result[0],
+                'total_messages': total,
                 'flagged_messages': result[1] or 0,
                 'clean_messages': result[2] or 0,
-                'flag_rate': (result[1] or 0) / result[0] if result[0] > 0 else 0
+                'flag_rate': (result[1] or 0) / total if total > 0 else 0
             }
     
+    def check_message_stats(self, repair: bool = False) -> Dict:
+        """
+        Compare user_message_stats with a full aggregation of all_messages
+        
+        Returns the number of users checked and the user_ids whose counters
+        disagree (or are missing); with repair=True the table is rebuilt
+        when anything disagrees.
+        """
+        with self.get_connection() as conn:
+            expected = {row[0]: tuple(row[1:]) for row in conn.execute(USER_MESSAGE_STATS_FROM_MESSAGES)}
+            stored = {row[0]: tuple(row[1:]) for row in conn.execute(
+                'SELECT user_id, total_messages, flagged_messages, clean_messages FROM user_message_stats'
+            )}
+        
+        # Users with only zero counters are as good as absent
+        stored = {user_id: counts for user_id, counts in stored.items() if any(counts)}
+        mismatched = sorted(user_id for user_id in set(expected) | set(stored)
+                            if expected.get(user_id) != stored.get(user_id))
+        
+        if mismatched:
+            print(f"⚠️ Message counters disagree for {len(mismatched)} users")
+            if repair:
+                self.rebuild_message_stats()
+        
+        return {'users_checked': len(expected), 'mismatched': mismatched, 'repaired': bool(mismatched and repair)}
+    
+    def rebuild_message_stats(self):
+        """Recompute user_message_stats from all_messages in one transaction"""
+        def rebuild(conn):
+            conn.execute('DELETE FROM user_message_stats')
+            conn.execute('INSERT INTO user_message_stats (user_id, total_messages, flagged_messages, clean_messages) '
+                         + USER_MESSAGE_STATS_FROM_MESSAGES)
+        
+        self._write(rebuild)
+        print("✅ Rebuilt per-user message counters")
+    
     def update_user_violation(self, user_id: str):
         """Update user violation count"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Check if user exists
-            cursor.execute('SELECT violation_count FROM user_violations WHERE user_id = ?', (user_id,))
-            result = cursor.fetchone()
-            
-            if result:
-                new_count = result[0] + 1
-                cursor.execute('''
-                    UPDATE user_violations 
-                    SET violation_count = ?, last_violation = CURRENT_TIMESTAMP
-                    WHERE user_id = ?
-                ''', (new_count, user_id))
-            else:
-                cursor.execute('''
-                    INSERT INTO user_violations (user_id, violation_count, last_violation)
-                    VALUES (?, 1, CURRENT_TIMESTAMP)
-                ''', (user_id,))
-            
-            conn.commit()
+        self._write(lambda conn: self._record_violation(conn.cursor(), user_id))
+    
+    def _record_violation(self, cursor: sqlite3.Cursor, user_id: str, count: int = 1):
+        """Add count to the user's violations inside the caller's transaction"""
+        # Check if user exists
+        cursor.execute('SELECT violation_count FROM user_violations WHERE user_id = ?', (user_id,))
+        result = cursor.fetchone()
+        
+        if result:
+            new_count = result[0] + count
+            cursor.execute('''
+                UPDATE user_violations 
+                SET violation_count = ?, last_violation = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            ''', (new_count, user_id))
+        else:
+            cursor.execute('''
+                INSERT INTO user_violations (user_id, violation_count, last_violation)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (user_id, count))
     
     def get_user_violations(self, user_id: str) -> Dict:
         """Get user violation information"""
@@ -273,7 +397,7 @@ class ContentModerationDB:
     
     def create_challenge_request(self, flagged_message_id: int, user_id: str, challenge_reason: str) -> int:
         """Create a challenge request for a flagged message"""
-        with self.get_connection() as conn:
+        def insert(conn):
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -290,53 +414,62 @@ class ContentModerationDB:
                 WHERE id = ?
             ''', (flagged_message_id,))
             
-            conn.commit()
             return challenge_id
+        
+        return self._write(insert)
     
-    def get_pending_challenges(self) -> List[Dict]:
-        """Get all pending challenge requests"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT cr.id, cr.user_id, cr.challenge_reason, cr.created_at,
-                       fm.message, fm.flagged_words, fm.categories
-                FROM challenge_requests cr
-                JOIN flagged_messages fm ON cr.flagged_message_id = fm.id
-                WHERE cr.status = 'pending'
-                ORDER BY cr.created_at DESC
-            ''')
-            
-            results = cursor.fetchall()
-            return [
-                {
-                    'challenge_id': row[0],
-                    'user_id': row[1],
-                    'challenge_reason': row[2],
-                    'created_at': row[3],
-                    'original_message': row[4],
-                    'flagged_words': json.loads(row[5]),
-                    'categories': json.loads(row[6])
-                }
-                for row in results
-            ]
+    def get_pending_challenges(self, limit: int = 50) -> List[Dict]:
+        """Get the newest pending challenge requests; page with get_pending_challenges_page"""
+        return self.get_pending_challenges_page(limit)['items']
+    
+    def get_pending_challenges_page(self, limit: int = 50, cursor: Optional[Cursor] = None) -> Dict:
+        """One page of pending challenges, newest first; cursor is (created_at, challenge_id) from next_cursor"""
+        sql, params = self._pending_challenges_query(cursor)
+        return self._page(sql + ' LIMIT ?', params + [limit + 1], limit, self._challenge_row,
+                          cursor_keys=('created_at', 'challenge_id'))
+    
+    def iter_pending_challenges(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream every pending challenge, newest first"""
+        sql, params = self._pending_challenges_query(None)
+        return self._stream(sql, params, batch_size, self._challenge_row)
+    
+    def _pending_challenges_query(self, cursor: Optional[Cursor]) -> Tuple[str, List]:
+        keyset = 'AND (cr.created_at, cr.id) < (?, ?)' if cursor else ''
+        return f'''
+            SELECT cr.id, cr.user_id, cr.challenge_reason, cr.created_at,
+                   fm.message, fm.flagged_words, fm.categories
+            FROM challenge_requests cr
+            JOIN flagged_messages fm ON cr.flagged_message_id = fm.id
+            WHERE cr.status = 'pending' {keyset}
+            ORDER BY cr.created_at DESC, cr.id DESC
+        ''', list(cursor or ())
+    
+    @staticmethod
+    def _challenge_row(row) -> Dict:
+        return {
+            'challenge_id': row[0],
+            'user_id': row[1],
+            'challenge_reason': row[2],
+            'created_at': row[3],
+            'original_message': row[4],
+            'flagged_words': json.loads(row[5]),
+            'categories': json.loads(row[6])
+        }
     
     def update_challenge_status(self, challenge_id: int, status: str, reviewer_notes: str = None):
         """Update challenge request status"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+        def update(conn):
+            conn.execute('''
                 UPDATE challenge_requests 
                 SET status = ?, reviewer_notes = ?, reviewed_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             ''', (status, reviewer_notes, challenge_id))
-            
-            conn.commit()
+        
+        self._write(update)
     
     def approve_challenge(self, challenge_id: int, reviewer_notes: str = None):
         """Approve a challenge - unflag the message and deliver it"""
-        with self.get_connection() as conn:
+        def approve(conn):
             cursor = conn.cursor()
             
             # Get the challenge details
@@ -361,8 +494,6 @@ class ContentModerationDB:
             if not message_result:
                 return False
             
-            original_message = message_result[0]
-            
             # Update challenge status to approved
             cursor.execute('''
                 UPDATE challenge_requests 
@@ -377,6 +508,15 @@ class ContentModerationDB:
                 WHERE id = ?
             ''', (flagged_message_id,))
             
+            # Move the rows about to be unflagged from the flagged to the clean counters
+            cursor.execute('''
+                SELECT user_id, COUNT(*)
+                FROM all_messages
+                WHERE flagged_message_id = ? AND is_flagged
+                GROUP BY user_id
+            ''', (flagged_message_id,))
+            self._add_message_stats(cursor, [(owner, 0, -count, count) for owner, count in cursor.fetchall()])
+            
             # Update all_messages to mark as unflagged
             cursor.execute('''
                 UPDATE all_messages 
@@ -394,12 +534,13 @@ class ContentModerationDB:
                 WHERE user_id = ?
             ''', (user_id,))
             
-            conn.commit()
             return True
+        
+        return self._write(approve)
     
     def reject_challenge(self, challenge_id: int, reviewer_notes: str = None):
         """Reject a challenge - keep message flagged and blocked"""
-        with self.get_connection() as conn:
+        def reject(conn):
             cursor = conn.cursor()
             
             # Get the flagged message ID
@@ -427,53 +568,64 @@ class ContentModerationDB:
                 WHERE id = ?
             ''', (flagged_message_id,))
             
-            conn.commit()
             return True
+        
+        return self._write(reject)
     
-    def get_approved_messages(self, user_id: str) -> List[Dict]:
-        """Get messages that were approved by reviewer (should be delivered)"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT am.message, am.timestamp, cr.reviewer_notes
-                FROM all_messages am
-                JOIN flagged_messages fm ON am.flagged_message_id = fm.id
-                JOIN challenge_requests cr ON fm.id = cr.flagged_message_id
-                WHERE am.user_id = ? AND cr.status = 'approved'
-                ORDER BY am.timestamp DESC
-            ''', (user_id,))
-            
-            results = cursor.fetchall()
-            return [
-                {
-                    'message': row[0],
-                    'timestamp': row[1],
-                    'reviewer_notes': row[2]
-                }
-                for row in results
-            ]
+    def get_approved_messages(self, user_id: str, limit: int = 50) -> List[Dict]:
+        """Get messages that were approved by reviewer (should be delivered), newest first"""
+        return self.get_approved_messages_page(user_id, limit)['items']
+    
+    def get_approved_messages_page(self, user_id: str, limit: int = 50, cursor: Optional[Cursor] = None) -> Dict:
+        """One page of a user's approved messages, newest first; cursor is (timestamp, id) from next_cursor"""
+        sql, params = self._approved_messages_query(user_id, cursor)
+        return self._page(sql + ' LIMIT ?', params + [limit + 1], limit, self._approved_row)
+    
+    def iter_approved_messages(self, user_id: str, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream every approved message of a user, newest first"""
+        sql, params = self._approved_messages_query(user_id, None)
+        return self._stream(sql, params, batch_size, self._approved_row)
+    
+    def _approved_messages_query(self, user_id: str, cursor: Optional[Cursor]) -> Tuple[str, List]:
+        keyset = 'AND (am.timestamp, am.id) < (?, ?)' if cursor else ''
+        return f'''
+            SELECT am.id, am.message, am.timestamp, cr.reviewer_notes
+            FROM all_messages am
+            JOIN flagged_messages fm ON am.flagged_message_id = fm.id
+            JOIN challenge_requests cr ON fm.id = cr.flagged_message_id
+            WHERE am.user_id = ? AND cr.status = 'approved' {keyset}
+            ORDER BY am.timestamp DESC, am.id DESC
+        ''', [user_id, *(cursor or ())]
+    
+    @staticmethod
+    def _approved_row(row) -> Dict:
+        return {
+            'id': row[0],
+            'message': row[1],
+            'timestamp': row[2],
+            'reviewer_notes': row[3]
+        }
     
     def mark_training_completed(self, user_id: str):
         """Mark user training as completed"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+        def update(conn):
+            conn.execute('''
                 UPDATE user_violations 
                 SET training_completed = TRUE 
                 WHERE user_id = ?
             ''', (user_id,))
-            
-            conn.commit()
+        
+        self._write(update)
     
     def clear_all_data(self):
         """Clear all data for testing purposes"""
-        with self.get_connection() as conn:
+        def clear(conn):
             cursor = conn.cursor()
             cursor.execute('DELETE FROM all_messages')
             cursor.execute('DELETE FROM flagged_messages')
             cursor.execute('DELETE FROM user_violations')
             cursor.execute('DELETE FROM challenge_requests')
-            conn.commit()
-            print("✅ All data cleared for fresh testing") 
\ No newline at end of file
+            cursor.execute('DELETE FROM user_message_stats')
+        
+        self._write(clear)
+        print("✅ All data cleared for fresh testing") 
\ No newline at end of file
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+ContentModerationDB Benchmark
+Messages stored per second and stats reads per second: per-call connections, the pool, and group commit;
+hot query latency before and after the indexes on a large seeded database; deep pages and full exports
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from .database import ContentModerationDB
+from .migrations import HOT_QUERIES, LATEST_VERSION, check_query_plans, migrate
+from .sqlite_pool import connect
+
+
+class LegacyConnectionDB(ContentModerationDB):
+    """The previous access pattern: a new connection and four PRAGMAs per call, writes under one lock"""
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self._legacy_lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=10000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def store_message(self, user_id: str, message: str, is_flagged: bool = False, flagged_message_id: int = None) -> int:
+        with self._legacy_lock:
+            conn = self._open()
+            try:
+                cursor = conn.execute('''
+                    INSERT INTO all_messages (user_id, message, is_flagged, flagged_message_id)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_id, message, is_flagged, flagged_message_id))
+                conn.commit()
+                return cursor.lastrowid
+            finally:
+                conn.close()
+
+    def get_message_stats(self, user_id: str = None) -> Dict:
+        conn = self._open()
+        try:
+            row = conn.execute('''
+                SELECT COUNT(*), SUM(CASE WHEN is_flagged THEN 1 ELSE 0 END)
+                FROM all_messages WHERE user_id = ?
+            ''', (user_id,)).fetchone()
+            return {'total_messages': row[0], 'flagged_messages': row[1] or 0}
+        finally:
+            conn.close()
+
+
+def _rate(operation: Callable[[int], None], count: int, threads: int) -> float:
+    """Operations per second for count calls spread over threads"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(operation, range(count)))
+    return count / (time.perf_counter() - started)
+
+
+def run_benchmark(messages: int = 2000, threads: int = 8, users: int = 50) -> List[Dict]:
+    """Store messages, then read per-user stats, with the legacy and the pooled database"""
+    rows = []
+    for label, db_class in (('new connection per call', LegacyConnectionDB), ('pool + single writer', ContentModerationDB)):
+        with tempfile.TemporaryDirectory() as directory:
+            db = db_class(os.path.join(directory, 'benchmark.db'))
+
+            store_rate = _rate(lambda i: db.store_clean_message(f"user_{i % users}", f"benchmark message {i}"),
+                               messages, threads)
+            read_rate = _rate(lambda i: db.get_message_stats(f"user_{i % users}"), messages, threads)
+            rows.append({'database': label, 'stores_per_second': store_rate, 'stats_reads_per_second': read_rate})
+            db.close()
+
+    print(f"📊 {messages} messages from {threads} threads")
+    print(f"   {'database':<26} {'stores/s':>10} {'stats reads/s':>14}")
+    for row in rows:
+        print(f"   {row['database']:<26} {row['stores_per_second']:>10.0f} {row['stats_reads_per_second']:>14.0f}")
+    return rows
+
+
+def run_write_behind_benchmark(messages: int = 5000, threads: int = 8, flush_rows: int = 256,
+                               flush_interval_ms: float = 20.0) -> List[Dict]:
+    """
+    Sustained store throughput: one commit per message vs group commit
+
+    'blocking' callers wait for their group's commit and get the row id;
+    'fire-and-forget' callers keep the future and the run ends with flush().
+    """
+    configs = [
+        ('commit per message', dict(), 'store'),
+        ('group commit, blocking', dict(write_behind=True, flush_rows=flush_rows, flush_interval_ms=flush_interval_ms), 'store'),
+        ('group commit, futures', dict(write_behind=True, flush_rows=flush_rows, flush_interval_ms=flush_interval_ms), 'submit')
+    ]
+    rows = []
+    for label, options, mode in configs:
+        with tempfile.TemporaryDirectory() as directory:
+            db = ContentModerationDB(os.path.join(directory, 'benchmark.db'), **options)
+
+            def store(i: int):
+                if i % 10 == 0:
+                    call = db.submit_flagged_message if mode == 'submit' else db.store_flagged_message
+                    call(f"user_{i % 50}", f"flagged message {i}", ["word"], ["category"], 0.9, ["alternative"])
+                else:
+                    call = db.submit_clean_message if mode == 'submit' else db.store_clean_message
+                    call(f"user_{i % 50}", f"benchmark message {i}")
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(store, range(messages)))
+            db.flush()
+            elapsed = time.perf_counter() - started
+
+            stored = db.get_message_stats()['total_messages']
+            rows.append({'mode': label, 'stores_per_second': messages / elapsed, 'stored': stored,
+                         'avg_rows_per_flush': db.get_write_stats().get('avg_rows_per_flush', 1.0)})
+            db.close()
+
+    print(f"📊 {messages} messages (10% flagged) from {threads} threads")
+    print(f"   {'mode':<24} {'stores/s':>10} {'rows/commit':>12} {'stored':>8}")
+    for row in rows:
+        print(f"   {row['mode']:<24} {row['stores_per_second']:>10.0f} {row['avg_rows_per_flush']:>12.1f} {row['stored']:>8}")
+    return rows
+
+
+def seed_database(db_path: str, messages: int = 10_000_000, users: int = 10_000, flagged_every: int = 10,
+                  challenged_every: int = 20, chunk_size: int = 100_000, schema_version: int = 1):
+    """
+    Fill a database with synthetic history: one message per second across users,
+    every flagged_every-th one flagged and every challenged_every-th flagged one challenged
+    """
+    conn = connect(db_path)
+    migrate(conn, target=schema_version)
+    conn.execute("PRAGMA synchronous=OFF")
+    base = time.mktime((2024, 1, 1, 0, 0, 0, 0, 0, 0))
+    statuses = ('pending', 'approved', 'rejected')
+
+    started = time.perf_counter()
+    flagged_id = 0
+    for start in range(0, messages, chunk_size):
+        message_rows, flagged_rows, challenge_rows = [], [], []
+        for i in range(start, min(start + chunk_size, messages)):
+            user_id = f"user_{i % users}"
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(base + i))
+            if i % flagged_every == 0:
+                flagged_id += 1
+                flagged_rows.append((flagged_id, user_id, f"seed message {i}", '["word"]', '["category"]',
+                                     0.9, '["alternative"]', timestamp))
+                message_rows.append((i + 1, user_id, f"seed message {i}", True, flagged_id, timestamp))
+                if flagged_id % challenged_every == 0:
+                    challenge_rows.append((flagged_id, user_id, "seeded challenge",
+                                           statuses[flagged_id // challenged_every % 3], timestamp))
+            else:
+                message_rows.append((i + 1, user_id, f"seed message {i}", False, None, timestamp))
+
+        conn.executemany('INSERT INTO flagged_messages (id, user_id, message, flagged_words, categories, confidence, '
+                         'alternatives, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', flagged_rows)
+        conn.executemany('INSERT INTO all_messages (id, user_id, message, is_flagged, flagged_message_id, timestamp) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', message_rows)
+        conn.executemany('INSERT INTO challenge_requests (flagged_message_id, user_id, challenge_reason, status, created_at) '
+                         'VALUES (?, ?, ?, ?, ?)', challenge_rows)
+        conn.commit()
+
+    conn.executemany('INSERT INTO user_violations (user_id, violation_count) VALUES (?, ?)',
+                     [(f"user_{u}", 1) for u in range(users)])
+    conn.commit()
+    conn.close()
+    print(f"🌱 Seeded {messages} messages for {users} users in {time.perf_counter() - started:.1f}s")
+
+
+# What the queries were before the migrations (get_message_stats aggregated all_messages)
+LEGACY_QUERIES = dict(HOT_QUERIES, **{
+    'get_message_stats(user_id)': ('''
+        SELECT COUNT(*), SUM(CASE WHEN is_flagged THEN 1 ELSE 0 END), SUM(CASE WHEN NOT is_flagged THEN 1 ELSE 0 END)
+        FROM all_messages WHERE user_id = ?
+    ''', ('user_1',), 'idx_all_messages_user_time')
+})
+
+
+def _time_queries(conn: sqlite3.Connection, repeats: int, queries: Dict = HOT_QUERIES) -> Dict[str, float]:
+    """Average milliseconds per hot query (writes are rolled back)"""
+    timings = {}
+    for name, (sql, params, _) in queries.items():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            conn.execute(sql, params).fetchall()
+            conn.rollback()
+        timings[name] = (time.perf_counter() - started) / repeats * 1000
+    return timings
+
+
+def run_index_benchmark(messages: int = 10_000_000, users: int = 10_000, repeats: int = 3,
+                        db_path: str = None) -> List[Dict]:
+    """Hot query latency on a seeded database before and after the index migration"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = db_path or os.path.join(directory, 'seeded.db')
+        seed_database(db_path, messages=messages, users=users)
+
+        conn = connect(db_path)
+        before = _time_queries(conn, repeats, LEGACY_QUERIES)
+
+        started = time.perf_counter()
+        migrate(conn)
+        print(f"🔧 Migrated to version {LATEST_VERSION} in {time.perf_counter() - started:.1f}s")
+        # No ANALYZE: the app never runs it, so plans here match production
+
+        check_query_plans(conn)
+        after = _time_queries(conn, repeats)
+        conn.close()
+
+    rows = [{'query': name, 'before_ms': before[name], 'after_ms': after[name]} for name in HOT_QUERIES]
+    print(f"📊 Hot queries over {messages} messages, {users} users (ms, mean of {repeats})")
+    print(f"   {'query':<28} {'no indexes':>11} {'indexed':>9} {'speedup':>9}")
+    for row in rows:
+        print(f"   {row['query']:<28} {row['before_ms']:>11.2f} {row['after_ms']:>9.3f} "
+              f"{row['before_ms'] / max(row['after_ms'], 1e-6):>8.0f}x")
+    print("✅ Every hot query uses its index")
+    return rows
+
+
+def run_pagination_benchmark(messages: int = 1_000_000, users: int = 10_000, page_size: int = 100,
+                             depths: tuple = (1, 100, 1000), db_path: str = None) -> Dict:
+    """
+    Deep page latency, OFFSET vs keyset cursor, and peak Python memory of a
+    full export, materialized list vs iter_messages
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = db_path or os.path.join(directory, 'seeded.db')
+        seed_database(db_path, messages=messages, users=users, schema_version=LATEST_VERSION)
+        db = ContentModerationDB(db_path)
+
+        pages = []
+        cursor = None
+        for depth in range(1, max(depths) + 1):
+            started = time.perf_counter()
+            page = db.get_messages_page(limit=page_size, cursor=cursor)
+            keyset_ms = (time.perf_counter() - started) * 1000
+            cursor = page['next_cursor']
+            if depth in depths:
+                with db.get_connection() as conn:
+                    started = time.perf_counter()
+                    conn.execute('SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp '
+                                 'FROM all_messages ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?',
+                                 (page_size, (depth - 1) * page_size)).fetchall()
+                    offset_ms = (time.perf_counter() - started) * 1000
+                pages.append({'page': depth, 'offset_ms': offset_ms, 'keyset_ms': keyset_ms})
+
+        exports = {}
+        for label, export in (('list', lambda: len(db.get_all_messages(limit=messages))),
+                              ('iter_messages', lambda: sum(1 for _ in db.iter_messages()))):
+            tracemalloc.start()
+            started = time.perf_counter()
+            exported = export()
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            exports[label] = {'rows': exported, 'seconds': elapsed, 'peak_mb': peak / 2 ** 20}
+        db.close()
+
+    print(f"📊 Page {page_size} of {messages} messages, newest first (ms)")
+    print(f"   {'page':>6} {'OFFSET':>9} {'keyset':>9}")
+    for row in pages:
+        print(f"   {row['page']:>6} {row['offset_ms']:>9.2f} {row['keyset_ms']:>9.2f}")
+    print(f"📊 Full export of {messages} messages")
+    for label, row in exports.items():
+        print(f"   {label:<14} {row['rows']:>9} rows {row['seconds']:>7.2f}s  peak {row['peak_mb']:>8.1f} MB")
+    return {'pages': pages, 'exports': exports}
+
+
+if __name__ == "__main__":
+    import sys
+    run_benchmark()
+    run_write_behind_benchmark()
+    # Full size by default; pass a row count for a quicker run, e.g. 200000
+    run_index_benchmark(messages=int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
+    run_pagination_benchmark()
@@ -4,9 +4,17 @@ Hybrid Content Moderator
 Combines Knowledge Injection (Llama 3) with RAG system for enhanced accuracy
 """
 
-from typing import Dict, Optional
-from .knowledge_injection_moderator import KnowledgeInjectionModerator
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+from .knowledge_injection_moderator import FALLBACK_REASONING, KnowledgeInjectionModerator
 from ..rag_system.rag_integration import RAGIntegration
+from ..utils.lru_cache import LRUCache
 
 class HybridModerator:
     """
@@ -15,20 +23,168 @@ class HybridModerator:
     2. RAG System (vector embeddings + similarity search)
     """
     
-    def __init__(self):
-        """Initialize both systems"""
+    # Keyword categories that are decisive on their own in cascade mode
+    HARD_KEYWORD_CATEGORIES = {"derogatory_terms"}
+    
+    def __init__(self, branch_timeout: Optional[float] = 30.0, max_workers: int = 4,
+                 verdict_cache: Optional[LRUCache] = None, cascade: bool = False,
+                 uncertainty_band: Tuple[float, float] = (0.15, 0.85),
+                 alternatives_store: Optional[LRUCache] = None, rag_options: Optional[Dict] = None,
+                 lazy: bool = False, on_ready: Optional[Callable[["HybridModerator"], None]] = None):
+        """
+        Initialize both systems
+
+        Args:
+            branch_timeout: Seconds each analysis branch may run before its
+                result is dropped (None waits forever)
+            max_workers: Size of the thread pool shared by both branches
+            verdict_cache: Optional cache of combined verdicts for repeated
+                messages (None disables caching)
+            cascade: Run the keyword and RAG stages first and only call Llama
+                when they are not decisive
+            uncertainty_band: (low, high) bounds on the cheap stages' flag
+                probability; only messages inside the band reach Llama
+            alternatives_store: Optional persistent store for memoized AI
+                alternatives (defaults to an in-memory cache)
+            rag_options: Keyword arguments for SimpleRAGDetector (index
+                backend, embedding cache, ...)
+            lazy: Return immediately and load RAG, probe Ollama and warm both
+                up on a background thread; until then messages get the
+                keyword path (see is_ready / wait_until_ready)
+            on_ready: Called with this moderator once warm-up has finished
+        """
         print("🔧 Initializing Hybrid Moderator...")
         
-        # Initialize Knowledge Injection system
-        self.knowledge_injection = KnowledgeInjectionModerator()
+        self.branch_timeout = branch_timeout
+        self.cascade = cascade
+        self.uncertainty_band = uncertainty_band
+        self._cascade_stats = {'messages': 0, 'llm_calls': 0, 'decided_by_keywords': 0, 'decided_by_rag': 0}
+        self._cascade_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hybrid-moderator")
+        
+        self._ready = threading.Event()
+        self._readiness = {'rag': 'loading', 'llm': 'loading', 'warm_up_seconds': None, 'warm_up_error': None}
+        self._on_ready = on_ready
+        
+        # Initialize Knowledge Injection system (keyword mode until warm when lazy)
+        self.knowledge_injection = KnowledgeInjectionModerator(alternatives_store=alternatives_store, check_ollama=not lazy)
         print("✅ Knowledge Injection system ready")
         
         # Initialize RAG system
-        self.rag_system = RAGIntegration()
-        if self.rag_system.is_available():
-            print("✅ RAG system ready")
+        self.rag_system = RAGIntegration(load=not lazy, **(rag_options or {}))
+        
+        self.verdict_cache = verdict_cache
+        
+        if lazy:
+            self._cache_namespace = self._build_cache_namespace()
+            threading.Thread(target=self.warm_up, name="hybrid-moderator-warm-up", daemon=True).start()
+            print("⏳ Warming up RAG and Llama 3 in the background - serving keyword checks meanwhile")
         else:
-            print("⚠️ RAG system not available - using Knowledge Injection only")
+            if self.rag_system.is_available():
+                print("✅ RAG system ready")
+            else:
+                print("⚠️ RAG system not available - using Knowledge Injection only")
+            self._mark_ready(time.monotonic())
+    
+    def warm_up(self):
+        """
+        Load and warm the heavy components, then switch traffic over to them
+        
+        Loads the embedding model and vector index and runs a dummy search,
+        then probes Ollama and sends a one-token prompt. Llama is only enabled
+        after RAG is warm, so early requests stay on the keyword path instead
+        of queueing behind a cold model.
+        """
+        started = time.monotonic()
+        try:
+            if not self.rag_system.is_available():
+                self.rag_system.load(warm_up=True)
+            self._readiness['rag'] = 'ready' if self.rag_system.is_available() else 'unavailable'
+            
+            ollama_available = self.knowledge_injection._check_ollama_availability()
+            if ollama_available and not self.knowledge_injection.warm_up():
+                # Ollama answers but the model does not; keep serving keyword checks
+                ollama_available = False
+                self._readiness['warm_up_error'] = "Llama 3 warm-up prompt failed"
+            self.knowledge_injection.ollama_available = ollama_available
+        except Exception as e:
+            print(f"❌ Warm-up failed: {e}")
+            self._readiness['warm_up_error'] = str(e)
+        finally:
+            self._mark_ready(started)
+    
+    def _mark_ready(self, started: float):
+        """Record component status, refresh the cache namespace and release waiters"""
+        self._readiness['rag'] = 'ready' if self.rag_system.is_available() else 'unavailable'
+        self._readiness['llm'] = 'ready' if self.knowledge_injection.ollama_available else 'unavailable'
+        self._readiness['warm_up_seconds'] = time.monotonic() - started
+        # Verdicts from the keyword-only phase stay under their own namespace
+        self._cache_namespace = self._build_cache_namespace()
+        self._ready.set()
+        
+        if self._on_ready is not None:
+            try:
+                self._on_ready(self)
+            except Exception as e:
+                print(f"❌ on_ready callback failed: {e}")
+    
+    def is_ready(self) -> bool:
+        """True once RAG and Llama are loaded (or known to be unavailable)"""
+        return self._ready.is_set()
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up has finished; returns False on timeout"""
+        return self._ready.wait(timeout)
+    
+    def get_readiness(self) -> Dict:
+        """Overall readiness, per-component status (loading, ready or unavailable) and any warm-up error"""
+        return {'ready': self.is_ready(), **self._readiness}
+    
+    def _build_cache_namespace(self) -> str:
+        """Hash the knowledge base and model names so cached verdicts expire when either changes"""
+        knowledge_base = json.dumps(self.knowledge_injection.knowledge_base, sort_keys=True)
+        llm = self.knowledge_injection.model if self.knowledge_injection.ollama_available else "keyword-fallback"
+        embedder = getattr(self.rag_system.rag_detector, "encoder_name", "no-rag")
+        return hashlib.sha256(f"{knowledge_base}|{llm}|{embedder}".encode("utf-8")).hexdigest()
+    
+    def _verdict_cache_key(self, message: str) -> str:
+        """Cache key from the normalized message text and the cache namespace"""
+        normalized = " ".join(message.lower().split())
+        return hashlib.sha256(f"{self._cache_namespace}|{normalized}".encode("utf-8")).hexdigest()
+    
+    def _get_cached_verdict(self, message: str) -> Optional[Dict]:
+        """Return a copy of the cached verdict for this message, if any"""
+        if self.verdict_cache is None:
+            return None
+        cached = self.verdict_cache.get(self._verdict_cache_key(message))
+        if cached is None:
+            return None
+        print("⚡ Using cached verdict")
+        return copy.deepcopy(cached)
+    
+    def _cache_verdict(self, message: str, result: Dict, ki_result: Optional[Dict], rag_result: Optional[Dict]):
+        """Cache a verdict only when no branch was dropped, so partial verdicts are never pinned"""
+        if self.verdict_cache is None or ki_result is None:
+            return
+        if ki_result.get('context_analysis') == 'Knowledge Injection failed':
+            return
+        if ki_result.get('reasoning') == FALLBACK_REASONING and self.knowledge_injection.ollama_available:
+            # Llama failed and KI fell back to keywords; don't pin that under the Llama namespace
+            return
+        if rag_result is None and self.rag_system.is_available():
+            return
+        self._put_verdict(message, result)
+    
+    def _put_verdict(self, message: str, result: Dict):
+        """Store a verdict in the cache unconditionally"""
+        if self.verdict_cache is not None:
+            self.verdict_cache.put(self._verdict_cache_key(message), copy.deepcopy(result))
+    
+    def get_cache_stats(self) -> Dict:
+        """Hit/miss counters of the verdict cache"""
+        if self.verdict_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.verdict_cache.stats()}
     
     def analyze_message(self, message: str, user_id: str = "default_user") -> Dict:
         """
@@ -39,16 +195,270 @@ class HybridModerator:
         """
         print(f"🔍 Hybrid analysis of: {message[:50]}...")
         
-        # Get results from both systems
-        ki_result = self._analyze_with_knowledge_injection(message, user_id)
-        rag_result = self._analyze_with_rag(message, user_id)
+        cached = self._get_cached_verdict(message)
+        if cached is not None:
+            return cached
+        
+        if self.cascade:
+            combined_result = self._analyze_cascade(message, user_id)
+            print(f"✅ Hybrid analysis complete: {'🚫 BLOCKED' if combined_result['flagged'] else '✅ APPROVED'}")
+            return combined_result
+        
+        # Run both systems at the same time, keeping whatever finishes in time
+        started = time.monotonic()
+        ki_future = self._executor.submit(self._analyze_with_knowledge_injection, message, user_id)
+        rag_future = self._executor.submit(self._analyze_with_rag, message, user_id)
+        
+        ki_result = self._collect_branch(ki_future, "Knowledge Injection", started)
+        rag_result = self._collect_branch(rag_future, "RAG", started)
         
         # Combine results intelligently
         combined_result = self._combine_results(ki_result, rag_result, message)
+        self._cache_verdict(message, combined_result, ki_result, rag_result)
         
         print(f"✅ Hybrid analysis complete: {'🚫 BLOCKED' if combined_result['flagged'] else '✅ APPROVED'}")
         return combined_result
     
+    async def analyze_message_async(self, message: str, user_id: str = "default_user") -> Dict:
+        """
+        Async counterpart of analyze_message for use inside an asyncio service
+        
+        Llama calls use the Ollama AsyncClient; embedding and Chroma work runs
+        on this moderator's thread pool. Both branches share the same deadline.
+        """
+        print(f"🔍 Hybrid analysis of: {message[:50]}...")
+        
+        cached = self._get_cached_verdict(message)
+        if cached is not None:
+            return cached
+        
+        if self.cascade:
+            combined_result = await self._analyze_cascade_async(message, user_id)
+            print(f"✅ Hybrid analysis complete: {'🚫 BLOCKED' if combined_result['flagged'] else '✅ APPROVED'}")
+            return combined_result
+        
+        ki_result, rag_result = await asyncio.gather(
+            self._await_branch(self._analyze_with_knowledge_injection_async(message, user_id), "Knowledge Injection"),
+            self._await_branch(self._analyze_with_rag_async(message, user_id), "RAG")
+        )
+        
+        combined_result = self._combine_results(ki_result, rag_result, message)
+        self._cache_verdict(message, combined_result, ki_result, rag_result)
+        
+        print(f"✅ Hybrid analysis complete: {'🚫 BLOCKED' if combined_result['flagged'] else '✅ APPROVED'}")
+        return combined_result
+    
+    async def _await_branch(self, coroutine, branch_name: str) -> Optional[Dict]:
+        """Await one analysis branch, returning None if it misses the deadline"""
+        try:
+            return await asyncio.wait_for(coroutine, timeout=self.branch_timeout)
+        except asyncio.TimeoutError:
+            print(f"⏱️ {branch_name} did not finish within {self.branch_timeout}s, ignoring its result")
+            return None
+        except Exception as e:
+            print(f"❌ {branch_name} branch failed: {e}")
+            return None
+    
+    def analyze_messages(self, messages: List[str], user_id: str = "default_user", group_size: int = 8) -> List[Dict]:
+        """
+        Analyze a batch of messages, e.g. when re-moderating historical rows
+        
+        RAG encodes and queries all messages at once, and Knowledge Injection
+        packs group_size messages into each Llama prompt. Results come back in
+        input order, shaped like analyze_message results.
+        """
+        if not messages:
+            return []
+        
+        print(f"🔍 Hybrid batch analysis of {len(messages)} messages...")
+        
+        combined_results: List[Optional[Dict]] = [self._get_cached_verdict(message) for message in messages]
+        pending = [i for i, result in enumerate(combined_results) if result is None]
+        pending_messages = [messages[i] for i in pending]
+        
+        if pending_messages and self.cascade:
+            for i, result in zip(pending, self._analyze_cascade_batch(pending_messages, user_id, group_size)):
+                combined_results[i] = result
+        elif pending_messages:
+            # Batches have no per-branch deadline; backlog jobs wait for both systems
+            ki_future = self._executor.submit(self._analyze_batch_with_knowledge_injection, pending_messages, user_id, group_size)
+            rag_future = self._executor.submit(self._analyze_batch_with_rag, pending_messages)
+            ki_results = ki_future.result()
+            rag_results = rag_future.result()
+            
+            for i, message, ki_result, rag_result in zip(pending, pending_messages, ki_results, rag_results):
+                combined_results[i] = self._combine_results(ki_result, rag_result, message)
+                self._cache_verdict(message, combined_results[i], ki_result, rag_result)
+        
+        blocked = sum(1 for result in combined_results if result['flagged'])
+        print(f"✅ Hybrid batch analysis complete: {blocked}/{len(messages)} blocked")
+        return combined_results
+    
+    def _analyze_cascade(self, message: str, user_id: str) -> Dict:
+        """Cascade mode: keywords, then RAG, then Llama only if still uncertain"""
+        decided, rag_result = self._run_cheap_stages(message)
+        if decided is not None:
+            self._put_verdict(message, decided)
+            return decided
+        
+        self._record_cascade('llm_calls')
+        started = time.monotonic()
+        ki_future = self._executor.submit(self._analyze_with_knowledge_injection, message, user_id)
+        ki_result = self._collect_branch(ki_future, "Knowledge Injection", started)
+        
+        combined_result = self._combine_results(ki_result, rag_result, message)
+        self._cache_verdict(message, combined_result, ki_result, rag_result)
+        return combined_result
+    
+    async def _analyze_cascade_async(self, message: str, user_id: str) -> Dict:
+        """Async counterpart of _analyze_cascade"""
+        loop = asyncio.get_running_loop()
+        decided, rag_result = await loop.run_in_executor(self._executor, self._run_cheap_stages, message)
+        if decided is not None:
+            self._put_verdict(message, decided)
+            return decided
+        
+        self._record_cascade('llm_calls')
+        ki_result = await self._await_branch(
+            self._analyze_with_knowledge_injection_async(message, user_id), "Knowledge Injection"
+        )
+        
+        combined_result = self._combine_results(ki_result, rag_result, message)
+        self._cache_verdict(message, combined_result, ki_result, rag_result)
+        return combined_result
+    
+    def _analyze_cascade_batch(self, messages: List[str], user_id: str, group_size: int) -> List[Dict]:
+        """Cascade mode for batches: one RAG pass, then grouped Llama calls for the uncertain rest"""
+        results: List[Optional[Dict]] = [None] * len(messages)
+        keyword_hits = [self.knowledge_injection.detect_keywords(message) for message in messages]
+        
+        self._record_cascade('messages', len(messages))
+        for i, (message, hits) in enumerate(zip(messages, keyword_hits)):
+            results[i] = self._decide_by_keywords(message, *hits)
+        
+        remaining = [i for i, result in enumerate(results) if result is None]
+        rag_results = self._analyze_batch_with_rag([messages[i] for i in remaining])
+        rag_by_index = dict(zip(remaining, rag_results))
+        
+        for i in remaining:
+            results[i] = self._decide_by_rag(messages[i], keyword_hits[i][0], rag_by_index[i])
+        
+        for i, result in enumerate(results):
+            if result is not None:
+                self._put_verdict(messages[i], result)
+        
+        uncertain = [i for i, result in enumerate(results) if result is None]
+        if uncertain:
+            self._record_cascade('llm_calls', len(uncertain))
+            ki_results = self._analyze_batch_with_knowledge_injection(
+                [messages[i] for i in uncertain], user_id, group_size
+            )
+            for i, ki_result in zip(uncertain, ki_results):
+                results[i] = self._combine_results(ki_result, rag_by_index[i], messages[i])
+                self._cache_verdict(messages[i], results[i], ki_result, rag_by_index[i])
+        
+        return results
+    
+    def _run_cheap_stages(self, message: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Run the keyword and RAG stages; returns (decisive result or None, RAG result)"""
+        self._record_cascade('messages')
+        
+        detected_words, categories = self.knowledge_injection.detect_keywords(message)
+        decided = self._decide_by_keywords(message, detected_words, categories)
+        if decided is not None:
+            return decided, None
+        
+        rag_result = self._analyze_with_rag(message, "default_user")
+        return self._decide_by_rag(message, detected_words, rag_result), rag_result
+    
+    def _decide_by_keywords(self, message: str, detected_words: List[str], categories: List[str]) -> Optional[Dict]:
+        """A hard slur from the keyword stage is decisive on its own"""
+        if not self.HARD_KEYWORD_CATEGORIES.intersection(categories):
+            return None
+        
+        self._record_cascade('decided_by_keywords')
+        return {
+            "flagged": True,
+            "confidence": 0.95,
+            "detected_words": detected_words,
+            "categories": categories,
+            "context_analysis": "Combined analysis using cascade_keywords",
+            "alternatives": self.knowledge_injection._generate_rule_based_alternatives(message, detected_words),
+            "severity": "high",
+            "reasoning": "Hard derogatory term matched by the keyword stage; LLM skipped",
+            "detection_method": "cascade_keywords"
+        }
+    
+    def _decide_by_rag(self, message: str, detected_words: List[str], rag_result: Optional[Dict]) -> Optional[Dict]:
+        """Return a verdict if the RAG neighbours are decisive, else None to escalate to Llama"""
+        if rag_result is None:
+            return None
+        
+        flag_probability = self._rag_flag_probability(rag_result)
+        if detected_words:
+            # Soft keyword hits never let RAG clear a message on its own
+            flag_probability = max(flag_probability, 0.5)
+        
+        low, high = self.uncertainty_band
+        if low < flag_probability < high:
+            return None
+        
+        self._record_cascade('decided_by_rag')
+        result = dict(rag_result)
+        result["detected_words"] = list(dict.fromkeys(detected_words + rag_result.get("detected_words", [])))
+        result["context_analysis"] = "Combined analysis using cascade_rag"
+        result["detection_method"] = "cascade_rag"
+        result["reasoning"] = f"RAG neighbours decisive (flag probability {flag_probability:.2f}); LLM skipped"
+        if result["flagged"]:
+            result["severity"] = "high" if result.get("confidence", 0.0) > 0.8 else "medium"
+        else:
+            result["severity"] = "low"
+        return result
+    
+    def _rag_flag_probability(self, rag_result: Dict) -> float:
+        """Map a RAG verdict to a flag probability using similarity and neighbour agreement"""
+        neighbours = rag_result.get("neighbour_count", 0)
+        if not neighbours:
+            return 0.5
+        
+        misogyny_votes = rag_result.get("misogyny_votes", 0)
+        flagged = rag_result.get("flagged", False)
+        agreement = (misogyny_votes if flagged else neighbours - misogyny_votes) / neighbours
+        strength = rag_result.get("confidence", 0.0) * agreement
+        return 0.5 + 0.5 * strength if flagged else 0.5 - 0.5 * strength
+    
+    def _record_cascade(self, counter: str, amount: int = 1):
+        """Increment one of the cascade counters"""
+        with self._cascade_lock:
+            self._cascade_stats[counter] += amount
+    
+    def get_cascade_stats(self) -> Dict:
+        """How much traffic each cascade stage handled, including the fraction that reached Llama"""
+        with self._cascade_lock:
+            stats = dict(self._cascade_stats)
+        stats['llm_fraction'] = stats['llm_calls'] / stats['messages'] if stats['messages'] else 0.0
+        return stats
+    
+    def _collect_branch(self, future, branch_name: str, started: float) -> Optional[Dict]:
+        """Wait for one analysis branch, returning None if it misses the deadline"""
+        timeout = None
+        if self.branch_timeout is not None:
+            timeout = max(0.0, started + self.branch_timeout - time.monotonic())
+        
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            print(f"⏱️ {branch_name} did not finish within {self.branch_timeout}s, ignoring its result")
+            future.cancel()
+            return None
+        except Exception as e:
+            print(f"❌ {branch_name} branch failed: {e}")
+            return None
+    
+    def shutdown(self):
+        """Release the worker threads used for concurrent analysis"""
+        self._executor.shutdown(wait=False)
+    
     def _analyze_with_knowledge_injection(self, message: str, user_id: str) -> Dict:
         """Analyze using Knowledge Injection (Llama 3)"""
         try:
@@ -69,6 +479,59 @@ class HybridModerator:
                 'source': 'knowledge_injection'
             }
     
+    async def _analyze_with_knowledge_injection_async(self, message: str, user_id: str) -> Dict:
+        """Async counterpart of _analyze_with_knowledge_injection"""
+        try:
+            result = await self.knowledge_injection.analyze_message_async(message, user_id)
+            result['source'] = 'knowledge_injection'
+            return result
+        except Exception as e:
+            print(f"❌ Knowledge Injection failed: {e}")
+            return {
+                'flagged': False,
+                'confidence': 0.0,
+                'detected_words': [],
+                'categories': [],
+                'context_analysis': 'Knowledge Injection failed',
+                'alternatives': [],
+                'severity': 'low',
+                'reasoning': f'Knowledge Injection error: {e}',
+                'source': 'knowledge_injection'
+            }
+    
+    async def _analyze_with_rag_async(self, message: str, user_id: str) -> Optional[Dict]:
+        """Async counterpart of _analyze_with_rag"""
+        if not self.rag_system.is_available():
+            return None
+        
+        try:
+            return await self.rag_system.analyze_with_rag_async(message, executor=self._executor)
+        except Exception as e:
+            print(f"❌ RAG analysis failed: {e}")
+            return None
+    
+    def _analyze_batch_with_knowledge_injection(self, messages: List[str], user_id: str, group_size: int) -> List[Dict]:
+        """Analyze a batch using Knowledge Injection (Llama 3)"""
+        try:
+            results = self.knowledge_injection.analyze_messages(messages, group_size=group_size)
+            for result in results:
+                result['source'] = 'knowledge_injection'
+            return results
+        except Exception as e:
+            print(f"❌ Knowledge Injection batch failed: {e}")
+            return [self._analyze_with_knowledge_injection(message, user_id) for message in messages]
+    
+    def _analyze_batch_with_rag(self, messages: List[str]) -> List[Optional[Dict]]:
+        """Analyze a batch using RAG system"""
+        if not self.rag_system.is_available():
+            return [None] * len(messages)
+        
+        try:
+            return self.rag_system.analyze_with_rag_batch(messages)
+        except Exception as e:
+            print(f"❌ RAG batch analysis failed: {e}")
+            return [None] * len(messages)
+    
     def _analyze_with_rag(self, message: str, user_id: str) -> Optional[Dict]:
         """Analyze using RAG system"""
         if not self.rag_system.is_available():
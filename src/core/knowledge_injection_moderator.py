@@ -5,14 +5,56 @@ import re
 import requests
 import time
 import os
+import threading
 from ..utils.context_analyzer import ContextAnalyzer
+from ..utils.llm_json import JSONObjectScanner, extract_json_object
+from ..utils.lru_cache import LRUCache
+from ..utils.term_matcher import TermMatcher
+
+# Reasoning of keyword-only verdicts, so callers can tell them from Llama's
+FALLBACK_REASONING = "Fallback analysis using keyword matching"
+
+# Only flag if words are used in problematic contexts
+FALLBACK_PATTERNS = {
+    "derogatory_terms": ["bitch", "slut", "whore", "cunt"],
+    "devaluing_language": ["bossy", "hysterical", "irrational", "dramatic"],
+    "stereotypical_portrayals": ["run like a girl", "act like a lady", "man up"],
+    "objectification": ["hot babe", "sexy", "doll"],
+    "achievement_undermining": ["girlboss", "good girl", "diversity hire"],
+    "infantilizing_language": ["little lady", "good girl", "sweetie"],
+    "dismissive_language": ["crazy", "nuts", "psycho", "drama queen"]
+}
+
+# Knowledge base categories flagged on sight, derived forms included ("bitchy", "slutty"); the rest need Llama's context
+SLUR_CATEGORIES = ("derogatory_terms",)
 
 class KnowledgeInjectionModerator:
-    def __init__(self, knowledge_base_path: str = "data/knowledge_base/misogyny_knowledge_base.json"):
+    def __init__(self, knowledge_base_path: str = "data/knowledge_base/misogyny_knowledge_base.json",
+                 use_fallback_strategy: bool = True, stream_responses: bool = True, num_predict: int = 512,
+                 alternatives_store: Optional[LRUCache] = None, check_ollama: bool = True):
         self.knowledge_base = self.load_knowledge_base(knowledge_base_path)
         self.model = "llama3:8b"  # Updated to use llama3:8b
-        self.context_analyzer = ContextAnalyzer()
-        self.ollama_available = self._check_ollama_availability()
+        self.context_analyzer = ContextAnalyzer(alternatives_cache=alternatives_store)
+        # One matcher over the knowledge base and the fallback table; word-boundary aware so "hoe" no longer fires inside "shoe"
+        self.keyword_matcher = TermMatcher.from_knowledge_base(self.knowledge_base, FALLBACK_PATTERNS,
+                                                               derivational_categories=SLUR_CATEGORIES)
+        self.flagged_terms = self._build_flagged_terms()
+        # check_ollama=False starts in keyword mode; the caller probes later (see HybridModerator lazy start)
+        self.ollama_available = self._check_ollama_availability() if check_ollama else False
+        self._async_client = None
+        # Free-form prompt tried only when the structured request fails outright
+        self.use_fallback_strategy = use_fallback_strategy
+        self.strategy_stats: Dict[str, Dict] = {}
+        # Stream verdicts and stop at the closing brace; num_predict caps runaway replies
+        self.stream_responses = stream_responses
+        self.num_predict = num_predict
+        self._stats_lock = threading.Lock()
+    
+    def _get_async_client(self):
+        """Lazily create the shared Ollama AsyncClient"""
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient()
+        return self._async_client
         
     def _check_ollama_availability(self) -> bool:
         """Check if Ollama is available and working"""
@@ -27,6 +69,17 @@ class KnowledgeInjectionModerator:
             print("🔄 System will use fallback mode (keyword matching)")
             return False
     
+    def warm_up(self) -> bool:
+        """Send a one-token prompt so the model is loaded before the first real request"""
+        try:
+            ollama.chat(model='llama3', messages=[{'role': 'user', 'content': 'Reply with OK'}],
+                        options={'num_predict': 1})
+            print("✅ Llama 3 warmed up")
+            return True
+        except Exception as e:
+            print(f"⚠️ Llama 3 warm-up failed: {e}")
+            return False
+    
     def load_knowledge_base(self, path: str) -> Dict:
         """Load the knowledge base from JSON file"""
         try:
@@ -121,30 +174,40 @@ Focus on accuracy and provide detailed reasoning for your decision.
     
     def fallback_analysis(self, message: str) -> Dict:
         """Fallback analysis using simple keyword matching with contextual alternatives"""
+        detected_words, categories = self.detect_keywords(message)
+        
+        # Generate contextual alternatives
+        contextual_alternatives = self._generate_contextual_alternatives(message, detected_words)
+        
+        return self._build_fallback_result(detected_words, categories, contextual_alternatives)
+    
+    async def fallback_analysis_async(self, message: str) -> Dict:
+        """Async counterpart of fallback_analysis"""
+        detected_words, categories = self.detect_keywords(message)
+        contextual_alternatives = await self._generate_contextual_alternatives_async(message, detected_words)
+        return self._build_fallback_result(detected_words, categories, contextual_alternatives)
+    
+    def _build_flagged_terms(self) -> List[Tuple[str, str]]:
+        """(category, word) pairs detect_keywords flags: the fallback table, then the knowledge base slurs it lacks"""
+        flagged_terms = [(category, word) for category, words in FALLBACK_PATTERNS.items() for word in words]
+        for category in SLUR_CATEGORIES:
+            for word in self.knowledge_base.get("categories", {}).get(category, {}).get("words", []):
+                if (category, word) not in flagged_terms:
+                    flagged_terms.append((category, word))
+        return flagged_terms
+    
+    def detect_keywords(self, message: str) -> Tuple[List[str], List[str]]:
+        """Find problematic keywords and their categories; no LLM calls"""
         detected_words = []
         categories = []
         
-        # More context-aware keyword matching
-        message_lower = message.lower()
-        
-        # Only flag if words are used in problematic contexts
-        problematic_patterns = {
-            "derogatory_terms": ["bitch", "slut", "whore", "cunt"],
-            "devaluing_language": ["bossy", "hysterical", "irrational", "dramatic"],
-            "stereotypical_portrayals": ["run like a girl", "act like a lady", "man up"],
-            "objectification": ["hot babe", "sexy", "doll"],
-            "achievement_undermining": ["girlboss", "good girl", "diversity hire"],
-            "infantilizing_language": ["little lady", "good girl", "sweetie"],
-            "dismissive_language": ["crazy", "nuts", "psycho", "drama queen"]
-        }
-        
-        # Check for problematic patterns
-        for category, words in problematic_patterns.items():
-            for word in words:
-                if word.lower() in message_lower:
-                    detected_words.append(word)
-                    if category not in categories:
-                        categories.append(category)
+        # Single pass over the message, reported in pattern-table order as before
+        matched = {(match.category, match.term) for match in self.keyword_matcher.find_all(message)}
+        for category, word in self.flagged_terms:
+            if (category, word.lower()) in matched:
+                detected_words.append(word)
+                if category not in categories:
+                    categories.append(category)
         
         # Don't flag common words like "girl", "beautiful", "pretty", "lady" unless in problematic context
         # Additional context check for common words
@@ -153,57 +216,99 @@ Focus on accuracy and provide detailed reasoning for your decision.
             # Don't flag these words in simple greetings or compliments
             safe_words = ["girl", "beautiful", "pretty", "cute", "lady", "woman", "gorgeous", "stunning"]
             if word in safe_words and len(message.split()) <= 4:
-                flagged = False
                 detected_words = []
                 categories = []
         
+        return detected_words, categories
+    
+    def _build_fallback_result(self, detected_words: List[str], categories: List[str], alternatives: List[str]) -> Dict:
+        """Shape keyword matches into a moderation result"""
         flagged = len(detected_words) > 0
         
-        # Generate contextual alternatives
-        contextual_alternatives = self._generate_contextual_alternatives(message, detected_words)
-        
         return {
             "flagged": flagged,
             "confidence": 0.7 if flagged else 0.9,
             "detected_words": detected_words,
             "categories": categories,
             "context_analysis": f"Detected {len(detected_words)} potentially problematic words",
-            "alternatives": contextual_alternatives,
+            "alternatives": alternatives,
             "severity": "medium" if flagged else "low",
-            "reasoning": "Fallback analysis using keyword matching"
+            "reasoning": FALLBACK_REASONING
         }
     
     def _generate_contextual_alternatives(self, message: str, detected_words: List[str]) -> List[str]:
         """Generate contextually intelligent alternatives using AI and context analysis"""
-        alternatives = []
+        if not detected_words:
+            return []
+        
+        word_contexts = self._analyze_word_contexts(message, detected_words)
         
+        # One LLM request covers every detected word; memoized words skip it entirely
+        try:
+            per_word = self.context_analyzer.generate_ai_enhanced_alternatives_batch(message, word_contexts)
+        except Exception as e:
+            print(f"   AI alternatives failed: {e}")
+            per_word = {
+                word: self.context_analyzer.get_contextual_alternatives(word, context_analysis)
+                for word, context_analysis in word_contexts.items()
+            }
+        
+        return self._flatten_alternatives(detected_words, per_word)
+    
+    def _analyze_word_contexts(self, message: str, detected_words: List[str]) -> Dict[str, Dict]:
+        """Run analyze_context for each detected word"""
+        word_contexts = {}
         for word in detected_words:
             # Analyze context around the detected word
             context_analysis = self.context_analyzer.analyze_context(message, word)
+            word_contexts[word] = context_analysis
             
             print(f"🔍 Context Analysis for '{word}':")
             print(f"   Tone: {context_analysis['tone']}")
             print(f"   Context: {context_analysis['context']}")
             print(f"   Intent: {context_analysis['intent']}")
-            
-            # Try AI-enhanced alternatives first
-            try:
-                ai_alternatives = self.context_analyzer.generate_ai_enhanced_alternatives(
-                    message, word, context_analysis
-                )
-                alternatives.extend(ai_alternatives)
-                print(f"   AI Alternatives: {ai_alternatives}")
-            except Exception as e:
-                print(f"   AI alternatives failed: {e}")
-                # Fallback to rule-based alternatives
-                rule_alternatives = self.context_analyzer.get_contextual_alternatives(word, context_analysis)
-                alternatives.extend(rule_alternatives)
-                print(f"   Rule Alternatives: {rule_alternatives}")
+        return word_contexts
+    
+    def _flatten_alternatives(self, detected_words: List[str], per_word: Dict[str, List[str]]) -> List[str]:
+        """Merge per-word alternatives in detection order, deduplicated and limited to 5"""
+        alternatives = []
+        for word in detected_words:
+            word_alternatives = per_word.get(word, [])
+            print(f"   Alternatives for '{word}': {word_alternatives}")
+            alternatives.extend(word_alternatives)
         
         # Remove duplicates and limit
         unique_alternatives = list(dict.fromkeys(alternatives))  # Preserve order
         return unique_alternatives[:5]  # Limit to 5 alternatives
     
+    def _generate_rule_based_alternatives(self, message: str, detected_words: List[str]) -> List[str]:
+        """Contextual alternatives from the rule tables only, without any LLM calls"""
+        alternatives = []
+        for word in detected_words:
+            context_analysis = self.context_analyzer.analyze_context(message, word)
+            alternatives.extend(self.context_analyzer.get_contextual_alternatives(word, context_analysis))
+        
+        unique_alternatives = list(dict.fromkeys(alternatives))  # Preserve order
+        return unique_alternatives[:5]
+    
+    async def _generate_contextual_alternatives_async(self, message: str, detected_words: List[str]) -> List[str]:
+        """Async counterpart of _generate_contextual_alternatives"""
+        if not detected_words:
+            return []
+        
+        word_contexts = self._analyze_word_contexts(message, detected_words)
+        
+        try:
+            per_word = await self.context_analyzer.generate_ai_enhanced_alternatives_batch_async(message, word_contexts)
+        except Exception as e:
+            print(f"   AI alternatives failed: {e}")
+            per_word = {
+                word: self.context_analyzer.get_contextual_alternatives(word, context_analysis)
+                for word, context_analysis in word_contexts.items()
+            }
+        
+        return self._flatten_alternatives(detected_words, per_word)
+    
     def get_alternatives_for_word(self, word: str) -> List[str]:
         """Get specific alternatives for a detected word"""
         word_alternatives = {
@@ -300,6 +405,129 @@ Focus on accuracy and provide detailed reasoning for your decision.
             print("⚠️ Falling back to keyword matching")
             return self.fallback_analysis(message)
     
+    async def analyze_message_async(self, message: str, user_id: str = "default_user") -> Dict:
+        """Async counterpart of analyze_message; Llama calls go through the Ollama AsyncClient"""
+        if not self.ollama_available:
+            print("🔄 Using fallback mode (Ollama not available)")
+            return await self.fallback_analysis_async(message)
+        
+        try:
+            result = await self._analyze_with_llama_async(message)
+            if result:
+                return result
+            else:
+                print("⚠️ Llama 3 analysis failed, using fallback")
+                return await self.fallback_analysis_async(message)
+        except Exception as e:
+            print(f"Analysis failed: {e}")
+            print("⚠️ Falling back to keyword matching")
+            return await self.fallback_analysis_async(message)
+    
+    def analyze_messages(self, messages: List[str], group_size: int = 8) -> List[Dict]:
+        """
+        Analyze many messages, packing several of them into each Llama prompt
+        
+        Returns one result per message, in input order, shaped like analyze_message
+        """
+        if not self.ollama_available:
+            print("🔄 Using fallback mode (Ollama not available)")
+            return [self.fallback_analysis(message) for message in messages]
+        
+        results = []
+        for start in range(0, len(messages), group_size):
+            group = messages[start:start + group_size]
+            print(f"📦 Analyzing messages {start + 1}-{start + len(group)} of {len(messages)}")
+            
+            try:
+                group_results = self._analyze_group_with_llama(group)
+            except Exception as e:
+                print(f"❌ Grouped analysis failed: {e}")
+                group_results = [None] * len(group)
+            
+            # Anything the grouped reply did not cover goes through the single-message path
+            for message, result in zip(group, group_results):
+                results.append(result if result else self.analyze_message(message))
+        
+        return results
+    
+    def create_batch_prompt(self, messages: List[str]) -> str:
+        """Create a prompt asking Llama to judge several numbered messages at once"""
+        numbered = "\n".join(f'{i}: {json.dumps(message)}' for i, message in enumerate(messages))
+        
+        return f"""
+You are a content moderation expert. Analyze each numbered message below for potentially problematic language patterns.
+
+Messages:
+{numbered}
+
+Consider:
+- Context and intent
+- Power dynamics
+- Gender stereotypes
+- Harmful language patterns
+
+Judge every message on its own. Respond with JSON only, one entry per message:
+{{
+    "results": [
+        {{
+            "index": 0,
+            "flagged": true/false,
+            "detected_words": ["word1", "word2"],
+            "categories": ["category1", "category2"],
+            "confidence": 0.0-1.0,
+            "reasoning": "explanation"
+        }}
+    ]
+}}
+"""
+    
+    def _analyze_group_with_llama(self, messages: List[str]) -> List[Optional[Dict]]:
+        """Run one Llama generation for a group of messages; None marks messages it did not answer"""
+        response = ollama.chat(model='llama3', messages=[
+            {
+                'role': 'user',
+                'content': self.create_batch_prompt(messages)
+            }
+        ], format='json', options={'num_predict': self.num_predict * len(messages)})
+        content = response['message']['content']
+        
+        results: List[Optional[Dict]] = [None] * len(messages)
+        parsed = extract_json_object(content)
+        if parsed is None:
+            print("❌ Grouped reply failed to parse JSON")
+            return results
+        
+        entries = parsed.get('results', [])
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            index = entry.pop('index', None)
+            if isinstance(index, int) and 0 <= index < len(messages) and results[index] is None:
+                results[index] = self._finalize_llama_result(messages[index], entry)
+        
+        return results
+    
+    def prewarm_alternatives(self) -> int:
+        """
+        Seed the alternatives store from the word table and knowledge base
+        
+        Existing entries are kept; returns the number of seed entries offered.
+        """
+        word_alternatives = {}
+        for category_data in self.knowledge_base.get("categories", {}).values():
+            for word in category_data.get("words", []):
+                defaults = self.get_alternatives_for_word(word) + category_data.get("alternatives", [])
+                word_alternatives[word] = list(dict.fromkeys(defaults))
+        
+        seeds = self.context_analyzer.build_seed_alternatives(word_alternatives)
+        store = self.context_analyzer.alternatives_cache
+        if hasattr(store, 'seed'):
+            return store.seed(seeds)
+        
+        for key, alternatives in seeds.items():
+            store.put(key, alternatives)
+        return len(seeds)
+    
     def get_alternatives(self, categories: List[str]) -> List[str]:
         """Get alternative words for detected categories"""
         alternatives = []
@@ -324,9 +552,138 @@ Focus on accuracy and provide detailed reasoning for your decision.
             } 
 
     def _analyze_with_llama(self, message: str) -> Dict:
-        """Test direct Llama 3 analysis with different prompting strategies"""
+        """
+        Analyze with one structured-output Llama request
+        
+        The primary strategy asks Ollama for JSON-constrained output; the
+        fallback prompt is only tried when that request fails outright.
+        """
+        for strategy_name, prompt, output_format in self._build_llama_strategies(message):
+            started = time.perf_counter()
+            result = None
+            try:
+                print(f"Testing {strategy_name} strategy...")
+                content = self._generate_verdict(prompt, output_format)
+                result = self._parse_strategy_response(strategy_name, content)
+            except Exception as e:
+                print(f"❌ {strategy_name} strategy error: {e}")
+            
+            self._record_strategy(strategy_name, result is not None, time.perf_counter() - started)
+            if result is not None:
+                result = self._finalize_llama_result(message, result)
+                print(f"✅ {strategy_name} strategy worked!")
+                return result
         
-        # Strategy 1: Academic analysis prompt
+        print("❌ All Llama 3 strategies failed")
+        return None 
+    
+    async def _analyze_with_llama_async(self, message: str) -> Dict:
+        """Async counterpart of _analyze_with_llama using the Ollama AsyncClient"""
+        for strategy_name, prompt, output_format in self._build_llama_strategies(message):
+            started = time.perf_counter()
+            result = None
+            try:
+                print(f"Testing {strategy_name} strategy...")
+                content = await self._generate_verdict_async(prompt, output_format)
+                result = self._parse_strategy_response(strategy_name, content)
+            except Exception as e:
+                print(f"❌ {strategy_name} strategy error: {e}")
+            
+            self._record_strategy(strategy_name, result is not None, time.perf_counter() - started)
+            if result is not None:
+                result = await self._finalize_llama_result_async(message, result)
+                print(f"✅ {strategy_name} strategy worked!")
+                return result
+        
+        print("❌ All Llama 3 strategies failed")
+        return None
+    
+    def _chat_options(self, output_format: Optional[str]) -> Dict:
+        """Extra ollama.chat arguments for a strategy"""
+        options = {'options': {'num_predict': self.num_predict}}
+        if output_format:
+            options['format'] = output_format
+        return options
+    
+    def _generate_verdict(self, prompt: str, output_format: Optional[str]) -> str:
+        """
+        Generate a verdict reply, streaming when enabled
+        
+        Streaming stops the generation as soon as a complete JSON object has
+        been received, so trailing prose is never generated.
+        """
+        messages = [{'role': 'user', 'content': prompt}]
+        if not self.stream_responses:
+            response = ollama.chat(model='llama3', messages=messages, **self._chat_options(output_format))
+            return response['message']['content']
+        
+        scanner = JSONObjectScanner()
+        received = []
+        stream = ollama.chat(model='llama3', messages=messages, stream=True, **self._chat_options(output_format))
+        try:
+            for part in stream:
+                chunk = part['message']['content']
+                received.append(chunk)
+                if scanner.feed(chunk):
+                    break
+        finally:
+            # Closing the generator drops the HTTP stream and ends generation server-side
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+        
+        return scanner.text if scanner.complete else ''.join(received)
+    
+    async def _generate_verdict_async(self, prompt: str, output_format: Optional[str]) -> str:
+        """Async counterpart of _generate_verdict"""
+        client = self._get_async_client()
+        messages = [{'role': 'user', 'content': prompt}]
+        if not self.stream_responses:
+            response = await client.chat(model='llama3', messages=messages, **self._chat_options(output_format))
+            return response['message']['content']
+        
+        scanner = JSONObjectScanner()
+        received = []
+        stream = await client.chat(model='llama3', messages=messages, stream=True, **self._chat_options(output_format))
+        try:
+            async for part in stream:
+                chunk = part['message']['content']
+                received.append(chunk)
+                if scanner.feed(chunk):
+                    break
+        finally:
+            aclose = getattr(stream, 'aclose', None)
+            if aclose:
+                await aclose()
+        
+        return scanner.text if scanner.complete else ''.join(received)
+    
+    def _record_strategy(self, strategy_name: str, succeeded: bool, latency: float):
+        """Track success and latency per prompting strategy"""
+        with self._stats_lock:
+            stats = self.strategy_stats.setdefault(
+                strategy_name, {'attempts': 0, 'successes': 0, 'failures': 0, 'total_latency': 0.0}
+            )
+            stats['attempts'] += 1
+            stats['successes' if succeeded else 'failures'] += 1
+            stats['total_latency'] += latency
+    
+    def get_strategy_stats(self) -> Dict[str, Dict]:
+        """Per-strategy attempts, success rate and mean latency in seconds"""
+        with self._stats_lock:
+            return {
+                name: {
+                    **stats,
+                    'success_rate': stats['successes'] / stats['attempts'] if stats['attempts'] else 0.0,
+                    'avg_latency': stats['total_latency'] / stats['attempts'] if stats['attempts'] else 0.0
+                }
+                for name, stats in self.strategy_stats.items()
+            }
+    
+    def _build_llama_strategies(self, message: str) -> List[Tuple[str, str, Optional[str]]]:
+        """Build the (name, prompt, output format) triples tried in order by _analyze_with_llama"""
+        
+        # Primary: academic analysis prompt with JSON-constrained decoding
         academic_prompt = f"""
 You are a content moderation expert. Analyze this message for potentially problematic language patterns.
 
@@ -349,7 +706,7 @@ Respond with JSON only:
 }}
 """
         
-        # Strategy 2: Research analysis prompt
+        # Fallback for hard failures: research analysis prompt, free-form output
         research_prompt = f"""
 As a researcher studying communication patterns, analyze this message:
 
@@ -371,84 +728,56 @@ Return JSON:
 }}
 """
         
-        # Strategy 3: Neutral analysis prompt
-        neutral_prompt = f"""
-Analyze this message for content patterns:
-
-"{message}"
-
-Return analysis in JSON format:
-{{
-    "flagged": true/false,
-    "detected_words": [],
-    "categories": [],
-    "confidence": 0.0,
-    "reasoning": "",
-    "alternatives": []
-}}
-"""
+        strategies = [("Structured", academic_prompt, "json")]
+        if self.use_fallback_strategy:
+            strategies.append(("Research", research_prompt, None))
+        return strategies
+    
+    def _parse_strategy_response(self, strategy_name: str, content: str) -> Optional[Dict]:
+        """Extract the JSON verdict from a strategy's reply, or None if there is none"""
+        print(f"Response: {content}")
         
-        strategies = [
-            ("Academic", academic_prompt),
-            ("Research", research_prompt),
-            ("Neutral", neutral_prompt)
-        ]
+        result = extract_json_object(content)
+        if result is None:
+            print(f"❌ {strategy_name} strategy failed to parse JSON")
+        return result
+    
+    def _finalize_llama_result(self, message: str, result: Dict) -> Dict:
+        """Apply safe-word overrides and contextual alternatives to a parsed Llama verdict"""
+        if self._apply_safe_word_override(message, result):
+            return result
         
-        for strategy_name, prompt in strategies:
-            try:
-                print(f"Testing {strategy_name} strategy...")
-                response = ollama.chat(model='llama3', messages=[
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ])
-                
-                # Try to extract JSON
-                content = response['message']['content']
-                print(f"Response: {content}")
-                
-                # Look for JSON in response
-                try:
-                    # Find JSON in the response
-                    start = content.find('{')
-                    end = content.rfind('}') + 1
-                    if start != -1 and end != 0:
-                        json_str = content[start:end]
-                        result = json.loads(json_str)
-                        
-                        # Use context-aware alternatives
-                        detected_words = result.get('detected_words', [])
-                        
-                        # Override overly aggressive Llama 3 responses for safe words
-                        safe_words = ["girl", "beautiful", "pretty", "cute", "lady", "woman", "gorgeous", "stunning"]
-                        if detected_words and len(detected_words) == 1:
-                            word = detected_words[0].lower()
-                            if word in safe_words and len(message.split()) <= 4:
-                                # Override Llama 3's overly aggressive response
-                                result['flagged'] = False
-                                result['detected_words'] = []
-                                result['categories'] = []
-                                result['confidence'] = 0.9
-                                result['reasoning'] = "Safe word used in appropriate context"
-                                result['alternatives'] = []
-                                print(f"✅ {strategy_name} strategy worked! (Overridden for safe word)")
-                                return result
-                        
-                        result['alternatives'] = self._generate_contextual_alternatives(message, detected_words)
-                        
-                        print(f"✅ {strategy_name} strategy worked!")
-                        return result
-                except json.JSONDecodeError:
-                    print(f"❌ {strategy_name} strategy failed to parse JSON")
-                    continue
-                    
-            except Exception as e:
-                print(f"❌ {strategy_name} strategy error: {e}")
-                continue
+        # Use context-aware alternatives
+        result['alternatives'] = self._generate_contextual_alternatives(message, result.get('detected_words', []))
+        return result
+    
+    async def _finalize_llama_result_async(self, message: str, result: Dict) -> Dict:
+        """Async counterpart of _finalize_llama_result"""
+        if self._apply_safe_word_override(message, result):
+            return result
         
-        print("❌ All Llama 3 strategies failed")
-        return None 
+        result['alternatives'] = await self._generate_contextual_alternatives_async(message, result.get('detected_words', []))
+        return result
+    
+    def _apply_safe_word_override(self, message: str, result: Dict) -> bool:
+        """Override overly aggressive Llama 3 responses for safe words; True if overridden"""
+        detected_words = result.get('detected_words', [])
+        
+        safe_words = ["girl", "beautiful", "pretty", "cute", "lady", "woman", "gorgeous", "stunning"]
+        if detected_words and len(detected_words) == 1:
+            word = detected_words[0].lower()
+            if word in safe_words and len(message.split()) <= 4:
+                # Override Llama 3's overly aggressive response
+                result['flagged'] = False
+                result['detected_words'] = []
+                result['categories'] = []
+                result['confidence'] = 0.9
+                result['reasoning'] = "Safe word used in appropriate context"
+                result['alternatives'] = []
+                print("✅ Overridden for safe word")
+                return True
+        
+        return False
     
     def _generate_alternatives_for_detected_words(self, detected_words: List[str]) -> List[str]:
         """Generate alternatives for detected words"""
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+ContentModerationDB Schema Migrations
+Numbered schema steps tracked in PRAGMA user_version, plus a query-plan check for the hot queries
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Per-user counts recomputed from all_messages; used by migration 3 and ContentModerationDB.rebuild_message_stats
+USER_MESSAGE_STATS_FROM_MESSAGES = '''
+    SELECT user_id,
+           COUNT(*),
+           SUM(CASE WHEN is_flagged THEN 1 ELSE 0 END),
+           SUM(CASE WHEN NOT is_flagged THEN 1 ELSE 0 END)
+    FROM all_messages
+    GROUP BY user_id
+'''
+
+# (version, description, statements); append new steps, never edit applied ones
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "base tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS all_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_flagged BOOLEAN DEFAULT FALSE,
+            flagged_message_id INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (flagged_message_id) REFERENCES flagged_messages (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS flagged_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            flagged_words TEXT NOT NULL,
+            categories TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            alternatives TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            is_challenged BOOLEAN DEFAULT FALSE,
+            challenge_status TEXT DEFAULT 'pending'
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_violations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            violation_count INTEGER DEFAULT 0,
+            last_violation DATETIME,
+            is_banned BOOLEAN DEFAULT FALSE,
+            training_completed BOOLEAN DEFAULT FALSE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS challenge_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            flagged_message_id INTEGER,
+            user_id TEXT NOT NULL,
+            challenge_reason TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            reviewer_notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            reviewed_at DATETIME,
+            FOREIGN KEY (flagged_message_id) REFERENCES flagged_messages (id)
+        )
+        '''
+    ]),
+    (2, "indexes for the hot queries", [
+        # get_all_messages(user_id) in timestamp order; covers get_message_stats(user_id) (replaced in 4)
+        'CREATE INDEX IF NOT EXISTS idx_all_messages_user_time ON all_messages (user_id, timestamp, is_flagged)',
+        # get_all_messages() without a user
+        'CREATE INDEX IF NOT EXISTS idx_all_messages_time ON all_messages (timestamp)',
+        # approve_challenge's UPDATE and the get_approved_messages join
+        'CREATE INDEX IF NOT EXISTS idx_all_messages_flagged_message ON all_messages (flagged_message_id)',
+        # get_pending_challenges: filter on status, newest first
+        'CREATE INDEX IF NOT EXISTS idx_challenge_requests_status_created ON challenge_requests (status, created_at)',
+        # get_approved_messages: challenges of a flagged message with a given status
+        'CREATE INDEX IF NOT EXISTS idx_challenge_requests_flagged_status ON challenge_requests (flagged_message_id, status)',
+        # get_user_violations and every flagged insert
+        'CREATE INDEX IF NOT EXISTS idx_user_violations_user ON user_violations (user_id)'
+    ]),
+    (3, "per-user message counters", [
+        '''
+        CREATE TABLE IF NOT EXISTS user_message_stats (
+            user_id TEXT PRIMARY KEY,
+            total_messages INTEGER NOT NULL DEFAULT 0,
+            flagged_messages INTEGER NOT NULL DEFAULT 0,
+            clean_messages INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+        'INSERT INTO user_message_stats (user_id, total_messages, flagged_messages, clean_messages) '
+        + USER_MESSAGE_STATS_FROM_MESSAGES
+    ]),
+    (4, "keyset pagination on (timestamp, id)", [
+        # Per-user listings page on (timestamp, id); with is_flagged in between the id tiebreak needed a sort
+        'DROP INDEX IF EXISTS idx_all_messages_user_time',
+        'CREATE INDEX IF NOT EXISTS idx_all_messages_user_time_id ON all_messages (user_id, timestamp, id)'
+    ])
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+class QueryPlanRegression(AssertionError):
+    """A hot query no longer uses its index, scans a whole table or sorts in a temp b-tree"""
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> List[int]:
+    """
+    Apply every migration above the database's user_version, up to target
+
+    Each step runs in its own transaction together with the user_version
+    bump, so an interrupted upgrade resumes from the last completed step.
+    Databases created before versioning report 0; step 1 only creates
+    missing tables, so they upgrade in place. Returns the versions applied.
+    """
+    target = LATEST_VERSION if target is None else target
+    current = schema_version(conn)
+    applied = []
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"✅ Migrated database to version {version}: {description}")
+        applied.append(version)
+
+    return applied
+
+
+# The hot queries as ContentModerationDB issues them, with the index each must use
+HOT_QUERIES: Dict[str, Tuple[str, tuple, str]] = {
+    'get_all_messages(user_id)': ('''
+        SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp
+        FROM all_messages WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?
+    ''', ('user_1', 100), 'idx_all_messages_user_time_id'),
+    'get_messages_page(user_id, cursor)': ('''
+        SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp
+        FROM all_messages WHERE user_id = ? AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?
+    ''', ('user_1', '2024-01-01 12:00:00', 50000, 100), 'idx_all_messages_user_time_id'),
+    'get_all_messages()': ('''
+        SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp
+        FROM all_messages ORDER BY timestamp DESC, id DESC LIMIT ?
+    ''', (100,), 'idx_all_messages_time'),
+    'get_messages_page(cursor)': ('''
+        SELECT id, user_id, message, is_flagged, flagged_message_id, timestamp
+        FROM all_messages WHERE (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?
+    ''', ('2024-01-01 12:00:00', 50000, 100), 'idx_all_messages_time'),
+    'get_message_stats(user_id)': ('''
+        SELECT total_messages, flagged_messages, clean_messages
+        FROM user_message_stats WHERE user_id = ?
+    ''', ('user_1',), 'PRIMARY KEY'),
+    'get_approved_messages': ('''
+        SELECT am.id, am.message, am.timestamp, cr.reviewer_notes
+        FROM all_messages am
+        JOIN flagged_messages fm ON am.flagged_message_id = fm.id
+        JOIN challenge_requests cr ON fm.id = cr.flagged_message_id
+        WHERE am.user_id = ? AND cr.status = 'approved'
+        ORDER BY am.timestamp DESC, am.id DESC LIMIT ?
+    ''', ('user_1', 50), 'idx_all_messages_user_time_id'),
+    'approve_challenge update': ('''
+        UPDATE all_messages SET is_flagged = FALSE WHERE flagged_message_id = ?
+    ''', (1,), 'idx_all_messages_flagged_message'),
+    'get_pending_challenges': ('''
+        SELECT cr.id, cr.user_id, cr.challenge_reason, cr.created_at, fm.message, fm.flagged_words, fm.categories
+        FROM challenge_requests cr
+        JOIN flagged_messages fm ON cr.flagged_message_id = fm.id
+        WHERE cr.status = 'pending'
+        ORDER BY cr.created_at DESC, cr.id DESC LIMIT ?
+    ''', (50,), 'idx_challenge_requests_status_created'),
+    'get_pending_challenges_page(cursor)': ('''
+        SELECT cr.id, cr.user_id, cr.challenge_reason, cr.created_at, fm.message, fm.flagged_words, fm.categories
+        FROM challenge_requests cr
+        JOIN flagged_messages fm ON cr.flagged_message_id = fm.id
+        WHERE cr.status = 'pending' AND (cr.created_at, cr.id) < (?, ?)
+        ORDER BY cr.created_at DESC, cr.id DESC LIMIT ?
+    ''', ('2024-01-01 12:00:00', 5000, 50), 'idx_challenge_requests_status_created'),
+    'get_user_violations': ('''
+        SELECT violation_count, is_banned, training_completed, last_violation
+        FROM user_violations WHERE user_id = ?
+    ''', ('user_1',), 'idx_user_violations_user')
+}
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines"""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def check_query_plans(conn: sqlite3.Connection, queries: Optional[Dict[str, Tuple[str, tuple, str]]] = None) -> Dict[str, List[str]]:
+    """
+    Regression check: every hot query uses its index and never scans a whole table
+
+    Raises QueryPlanRegression naming the offending query and its plan,
+    explicitly rather than with assert, so it also fails under python -O.
+    Returns the plans so callers can print them.
+    """
+    plans = {}
+    for name, (sql, params, index) in (queries or HOT_QUERIES).items():
+        plan = query_plan(conn, sql, params)
+        plans[name] = plan
+        if any(step.startswith('SCAN') and 'USING' not in step for step in plan):
+            raise QueryPlanRegression(f"{name} scans a whole table: {plan}")
+        if not any(index in step for step in plan):
+            raise QueryPlanRegression(f"{name} does not use {index}: {plan}")
+        if any('TEMP B-TREE' in step for step in plan):
+            raise QueryPlanRegression(f"{name} sorts in a temp b-tree: {plan}")
+    return plans
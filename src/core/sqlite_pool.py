@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+SQLite Connection Pool
+Long-lived read connections plus one writer thread that owns the only write connection
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_STOP = object()
+
+
+def connect(db_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """Open a connection and apply the PRAGMAs once, for its whole lifetime"""
+    conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer and vice versa
+    conn.execute("PRAGMA synchronous=NORMAL")  # Faster writes
+    conn.execute("PRAGMA cache_size=10000")  # Larger cache
+    conn.execute("PRAGMA temp_store=MEMORY")  # Use memory for temp tables
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+class ReadConnectionPool:
+    """
+    Bounded pool of read-only connections
+
+    Connections are opened on first use, up to size, and then reused; a
+    caller that finds the pool empty and at capacity waits for one to be
+    returned. Under WAL each reader sees the last committed snapshot and
+    never waits for the writer.
+    """
+
+    def __init__(self, db_path: str, size: int = 4):
+        self.db_path = db_path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return connect(self.db_path, read_only=True)
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the block"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            # End the read transaction so the next borrower sees fresh commits
+            conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        """Close the idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class SingleWriter:
+    """
+    One thread and one connection for every write
+
+    Callers submit a function taking the connection; it runs on the writer
+    thread inside a transaction that is committed when the function returns
+    and rolled back if it raises. The future resolves to its return value.
+    Writes are serialized without a Python lock and nothing on the request
+    path opens a connection.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._worker.start()
+
+    def submit(self, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue a write; the future resolves once it is committed"""
+        future: Future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Submit a write and wait for its commit"""
+        return self.submit(fn).result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            fn, future = item
+            # A write whose caller cancelled it is skipped, not run
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._execute(fn, future)
+            except Exception as e:
+                # Never let one write take the thread down; every later write would wait forever
+                print(f"❌ SQLite writer could not finish a write: {e}")
+                if not future.done():
+                    future.set_exception(e)
+
+    def _execute(self, fn: Callable[[sqlite3.Connection], Any], future: Future):
+        try:
+            result = fn(self.conn)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def close(self):
+        """Finish the queued writes, then stop the thread and close the connection"""
+        if not self._worker.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._worker.join()
+        self.conn.close()
+
+
+class WriteBehindBuffer:
+    """
+    Group commit in front of a SingleWriter
+
+    add() buffers an item and returns a future at once. Buffered items are
+    handed to flush_fn(conn, items) in one writer transaction when
+    flush_rows are waiting or flush_interval_ms after the oldest one
+    arrived, whichever is first; flush_fn returns one result per item
+    (e.g. the row id) and each future resolves to its own. If the group
+    fails it is retried row by row, so only the offending rows' futures
+    fail, and every lost row is logged. Items cancelled before their group
+    is dispatched are not written. flush() and close() write everything
+    out immediately.
+    """
+
+    def __init__(self, writer: SingleWriter, flush_fn: Callable[[sqlite3.Connection, List[Any]], List[Any]],
+                 flush_rows: int = 256, flush_interval_ms: float = 50.0):
+        self.writer = writer
+        self.flush_fn = flush_fn
+        self.flush_rows = flush_rows
+        self.flush_interval_ms = flush_interval_ms
+        self._pending: List[Tuple[Any, Future]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.flushes = 0
+        self.rows = 0
+        self._flusher = threading.Thread(target=self._run, name="sqlite-write-behind", daemon=True)
+        self._flusher.start()
+
+    def add(self, item: Any) -> Future:
+        """Buffer one item; the future resolves once its group is committed"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write-behind buffer is closed")
+            self._pending.append((item, future))
+            first = len(self._pending) == 1
+            full = len(self._pending) >= self.flush_rows
+        if full:
+            self.dispatch()
+        elif first:
+            # Start the flush_interval_ms clock for this group
+            self._wake.set()
+        return future
+
+    def dispatch(self) -> Optional[Future]:
+        """Queue the buffered items on the writer without waiting; returns the writer's future"""
+        with self._lock:
+            # Items whose caller cancelled the future are dropped; the rest can no longer be cancelled
+            batch = [(item, future) for item, future in self._pending if future.set_running_or_notify_cancel()]
+            self._pending = []
+            if not batch:
+                return None
+            # Submit under the lock so groups reach the writer in arrival order
+            items = [item for item, _ in batch]
+            group = self.writer.submit(lambda conn: self._write_group(conn, items))
+            self.flushes += 1
+            self.rows += len(batch)
+
+        def resolve(done: Future):
+            error = done.exception()
+            results = [error] * len(batch) if error else done.result()
+            for (_, future), result in zip(batch, results):
+                try:
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+                except Exception as e:
+                    print(f"❌ Could not resolve a buffered write: {e}")
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                # Fire-and-forget callers never look at their future, so say it here
+                print(f"❌ Write-behind lost {len(errors)} of {len(batch)} buffered rows: {errors[0]}")
+
+        group.add_done_callback(resolve)
+        return group
+
+    def _write_group(self, conn: sqlite3.Connection, items: List[Any]) -> List[Any]:
+        """
+        Write a group in one transaction; if that fails, retry it row by row
+        so one bad row only fails its own future, not everyone buffered with it
+        """
+        try:
+            return self.flush_fn(conn, items)
+        except Exception as e:
+            conn.rollback()
+            if len(items) == 1:
+                raise
+            print(f"⚠️ Group commit of {len(items)} rows failed ({e}); retrying row by row")
+
+        results: List[Any] = []
+        for item in items:
+            try:
+                results.extend(self.flush_fn(conn, [item]))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                results.append(e)
+        return results
+
+    def flush(self):
+        """Commit everything buffered so far and wait for it"""
+        group = self.dispatch()
+        if group is not None:
+            group.exception()
+        else:
+            # Wait out a group the flusher thread may have just handed over
+            self.writer.run(lambda conn: None)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                return
+            time.sleep(self.flush_interval_ms / 1000.0)
+            self.dispatch()
+
+    def stats(self) -> Dict:
+        """Group commit counters for monitoring"""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'flushes': self.flushes,
+                'rows': self.rows,
+                'avg_rows_per_flush': self.rows / self.flushes if self.flushes else 0.0,
+                'flush_rows': self.flush_rows,
+                'flush_interval_ms': self.flush_interval_ms
+            }
+
+    def close(self):
+        """Stop accepting items and durably write out the rest"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
@@ -9,8 +9,14 @@ import re
 import nltk
 from nltk.tokenize import sent_tokenize
 import logging
+import os
+import sys
 from typing import List, Dict
 
+# Step scripts run standalone from this directory; make the project root importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.term_matcher import TermMatcher
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,6 +39,7 @@ class HybridChunker:
             'emotional', 'hysterical', 'bossy', 'aggressive', 'feminine',
             'mother', 'wife', 'girlfriend', 'daughter', 'sister'
         ]
+        self.keyword_matcher = TermMatcher({'misogyny': self.misogyny_keywords})
     
     def load_data(self, filename='combined_misogyny_data.csv'):
         """Load the combined dataset"""
@@ -72,8 +79,7 @@ class HybridChunker:
     
     def has_misogyny_content(self, text):
         """Check if text contains misogyny-related keywords"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.misogyny_keywords)
+        return self.keyword_matcher.contains_any(text)
     
     def chunk_short_text(self, text):
         """For short texts (≤150 chars): keep as-is"""
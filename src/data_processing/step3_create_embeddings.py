@@ -6,27 +6,34 @@ This converts text chunks into numbers that RAG can search quickly
 
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import logging
+import os
+import sys
 import time
 from typing import List, Dict, Tuple
 import pickle
 
+# Step scripts run standalone from this directory; make the project root importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.rag_system.onnx_encoder import DEFAULT_ONNX_DIR, load_encoder
+from src.rag_system.vector_index import NumpyIndex
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class EmbeddingGenerator:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, model_name='all-MiniLM-L6-v2', backend='torch', onnx_dir=DEFAULT_ONNX_DIR):
         """
         Initialize the embedding generator
         all-MiniLM-L6-v2 is a fast, good quality model for text similarity
+        backend 'onnx' / 'onnx-int8' encodes with the exported ONNX graph on CPU
         """
         logger.info("🚀 Starting Embedding Generation...")
-        logger.info(f"📦 Loading model: {model_name}")
+        logger.info(f"📦 Loading model: {model_name} ({backend})")
         
         try:
-            self.model = SentenceTransformer(model_name)
+            self.model, self.encoder_name = load_encoder(model_name, backend, onnx_dir)
             logger.info("✅ Model loaded successfully!")
             logger.info(f"📊 Model info:")
             logger.info(f"   - Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
@@ -160,6 +167,21 @@ class EmbeddingGenerator:
         
         return pickle_filename
     
+    def save_quantized_corpus(self, df, directory='embedding_corpus'):
+        """
+        Save the memory-mapped corpus: normalized float32, int8 and float16 matrices plus label/text columns
+        SimpleRAGDetector maps this directory directly (embeddings_path=directory), shared by every worker
+        """
+        logger.info(f"💾 Saving quantized corpus to {directory}...")
+        
+        index = NumpyIndex.from_dataframe(df)
+        sizes = index.save_corpus_dir(directory)
+        
+        logger.info(f"📊 int8 is {sizes['vectors_float32'] / (sizes['vectors_int8'] + sizes['scales_int8']):.1f}x "
+                    f"and float16 {sizes['vectors_float32'] / sizes['vectors_float16']:.1f}x smaller than float32")
+        
+        return directory
+    
     def create_vector_database_info(self, df):
         """
         Create information for vector database setup
@@ -258,7 +280,10 @@ def main():
     # Step 4: Save embeddings
     filename = generator.save_embeddings(df_with_embeddings)
     
-    # Step 5: Create vector database info
+    # Step 5: Save the quantized corpus for in-process indexes
+    corpus_dir = generator.save_quantized_corpus(df_with_embeddings)
+    
+    # Step 6: Create vector database info
     db_info = generator.create_vector_database_info(df_with_embeddings)
     
     # Summary
@@ -267,6 +292,7 @@ def main():
     logger.info(f"   - Generated {analysis['total_embeddings']} embeddings")
     logger.info(f"   - Each embedding has {analysis['embedding_dimension']} numbers")
     logger.info(f"   - Saved to {filename}")
+    logger.info(f"   - Quantized corpus in {corpus_dir}/")
     logger.info(f"   - Ready for vector database setup!")
     
     logger.info("\n🚀 Next Step: Set up vector database for similarity search")
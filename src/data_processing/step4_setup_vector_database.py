@@ -12,28 +12,37 @@ import logging
 import time
 from typing import List, Dict, Any
 import os
+import sys
+
+# Step scripts run standalone from this directory; make the project root importable
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(PROJECT_ROOT)
+from src.rag_system.chroma_store import DEFAULT_CHROMA_PATH, existing_ids, get_persistent_client
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class VectorDatabaseSetup:
-    def __init__(self, db_name="misogyny_detection_db"):
+    def __init__(self, db_name="misogyny_detection_db", persist_path=None):
         """
         Initialize the vector database setup
         ChromaDB is the easiest option for beginners
+        The collection is persisted under data/rag/vector_db so the detector can open it later
         """
         logger.info("🗄️ Setting up Vector Database...")
         logger.info("📦 Using ChromaDB (easiest for beginners)")
         
         try:
-            # Initialize ChromaDB client
-            self.client = chromadb.Client()
+            # Initialize a persistent ChromaDB client
+            self.persist_path = persist_path or os.path.join(PROJECT_ROOT, DEFAULT_CHROMA_PATH)
+            self.client = get_persistent_client(self.persist_path)
             self.db_name = db_name
             self.collection_name = "misogyny_chunks"
             
             logger.info("✅ ChromaDB client initialized successfully!")
             logger.info(f"📊 Database name: {db_name}")
+            logger.info(f"💾 Persisted at: {self.persist_path}")
             logger.info(f"📚 Collection name: {self.collection_name}")
             
         except Exception as e:
@@ -63,13 +72,13 @@ class VectorDatabaseSetup:
         logger.info(f"📚 Creating collection: {self.collection_name}")
         
         try:
-            # Create or get collection
-            self.collection = self.client.create_collection(
+            # Create or reopen the persisted collection
+            self.collection = self.client.get_or_create_collection(
                 name=self.collection_name,
                 metadata={"description": "Misogyny detection chunks with embeddings"}
             )
             
-            logger.info("✅ Collection created successfully!")
+            logger.info("✅ Collection ready!")
             logger.info(f"📊 Collection info:")
             logger.info(f"   - Name: {self.collection.name}")
             logger.info(f"   - Count: {self.collection.count()}")
@@ -147,10 +156,17 @@ class VectorDatabaseSetup:
         }
     
     def insert_data_into_chromadb(self, data):
-        """Insert data into ChromaDB collection"""
+        """Insert data into ChromaDB collection, skipping ids a previous run already stored"""
         logger.info("💾 Inserting data into ChromaDB...")
         
         try:
+            # Only add what the persisted collection is missing
+            stored = existing_ids(self.collection)
+            if stored:
+                keep = [i for i, item_id in enumerate(data['ids']) if item_id not in stored]
+                logger.info(f"♻️ {len(stored)} items already stored, adding {len(keep)} new ones")
+                data = {key: [values[i] for i in keep] for key, values in data.items()}
+            
             # Insert data in batches to avoid memory issues
             batch_size = 1000
             total_items = len(data['ids'])
@@ -267,11 +283,12 @@ class VectorDatabaseSetup:
             'setup_time': time.strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        with open('vector_database_info.json', 'w') as f:
+        info_path = os.path.join(self.persist_path, 'vector_database_info.json')
+        with open(info_path, 'w') as f:
             import json
             json.dump(db_info, f, indent=2)
         
-        logger.info("✅ Database info saved to vector_database_info.json")
+        logger.info(f"✅ Database info saved to {info_path}")
 
 def demonstrate_vector_database():
     """
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+ANN / Quantized Index Evaluation
+Measures recall@k, verdict agreement, latency and memory of the in-process indexes against exact search
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .knn_scoring import knn_verdicts
+from .vector_index import HNSWLIB_AVAILABLE, HNSWIndex, IVFIndex, NumpyIndex, QuantizedIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _load_corpus(embeddings_path: str, synthetic_size: int, seed: int):
+    """(vectors, labels) from the step3 pickle, or a clustered synthetic corpus if it is missing"""
+    if os.path.exists(embeddings_path):
+        with open(embeddings_path, 'rb') as f:
+            df = pickle.load(f)
+        vectors = np.vstack(df['embedding'].to_numpy()).astype(np.float32)
+        labels = df['label'].fillna(0).astype(int).to_numpy()
+        logger.info(f"📖 Loaded {len(vectors)} embeddings from {embeddings_path}")
+        return vectors, labels
+
+    logger.warning(f"⚠️ {embeddings_path} not found. Using a synthetic clustered corpus...")
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((256, 384)).astype(np.float32)
+    centre_labels = rng.integers(0, 2, len(centres))
+    members = rng.integers(0, len(centres), synthetic_size)
+    vectors = centres[members] + 0.6 * rng.standard_normal((synthetic_size, 384)).astype(np.float32)
+    # Mostly the cluster's label, with some noise so votes are not unanimous
+    labels = np.where(rng.random(synthetic_size) < 0.85, centre_labels[members], 1 - centre_labels[members])
+    return vectors, labels
+
+
+def _verdicts(index: NumpyIndex, positions: np.ndarray, similarities: np.ndarray, threshold: float) -> List[bool]:
+    """is_misogynistic for each query, scored exactly as SimpleRAGDetector does"""
+    scores = knn_verdicts(index.labels[positions], index.distances(similarities), threshold)
+    return scores['is_misogynistic'].tolist()
+
+
+def _evaluate(index: NumpyIndex, queries: np.ndarray, exact_ids: List[set], exact_verdicts: List[bool],
+              k: int, threshold: float) -> Dict[str, float]:
+    """recall@k, verdict agreement and per-query latency for the index's current knobs"""
+    started = time.perf_counter()
+    for query in queries:
+        index.top_k(query, k)
+    latency_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+    positions, similarities = index.top_k(queries, k)
+    found_ids = [{index.ids[p] for p in row} for row in positions]
+    recall = np.mean([len(found & exact) / k for found, exact in zip(found_ids, exact_ids)])
+    verdicts = _verdicts(index, positions, similarities, threshold)
+    agreement = np.mean([a == b for a, b in zip(verdicts, exact_verdicts)])
+
+    return {
+        'recall_at_k': float(recall),
+        'verdict_agreement': float(agreement),
+        'ms_per_query': latency_ms,
+        'private_mb': index.memory_bytes()['private_bytes'] / 1e6,
+        'mapped_mb': index.memory_bytes()['mapped_bytes'] / 1e6
+    }
+
+
+def evaluate_ann(embeddings_path: str = "data/rag/embeddings_data.pkl", holdout: int = 1000, k: int = 5,
+                 threshold: float = 0.3, nlist: Optional[int] = None, nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+                 efs: Sequence[int] = (16, 32, 64, 128), precisions: Sequence[str] = ('int8', 'float16'),
+                 rescore_candidates: Sequence[int] = (0, 50), synthetic_size: int = 100000,
+                 seed: int = 0) -> List[Dict]:
+    """
+    Sweep the ANN knobs against exact search on held-out queries
+
+    The held-out rows are removed from the corpus and used as queries, so
+    every index answers the same unseen messages. Returns one row per
+    (index, knob) with recall@k, is_misogynistic agreement with the exact
+    verdict, single-query latency and vector memory (private to the process
+    vs mapped from corpus files and shared between workers). Quantized
+    indexes are mapped from a saved corpus directory as they would be in
+    production.
+    """
+    vectors, labels = _load_corpus(embeddings_path, synthetic_size, seed)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    queries, corpus = order[:holdout], order[holdout:]
+
+    ids = [f"chunk_{i}" for i in corpus]
+    documents = [''] * len(corpus)
+    corpus_vectors, corpus_labels = vectors[corpus], labels[corpus]
+    query_vectors = vectors[queries]
+
+    exact = NumpyIndex(corpus_vectors, documents, corpus_labels, ids=ids, chunk_lengths=np.zeros(len(corpus)))
+    exact_positions, exact_similarities = exact.top_k(query_vectors, k)
+    exact_ids = [{exact.ids[p] for p in row} for row in exact_positions]
+    exact_verdicts = _verdicts(exact, exact_positions, exact_similarities, threshold)
+
+    rows = [dict(index='numpy', knob='exact', **_evaluate(exact, query_vectors, exact_ids, exact_verdicts, k, threshold))]
+
+    logger.info("🏗️ Building IVF index...")
+    ivf = IVFIndex(corpus_vectors, documents, corpus_labels, ids=ids, chunk_lengths=np.zeros(len(corpus)),
+                   nlist=nlist, seed=seed)
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        rows.append(dict(index='ivf', knob=f'nlist={ivf.nlist} nprobe={nprobe}',
+                         **_evaluate(ivf, query_vectors, exact_ids, exact_verdicts, k, threshold)))
+
+    if HNSWLIB_AVAILABLE:
+        logger.info("🏗️ Building HNSW index...")
+        hnsw = HNSWIndex(corpus_vectors, documents, corpus_labels, ids=ids, chunk_lengths=np.zeros(len(corpus)))
+        for ef in efs:
+            hnsw.ef = ef
+            rows.append(dict(index='hnsw', knob=f'ef={ef}',
+                             **_evaluate(hnsw, query_vectors, exact_ids, exact_verdicts, k, threshold)))
+    else:
+        logger.warning("⚠️ hnswlib not installed, skipping HNSW")
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        exact.save_corpus_dir(corpus_dir, precisions=precisions)
+        mapped = NumpyIndex.from_corpus_dir(corpus_dir)
+        rows.append(dict(index='numpy', knob='exact (mapped)',
+                         **_evaluate(mapped, query_vectors, exact_ids, exact_verdicts, k, threshold)))
+        del mapped
+        for precision in precisions:
+            for rescore in rescore_candidates:
+                quantized = QuantizedIndex.from_corpus_dir(corpus_dir, precision=precision,
+                                                           rescore_candidates=rescore)
+                rows.append(dict(index='quant', knob=f'{precision} rescore={rescore}',
+                                 **_evaluate(quantized, query_vectors, exact_ids, exact_verdicts, k, threshold)))
+                del quantized
+
+    logger.info(f"📊 {len(corpus)} vectors, {holdout} held-out queries, k={k}")
+    logger.info(f"   {'index':<6} {'knob':<24} {'recall@k':>9} {'agreement':>10} {'ms/query':>9} "
+                f"{'private MB':>11} {'mapped MB':>10}")
+    for row in rows:
+        logger.info(f"   {row['index']:<6} {row['knob']:<24} {row['recall_at_k']:>9.3f} "
+                    f"{row['verdict_agreement']:>10.3f} {row['ms_per_query']:>9.3f} "
+                    f"{row['private_mb']:>11.1f} {row['mapped_mb']:>10.1f}")
+
+    return rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    evaluate_ann()
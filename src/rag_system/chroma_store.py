@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Persistent Chroma Store
+Opens the prebuilt misogyny_chunks collection from disk, validates it and tops it up incrementally
+"""
+
+import logging
+import os
+from typing import Optional, Set
+
+import chromadb
+
+from .embedding_corpus import EmbeddingCorpus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHROMA_PATH = "data/rag/vector_db"
+COLLECTION_NAME = "misogyny_chunks"
+
+# Collection metadata recording which step3 pickle it was last synced from, and that pickle's row count
+SOURCE_SIGNATURE_KEY = "source_signature"
+SOURCE_COUNT_KEY = "source_count"
+
+
+class VectorStoreError(RuntimeError):
+    """The persistent collection is missing, empty or does not match the encoder"""
+
+
+def get_persistent_client(path: str = DEFAULT_CHROMA_PATH):
+    """Chroma client whose collections survive process restarts"""
+    return chromadb.PersistentClient(path=path)
+
+
+def collection_dimension(collection) -> Optional[int]:
+    """Embedding dimension of the stored vectors, or None if the collection is empty"""
+    sample = collection.get(limit=1, include=['embeddings'])
+    embeddings = sample.get('embeddings')
+    if embeddings is None or len(embeddings) == 0:
+        return None
+    return len(embeddings[0])
+
+
+def existing_ids(collection, batch_size: int = 10000) -> Set[str]:
+    """Every id already stored in the collection"""
+    ids = set()
+    total = collection.count()
+    for offset in range(0, total, batch_size):
+        ids.update(collection.get(limit=batch_size, offset=offset, include=[])['ids'])
+    return ids
+
+
+def sync_collection(collection, index, batch_size: int = 1000) -> int:
+    """
+    Add the rows of a NumpyIndex (or corpus) that the collection does not have yet
+
+    Only missing ids are embedded into Chroma, so re-running after a partial
+    build or after new chunks were added costs time proportional to the
+    difference, not the corpus.
+    """
+    stored = existing_ids(collection)
+    missing = [position for position in range(index.count()) if index.ids[position] not in stored]
+    if not missing:
+        logger.info(f"✅ Collection {collection.name} already has all {index.count()} items")
+        return 0
+
+    logger.info(f"📦 Adding {len(missing)} missing items to {collection.name}...")
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        collection.add(
+            ids=[index.ids[p] for p in batch],
+            embeddings=[index.vectors[p].tolist() for p in batch],
+            documents=[index.documents[p] for p in batch],
+            metadatas=[index._metadata(p) for p in batch]
+        )
+
+    logger.info(f"✅ Collection {collection.name} now has {collection.count()} items")
+    return len(missing)
+
+
+def _source_signature(path: str) -> str:
+    """Path, size and mtime of a source file; changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def source_row_count(path: str, collection=None) -> Optional[int]:
+    """
+    Rows in a step3 pickle or corpus directory, without loading the vectors
+
+    A corpus directory's manifest records its count. A pickle can only be
+    counted by unpickling it, so its count comes from the collection
+    metadata written the last time it was synced, provided the file has not
+    changed since; otherwise None (unknown).
+    """
+    if os.path.isdir(path):
+        return EmbeddingCorpus.open(path).count
+    metadata = (collection.metadata or {}) if collection is not None else {}
+    if metadata.get(SOURCE_SIGNATURE_KEY) == _source_signature(path):
+        return metadata.get(SOURCE_COUNT_KEY)
+    return None
+
+
+def _record_source(collection, path: str, count: int):
+    """Remember a synced pickle's signature and row count so the next start can skip loading it"""
+    if os.path.isdir(path):
+        return
+    metadata = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith('hnsw:')}
+    metadata.update({SOURCE_SIGNATURE_KEY: _source_signature(path), SOURCE_COUNT_KEY: count})
+    try:
+        collection.modify(metadata=metadata)
+    except Exception as e:
+        # Only costs a full load on the next start
+        logger.warning(f"⚠️ Could not record the source of {collection.name}: {e}")
+
+
+def open_collection(path: str = DEFAULT_CHROMA_PATH, name: str = COLLECTION_NAME,
+                    expected_dimension: Optional[int] = None, min_count: int = 1,
+                    rebuild_from: Optional[str] = None):
+    """
+    Open the prebuilt collection and check it is usable
+
+    Raises VectorStoreError when the collection is missing, holds fewer than
+    min_count items or stores vectors of the wrong dimension. With
+    rebuild_from (a step3 pickle or corpus directory) a missing or short
+    collection is created or topped up incrementally instead; a dimension
+    mismatch always raises because the stored vectors would be unusable.
+    The source is only loaded when the collection holds fewer rows than
+    source_row_count reports, or when that count is unknown.
+    """
+    client = get_persistent_client(path)
+
+    try:
+        collection = client.get_collection(name)
+    except Exception as e:
+        if rebuild_from is None:
+            raise VectorStoreError(
+                f"Collection '{name}' not found in {path}. Run step4_setup_vector_database.py "
+                f"or pass rebuild_from to build it."
+            ) from e
+        logger.warning(f"⚠️ Collection '{name}' not found in {path}. Building it from {rebuild_from}...")
+        collection = client.create_collection(name, metadata={"description": "Misogyny detection chunks with embeddings"})
+
+    dimension = collection_dimension(collection)
+    if dimension is not None and expected_dimension is not None and dimension != expected_dimension:
+        raise VectorStoreError(
+            f"Collection '{name}' stores {dimension}-d vectors but the encoder produces "
+            f"{expected_dimension}-d vectors. Rebuild it with the current model."
+        )
+
+    if rebuild_from is not None:
+        expected = source_row_count(rebuild_from, collection)
+        if expected is None or collection.count() < expected:
+            from .vector_index import NumpyIndex
+            source = NumpyIndex.load(rebuild_from)
+            if collection.count() < source.count():
+                sync_collection(collection, source)
+            _record_source(collection, rebuild_from, source.count())
+
+    count = collection.count()
+    if count < min_count:
+        raise VectorStoreError(
+            f"Collection '{name}' in {path} has {count} items (expected at least {min_count}). "
+            f"Run step4_setup_vector_database.py or pass rebuild_from."
+        )
+
+    logger.info(f"✅ Opened persistent collection '{name}': {count} items x {dimension or expected_dimension}")
+    return collection
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Query Embedding Cache
+Bounded LRU of float32 query embeddings keyed by normalized text, optionally shared through SQLite
+"""
+
+import hashlib
+from typing import Optional
+
+import numpy as np
+
+from ..utils.lru_cache import LRUCache, SQLiteCacheBackend
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse case and whitespace
+
+    all-MiniLM-L6-v2 uses an uncased tokenizer that splits on whitespace, so
+    texts that differ only in case or spacing encode to the same vector.
+    """
+    return ' '.join(text.lower().split())
+
+
+def embedding_cache_key(model_name: str, text: str) -> str:
+    """Model-scoped key, hashed so long messages don't bloat the index"""
+    normalized = normalize_text(text)
+    return f"{model_name}|{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+
+def _to_bytes(embedding: np.ndarray) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def make_embedding_cache(db_path: Optional[str] = None, max_size: int = 10000,
+                         max_rows: int = 200000) -> LRUCache:
+    """
+    LRU cache for query embeddings
+
+    With db_path the entries are written through to SQLite as raw float32
+    bytes, so every worker process pointed at the same file reuses the
+    others' encodings and the cache survives restarts.
+    """
+    backend = None
+    if db_path:
+        backend = SQLiteCacheBackend(db_path, table="query_embeddings", max_rows=max_rows,
+                                     serializer=_to_bytes, deserializer=_from_bytes)
+    return LRUCache(max_size=max_size, backend=backend)
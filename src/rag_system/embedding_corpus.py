@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Embedding Corpus
+On-disk vectors, labels and text columns that every worker process maps read-only instead of loading
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .quantization import PRECISIONS, quantize
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+STRING_COLUMNS = ('documents', 'ids', 'sources', 'categories')
+
+
+def _load_mapped(path: str) -> np.ndarray:
+    """np.load with mmap_mode='r'; empty arrays cannot be mapped so they are read normally"""
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path)
+
+
+class StringColumn:
+    """
+    Read-only column of strings backed by mapped UTF-8 bytes and an offsets array
+
+    Row i is data[offsets[i]:offsets[i + 1]], so opening the column costs two
+    mmaps and nothing is decoded until a row is read.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    @classmethod
+    def open(cls, directory: str, name: str) -> "StringColumn":
+        offsets = _load_mapped(os.path.join(directory, f'{name}_offsets.npy'))
+        return cls(_load_mapped(os.path.join(directory, f'{name}.npy')), offsets)
+
+    @staticmethod
+    def write(directory: str, name: str, values: Sequence[str]):
+        encoded = [str(value).encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(os.path.join(directory, f'{name}_offsets.npy'), offsets)
+        np.save(os.path.join(directory, f'{name}.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position: int) -> str:
+        if position < 0:
+            position += len(self)
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return self._data[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+class EmbeddingCorpus:
+    """
+    A corpus directory opened read-only via memory maps
+
+    Layout: manifest.json, vectors_<precision>.npy (float32 and any
+    quantized variants, rows already L2-normalized), scales_int8.npy,
+    labels.npy, chunk_lengths.npy and one <column>.npy/<column>_offsets.npy
+    pair per text column. Opening maps the files without reading them; the
+    OS page cache then shares the pages between every process that opens
+    the same directory.
+    """
+
+    def __init__(self, directory: str, manifest: Dict):
+        self.directory = directory
+        self.manifest = manifest
+        self.labels = _load_mapped(os.path.join(directory, 'labels.npy'))
+        self.chunk_lengths = _load_mapped(os.path.join(directory, 'chunk_lengths.npy'))
+        self.columns = {name: StringColumn.open(directory, name) for name in STRING_COLUMNS}
+
+    @classmethod
+    def open(cls, directory: str) -> "EmbeddingCorpus":
+        """Map an existing corpus directory"""
+        manifest_path = os.path.join(directory, MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"No embedding corpus at {directory} (missing {MANIFEST})")
+
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format {manifest.get('format_version')} in {directory}")
+
+        started = time.perf_counter()
+        corpus = cls(directory, manifest)
+        logger.info(f"✅ Mapped corpus {directory}: {corpus.count} x {corpus.dimension} "
+                    f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return corpus
+
+    @staticmethod
+    def write(directory: str, vectors: np.ndarray, documents: Sequence[str], labels: np.ndarray,
+              ids: Sequence[str], sources: Sequence[str], categories: Sequence[str], chunk_lengths: np.ndarray,
+              precisions: Sequence[str] = PRECISIONS, keep_full_precision: bool = True) -> Dict[str, int]:
+        """
+        Write a corpus directory; vectors should already be L2-normalized
+
+        keep_full_precision also writes the float32 matrix, used for exact
+        search and for rescoring quantized candidates. Returns the size in
+        bytes of each vector file written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        sizes = {}
+
+        def save(name: str, array: np.ndarray):
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+            sizes[name] = array.nbytes
+
+        if keep_full_precision:
+            save('vectors_float32', np.ascontiguousarray(vectors, dtype=np.float32))
+        for precision in precisions:
+            codes, scales = quantize(vectors, precision)
+            save(f'vectors_{precision}', codes)
+            if scales is not None:
+                save(f'scales_{precision}', scales)
+
+        np.save(os.path.join(directory, 'labels.npy'), np.asarray(labels, dtype=np.int8))
+        np.save(os.path.join(directory, 'chunk_lengths.npy'), np.asarray(chunk_lengths, dtype=np.int32))
+        for name, values in zip(STRING_COLUMNS, (documents, ids, sources, categories)):
+            StringColumn.write(directory, name, values)
+
+        # Manifest last, so a half-written directory never opens
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'count': int(len(labels)),
+            'dimension': int(np.shape(vectors)[1]),
+            'precisions': (['float32'] if keep_full_precision else []) + list(precisions),
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f"✅ Saved corpus of {len(labels)} vectors to {directory}")
+        for name, size in sizes.items():
+            logger.info(f"   - {name}: {size / 1e6:.1f} MB")
+        return sizes
+
+    @property
+    def count(self) -> int:
+        return self.manifest['count']
+
+    @property
+    def dimension(self) -> int:
+        return self.manifest['dimension']
+
+    def has_precision(self, precision: str) -> bool:
+        return precision in self.manifest['precisions']
+
+    def vectors(self, precision: str = 'float32') -> np.ndarray:
+        """Mapped (count, dimension) matrix stored at the given precision"""
+        if not self.has_precision(precision):
+            raise ValueError(f"Corpus {self.directory} has no {precision} vectors "
+                             f"(available: {self.manifest['precisions']})")
+        return _load_mapped(os.path.join(self.directory, f'vectors_{precision}.npy'))
+
+    def scales(self, precision: str) -> Optional[np.ndarray]:
+        """Mapped per-vector scales, for precisions that have them"""
+        path = os.path.join(self.directory, f'scales_{precision}.npy')
+        return _load_mapped(path) if os.path.exists(path) else None
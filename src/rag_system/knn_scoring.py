@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+kNN Verdict Scoring
+Turns the labels and distances of each query's nearest neighbours into misogyny verdicts
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+
+# Label value for padding when a query got fewer than k neighbours
+NO_NEIGHBOUR = -1
+
+
+def knn_verdicts(labels: np.ndarray, distances: np.ndarray, threshold: float,
+                 weighted: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Score every query at once from (queries, k) label and distance arrays
+
+    labels are 1 for misogynistic neighbours, 0 otherwise and NO_NEIGHBOUR
+    for padding; similarity = 1 - distance. Unweighted, each neighbour is
+    one vote: the majority class wins, ties go to the class with the higher
+    mean similarity, and a misogyny verdict also needs that mean to clear
+    threshold. Confidence is the mean similarity of the winning class.
+    With weighted=True votes are weighted by similarity (clipped at 0), so
+    close neighbours count for more than distant ones.
+
+    Returns arrays of length queries: is_misogynistic, confidence,
+    misogyny_votes, neighbour_count (and the weighted vote totals).
+    """
+    labels = np.atleast_2d(np.asarray(labels))
+    similarities = 1 - np.atleast_2d(np.asarray(distances, dtype=np.float64))
+
+    misogyny = labels == 1
+    non_misogyny = labels == 0
+    misogyny_count = misogyny.sum(axis=1)
+    non_misogyny_count = non_misogyny.sum(axis=1)
+
+    # Per-class mean similarity (0 for a class with no neighbours)
+    avg_misogyny = np.where(misogyny, similarities, 0.0).sum(axis=1) / np.maximum(misogyny_count, 1)
+    avg_non_misogyny = np.where(non_misogyny, similarities, 0.0).sum(axis=1) / np.maximum(non_misogyny_count, 1)
+
+    if weighted:
+        weights = np.clip(similarities, 0.0, None)
+        misogyny_votes = np.where(misogyny, weights, 0.0).sum(axis=1)
+        non_misogyny_votes = np.where(non_misogyny, weights, 0.0).sum(axis=1)
+    else:
+        misogyny_votes, non_misogyny_votes = misogyny_count, non_misogyny_count
+
+    more_misogyny = misogyny_votes > non_misogyny_votes
+    more_non_misogyny = non_misogyny_votes > misogyny_votes
+    tie = ~(more_misogyny | more_non_misogyny)
+    tie_to_misogyny = tie & (avg_misogyny > avg_non_misogyny)
+
+    is_misogynistic = (more_misogyny | tie_to_misogyny) & (avg_misogyny > threshold)
+    confidence = np.where(
+        is_misogynistic, avg_misogyny,
+        np.where(more_non_misogyny | (tie & ~tie_to_misogyny), avg_non_misogyny, 0.0)
+    )
+
+    scores = {
+        'is_misogynistic': is_misogynistic,
+        'confidence': confidence,
+        'misogyny_votes': misogyny_count,
+        'neighbour_count': misogyny_count + non_misogyny_count
+    }
+    if weighted:
+        scores['misogyny_weight'] = misogyny_votes
+        scores['non_misogyny_weight'] = non_misogyny_votes
+    return scores
+
+
+def knn_verdict(labels: Sequence[int], distances: Sequence[float], threshold: float,
+                weighted: bool = False) -> Dict:
+    """Single-query verdict dict, as returned in SimpleRAGDetector results"""
+    scores = knn_verdicts(np.array([labels]), np.array([distances], dtype=np.float64), threshold, weighted)
+    verdict = {
+        'is_misogynistic': bool(scores['is_misogynistic'][0]),
+        'confidence': float(scores['confidence'][0]),
+        'threshold': threshold,
+        'misogyny_votes': int(scores['misogyny_votes'][0]),
+        'neighbour_count': int(scores['neighbour_count'][0])
+    }
+    if weighted:
+        verdict['misogyny_weight'] = float(scores['misogyny_weight'][0])
+        verdict['non_misogyny_weight'] = float(scores['non_misogyny_weight'][0])
+    return verdict
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Micro-Batching Encoder
+Coalesces concurrent single-message encode calls into one batched forward pass
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatchEncoder:
+    """
+    Dynamic micro-batcher in front of an embedding model
+
+    Callers submit texts and get futures back. A single worker thread takes
+    the first waiting request, keeps collecting for up to max_wait_ms or
+    until max_batch_size items are queued, encodes them in one call and
+    resolves each future with its own row. Under light load a request waits
+    at most max_wait_ms; under heavy load batches fill up and the model runs
+    at batch throughput instead of batch-of-one.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batch-encoder", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the future resolves to its float32 embedding"""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        """Blocking encode of texts through the shared batches"""
+        futures = [self.submit(text) for text in texts]
+        return np.vstack([future.result(timeout=timeout) for future in futures])
+
+    def _collect(self, first) -> List:
+        """Gather more requests until the batch is full or the window closes"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Let the run loop see the stop marker after this batch
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            # Requests cancelled while queued are dropped; the rest can no longer be cancelled
+            batch = [(text, future) for text, future in self._collect(first) if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._encode_batch(batch)
+            except Exception as e:
+                # Never let one batch take the worker down; every later encode() would wait forever
+                logger.error(f"❌ Batch encode failed for {len(batch)} texts: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+
+    def _encode_batch(self, batch: List):
+        texts = [text for text, _ in batch]
+        embeddings = np.asarray(self.encode_fn(texts), dtype=np.float32)
+        if len(embeddings) != len(batch):
+            raise ValueError(f"encode_fn returned {len(embeddings)} embeddings for {len(batch)} texts")
+        for (_, future), embedding in zip(batch, embeddings):
+            future.set_result(embedding)
+
+    def stats(self) -> Dict:
+        """Batch counters for monitoring"""
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker after the requests already queued"""
+        self._queue.put(_STOP)
+        if wait:
+            self._worker.join()
+
+
+def load_test(encode_fn: Callable[[List[str]], np.ndarray], windows_ms: Sequence[float] = (0, 2, 5, 10, 20),
+              concurrency: int = 32, requests_per_client: int = 20, max_batch_size: int = 32,
+              texts: Optional[Sequence[str]] = None) -> List[Dict]:
+    """
+    Throughput vs latency of batch-of-one encoding and of each batch window
+
+    concurrency client threads each send requests_per_client single-message
+    encodes. Returns one row per configuration with messages/second and
+    p50/p95 request latency.
+    """
+    texts = list(texts or [
+        "Women are too emotional for leadership",
+        "She's a great leader and a wonderful colleague",
+        "Girls can't handle pressure",
+        "The meeting moved to Thursday afternoon"
+    ])
+
+    def run(encode_one: Callable[[str], np.ndarray]) -> Dict:
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def client(offset: int):
+            for i in range(requests_per_client):
+                started = time.perf_counter()
+                encode_one(texts[(offset + i) % len(texts)])
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(client, range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        latencies_ms = np.array(latencies) * 1000
+        return {
+            'messages_per_second': len(latencies) / elapsed,
+            'p50_ms': float(np.percentile(latencies_ms, 50)),
+            'p95_ms': float(np.percentile(latencies_ms, 95))
+        }
+
+    encode_fn(texts)  # warm-up
+    rows = [dict(config='batch of one', avg_batch_size=1.0, **run(lambda text: encode_fn([text])[0]))]
+
+    for window in windows_ms:
+        batcher = MicroBatchEncoder(encode_fn, max_batch_size=max_batch_size, max_wait_ms=window)
+        row = run(lambda text: batcher.submit(text).result())
+        rows.append(dict(config=f'window {window:g} ms', avg_batch_size=batcher.stats()['avg_batch_size'], **row))
+        batcher.shutdown()
+
+    logger.info(f"📊 {concurrency} concurrent clients x {requests_per_client} requests, max batch {max_batch_size}")
+    logger.info(f"   {'config':<14} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'avg batch':>10}")
+    for row in rows:
+        logger.info(f"   {row['config']:<14} {row['messages_per_second']:>8.1f} {row['p50_ms']:>8.1f} "
+                    f"{row['p95_ms']:>8.1f} {row['avg_batch_size']:>10.1f}")
+    return rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from sentence_transformers import SentenceTransformer
+    load_test(SentenceTransformer('all-MiniLM-L6-v2').encode)
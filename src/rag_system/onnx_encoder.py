@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime Encoder
+CPU backend for all-MiniLM-L6-v2: an exported ONNX graph, optionally int8-quantized, behind SentenceTransformer's encode()
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Optional CPU runtime; without it the detectors keep using the PyTorch model
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONNX_DIR = "data/rag/onnx_encoder"
+ENCODER_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+CONFIG_FILE = 'encoder.json'
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model_int8.onnx'
+
+
+class EncoderParityError(AssertionError):
+    """ONNX embeddings drifted from the PyTorch model's beyond the allowed cosine"""
+
+
+PARITY_TEXTS = [
+    "Women are too emotional for leadership",
+    "She's a great leader and a wonderful colleague",
+    "Girls can't handle pressure like men",
+    "The meeting moved to Thursday afternoon",
+    "Stop being so bossy and hysterical",
+    "Our new CTO shipped the migration two weeks early",
+    "go back to the kitchen where you belong",
+    "Thanks for the detailed review, I'll fix the tests"
+]
+
+
+def export_onnx(model_name: str = 'all-MiniLM-L6-v2', directory: str = DEFAULT_ONNX_DIR,
+                quantize_int8: bool = True, opset: int = 14) -> str:
+    """
+    Export the SentenceTransformer's transformer to ONNX, plus a dynamically quantized int8 copy
+
+    Only the transformer is exported (token embeddings out); pooling and
+    normalization run in NumPy in OnnxEncoder, exactly as the
+    SentenceTransformer pipeline does them. Needs torch and
+    sentence-transformers at export time only.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(directory, exist_ok=True)
+    model = SentenceTransformer(model_name, device='cpu')
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    class TokenEmbeddings(torch.nn.Module):
+        """Transformer forward returning only last_hidden_state"""
+
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.wrapped(input_ids=input_ids, attention_mask=attention_mask,
+                                token_type_ids=token_type_ids)[0]
+
+    sample = tokenizer(PARITY_TEXTS[:2], padding=True, return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    fp32_path = os.path.join(directory, FP32_FILE)
+
+    logger.info(f"📦 Exporting {model_name} to {fp32_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(transformer),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes={name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']},
+            opset_version=opset
+        )
+
+    if quantize_int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(directory, INT8_FILE)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        logger.info(f"✅ Quantized int8 model: {os.path.getsize(int8_path) / 1e6:.1f} MB "
+                    f"(fp32 {os.path.getsize(fp32_path) / 1e6:.1f} MB)")
+
+    tokenizer.save_pretrained(directory)
+    config = {
+        'model_name': model_name,
+        'dimension': model.get_sentence_embedding_dimension(),
+        'max_seq_length': model.max_seq_length,
+        'normalize': any(type(module).__name__ == 'Normalize' for module in model),
+        'quantized': quantize_int8
+    }
+    with open(os.path.join(directory, CONFIG_FILE), 'w') as f:
+        json.dump(config, f, indent=2)
+
+    logger.info(f"✅ ONNX encoder exported to {directory}")
+    return directory
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder running an exported graph through onnxruntime
+
+    Drop-in for the parts of SentenceTransformer the detectors use:
+    encode(), get_sentence_embedding_dimension() and max_seq_length.
+    Embeddings are the attention-masked mean of the token embeddings,
+    L2-normalized when the source model normalizes, so they live in the
+    same space as the stored corpus vectors.
+    """
+
+    def __init__(self, directory: str = DEFAULT_ONNX_DIR, quantized: bool = True, num_threads: int = 0):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("onnxruntime is required for the ONNX encoder (pip install onnxruntime)")
+        from transformers import AutoTokenizer
+
+        config_path = os.path.join(directory, CONFIG_FILE)
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(f"No exported encoder at {directory}. Run export_onnx() first.")
+        with open(config_path, 'r') as f:
+            self.config = json.load(f)
+
+        model_file = INT8_FILE if quantized else FP32_FILE
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(os.path.join(directory, model_file), options,
+                                                    providers=['CPUExecutionProvider'])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+
+        self.quantized = quantized
+        self.max_seq_length = self.config['max_seq_length']
+        self.name = f"{self.config['model_name']}+{'onnx-int8' if quantized else 'onnx'}"
+        logger.info(f"✅ ONNX encoder loaded: {self.name}")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config['dimension']
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_seq_length,
+                                return_tensors='np')
+        feed = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        if 'token_type_ids' in self.input_names and 'token_type_ids' not in feed:
+            feed['token_type_ids'] = np.zeros_like(feed['input_ids'])
+        token_embeddings = self.session.run(None, feed)[0]
+
+        # Mean pooling over real tokens, as sentence-transformers' Pooling module does
+        mask = tokens['attention_mask'][..., None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config['normalize']:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_tensor: bool = False, **kwargs) -> np.ndarray:
+        """(n, dimension) float32 embeddings; a single string returns one vector"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Batch similar lengths together so little compute goes on padding
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        embeddings = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._encode_batch([texts[i] for i in batch])
+
+        return embeddings[0] if single else embeddings
+
+
+def load_encoder(model_name: str = 'all-MiniLM-L6-v2', backend: str = 'torch',
+                 onnx_dir: str = DEFAULT_ONNX_DIR, num_threads: int = 0):
+    """
+    Encoder for backend 'torch' (SentenceTransformer), 'onnx' or 'onnx-int8'
+
+    Returns (encoder, name); name identifies model and backend so embedding
+    caches never mix vectors from different backends.
+    """
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name), model_name
+    if backend in ('onnx', 'onnx-int8'):
+        encoder = OnnxEncoder(onnx_dir, quantized=backend == 'onnx-int8', num_threads=num_threads)
+        if encoder.config['model_name'] != model_name:
+            raise ValueError(f"{onnx_dir} holds an export of {encoder.config['model_name']}, not {model_name}")
+        return encoder, encoder.name
+    raise ValueError(f"Unknown encoder backend: {backend} (expected one of {ENCODER_BACKENDS})")
+
+
+def parity_check(model_name: str = 'all-MiniLM-L6-v2', directory: str = DEFAULT_ONNX_DIR,
+                 texts: Optional[Sequence[str]] = None, min_cosine: float = 0.99) -> Dict[str, Dict[str, float]]:
+    """
+    Cosine similarity between PyTorch and ONNX embeddings of the same texts
+
+    Checks the fp32 graph and, if exported, the int8 one. Raises
+    EncoderParityError when any text falls below min_cosine (explicitly,
+    so the check still runs under python -O).
+    """
+    from sentence_transformers import SentenceTransformer
+
+    texts = list(texts or PARITY_TEXTS)
+    reference = np.asarray(SentenceTransformer(model_name, device='cpu').encode(texts), dtype=np.float32)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+
+    report = {}
+    variants = [False, True] if os.path.exists(os.path.join(directory, INT8_FILE)) else [False]
+    for quantized in variants:
+        candidate = OnnxEncoder(directory, quantized=quantized).encode(texts)
+        candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+        cosines = (reference * candidate).sum(axis=1)
+        label = 'onnx-int8' if quantized else 'onnx'
+        report[label] = {'min_cosine': float(cosines.min()), 'mean_cosine': float(cosines.mean())}
+        logger.info(f"🔍 {label}: min cosine {cosines.min():.5f}, mean {cosines.mean():.5f}")
+        if cosines.min() < min_cosine:
+            raise EncoderParityError(f"{label} parity {cosines.min():.4f} below {min_cosine}")
+
+    logger.info("✅ ONNX embeddings match the PyTorch model")
+    return report
+
+
+def benchmark(model_name: str = 'all-MiniLM-L6-v2', directory: str = DEFAULT_ONNX_DIR,
+              single_runs: int = 200, batch_size: int = 32, batch_runs: int = 20) -> List[Dict]:
+    """
+    Per-message latency and batch throughput of each encoder backend
+
+    single_runs one-message encodes (the live moderation path) and
+    batch_runs batches of batch_size (step3 / check_messages).
+    """
+    from sentence_transformers import SentenceTransformer
+
+    encoders = [('torch', SentenceTransformer(model_name, device='cpu'))]
+    encoders.append(('onnx', OnnxEncoder(directory, quantized=False)))
+    if os.path.exists(os.path.join(directory, INT8_FILE)):
+        encoders.append(('onnx-int8', OnnxEncoder(directory, quantized=True)))
+
+    batch = [PARITY_TEXTS[i % len(PARITY_TEXTS)] for i in range(batch_size)]
+    rows = []
+    for label, encoder in encoders:
+        encoder.encode(batch)  # warm-up
+
+        latencies = []
+        for i in range(single_runs):
+            started = time.perf_counter()
+            encoder.encode([PARITY_TEXTS[i % len(PARITY_TEXTS)]])
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(batch_runs):
+            encoder.encode(batch, batch_size=batch_size)
+        batch_elapsed = time.perf_counter() - started
+
+        latencies_ms = np.array(latencies) * 1000
+        rows.append({
+            'backend': label,
+            'p50_ms': float(np.percentile(latencies_ms, 50)),
+            'p95_ms': float(np.percentile(latencies_ms, 95)),
+            'single_per_second': single_runs / latencies_ms.sum() * 1000,
+            'batch_per_second': batch_runs * batch_size / batch_elapsed
+        })
+
+    logger.info(f"📊 Encoder benchmark ({single_runs} single messages, {batch_runs} batches of {batch_size})")
+    logger.info(f"   {'backend':<10} {'p50 ms':>8} {'p95 ms':>8} {'single/s':>9} {'batch msg/s':>12}")
+    for row in rows:
+        logger.info(f"   {row['backend']:<10} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                    f"{row['single_per_second']:>9.1f} {row['batch_per_second']:>12.1f}")
+    return rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if not os.path.exists(os.path.join(DEFAULT_ONNX_DIR, CONFIG_FILE)):
+        export_onnx()
+    parity_check()
+    benchmark()
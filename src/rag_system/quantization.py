@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Quantized Embedding Storage
+int8 (per-vector scale) and float16 encodings of the RAG corpus
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+PRECISIONS = ('int8', 'float16')
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-vector int8 quantization
+
+    Each row is scaled by its own max |value| so the full [-127, 127] range
+    is used; vector ~= codes * scale.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """float32 approximation of int8 codes"""
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def quantize(vectors: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(codes, scales) for int8, (float16 matrix, None) for float16"""
+    if precision == 'int8':
+        return quantize_int8(vectors)
+    if precision == 'float16':
+        return np.asarray(vectors, dtype=np.float16), None
+    raise ValueError(f"Unsupported precision: {precision} (expected one of {PRECISIONS})")
+
@@ -4,6 +4,10 @@ RAG Integration Module
 Integrates your RAG system with the content moderation app
 """
 
+import asyncio
+from concurrent.futures import Executor
+from typing import List, Optional
+
 try:
     from .simple_rag_detector import SimpleRAGDetector
     RAG_AVAILABLE = True
@@ -15,15 +19,39 @@ except ImportError as e:
 class RAGIntegration:
     """Integrates your RAG system with the content moderation app"""
     
-    def __init__(self):
+    def __init__(self, load: bool = True, **detector_options):
+        """
+        detector_options are passed to SimpleRAGDetector (e.g. index_backend='numpy')
+        
+        load=False defers building the detector to load(), e.g. on a
+        background thread; until then is_available() is False.
+        """
         self.rag_detector = None
-        if RAG_AVAILABLE:
-            try:
-                self.rag_detector = SimpleRAGDetector()
-                print("✅ RAG system loaded successfully")
-            except Exception as e:
-                print(f"❌ Failed to load RAG system: {e}")
-                self.rag_detector = None
+        self.detector_options = detector_options
+        if load:
+            self.load()
+    
+    def load(self, warm_up: bool = False) -> bool:
+        """
+        Build the detector; with warm_up it runs a dummy search first
+        
+        The detector only becomes visible to callers once it is loaded (and
+        warmed), so concurrent requests never see a half-initialized one.
+        """
+        if not RAG_AVAILABLE:
+            return False
+        
+        try:
+            detector = SimpleRAGDetector(**self.detector_options)
+            print("✅ RAG system loaded successfully")
+            if warm_up:
+                detector.warm_up()
+        except Exception as e:
+            print(f"❌ Failed to load RAG system: {e}")
+            return False
+        
+        self.rag_detector = detector
+        return True
     
     def analyze_with_rag(self, message: str) -> dict:
         """Analyze message using your RAG system"""
@@ -32,26 +60,56 @@ class RAGIntegration:
         
         try:
             result = self.rag_detector.check_message(message, threshold=0.3)
-            
-            # Transform RAG result to match our format
-            return {
-                "flagged": result.get("is_misogynistic", False),
-                "confidence": result.get("confidence", 0.0),
-                "detected_words": result.get("problematic_terms", []),
-                "categories": ["misogynistic_language"] if result.get("is_misogynistic", False) else [],
-                "context_analysis": " | ".join(result.get("explanations", [])),
-                "alternatives": result.get("suggestions", []),
-                "severity": "high" if result.get("confidence", 0.0) > 0.7 else "medium",
-                "reasoning": "Analysis by RAG system",
-                "source": "rag"
-            }
+            return self._to_moderation_result(result)
         except Exception as e:
             print(f"❌ RAG analysis failed: {e}")
             return None
     
+    async def analyze_with_rag_async(self, message: str, executor: Optional[Executor] = None) -> dict:
+        """Async counterpart of analyze_with_rag; embedding and Chroma work runs in an executor"""
+        if not self.rag_detector:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.analyze_with_rag, message)
+    
+    def analyze_with_rag_batch(self, messages: List[str]) -> List[Optional[dict]]:
+        """Analyze many messages with one embedding pass and one vector query"""
+        if not self.rag_detector:
+            return [None] * len(messages)
+        
+        try:
+            results = self.rag_detector.check_messages(messages, threshold=0.3)
+            return [self._to_moderation_result(result) for result in results]
+        except Exception as e:
+            print(f"❌ RAG batch analysis failed: {e}")
+            return [None] * len(messages)
+    
+    def _to_moderation_result(self, result: dict) -> dict:
+        """Transform RAG result to match our format"""
+        return {
+            "flagged": result.get("is_misogynistic", False),
+            "confidence": result.get("confidence", 0.0),
+            "detected_words": result.get("problematic_terms", []),
+            "categories": ["misogynistic_language"] if result.get("is_misogynistic", False) else [],
+            "context_analysis": " | ".join(result.get("explanations", [])),
+            "alternatives": result.get("suggestions", []),
+            "severity": "high" if result.get("confidence", 0.0) > 0.7 else "medium",
+            "reasoning": "Analysis by RAG system",
+            "source": "rag",
+            "misogyny_votes": result.get("misogyny_votes", 0),
+            "neighbour_count": result.get("neighbour_count", 0)
+        }
+    
     def is_available(self) -> bool:
         """Check if RAG system is available"""
         return self.rag_detector is not None
+    
+    def get_embedding_cache_stats(self) -> Optional[dict]:
+        """Hit rate of the detector's query-embedding cache"""
+        if not self.rag_detector:
+            return None
+        return self.rag_detector.get_embedding_cache_stats()
 
 # Test the integration
 if __name__ == "__main__":
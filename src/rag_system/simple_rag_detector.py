@@ -5,10 +5,17 @@ Simple RAG Detector - No API, No Server, Just Import and Use!
 
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import chromadb
 import logging
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional
+from ..utils.term_matcher import TermMatcher
+from ..utils.lru_cache import LRUCache
+from .chroma_store import DEFAULT_CHROMA_PATH, open_collection
+from .embedding_cache import embedding_cache_key, make_embedding_cache
+from .knn_scoring import NO_NEIGHBOUR, knn_verdict, knn_verdicts
+from .micro_batcher import MicroBatchEncoder
+from .onnx_encoder import DEFAULT_ONNX_DIR, load_encoder
+from .vector_index import INDEX_BACKENDS, ChromaIndex
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,27 +27,73 @@ class SimpleRAGDetector:
     Just import this class and use it directly in your app!
     """
     
-    def __init__(self):
-        """Initialize the detector"""
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', index_backend: str = 'chroma',
+                 embeddings_path: str = 'data/rag/embeddings_data.pkl', index_options: Optional[Dict] = None,
+                 chroma_path: str = DEFAULT_CHROMA_PATH, rebuild_from: Optional[str] = None,
+                 embedding_cache: Optional[LRUCache] = None, batch_window_ms: Optional[float] = None,
+                 max_batch_size: int = 32, weighted_voting: bool = False, encoder_backend: str = 'torch',
+                 onnx_dir: str = DEFAULT_ONNX_DIR):
+        """
+        Initialize the detector
+        
+        index_backend 'chroma' opens the persistent collection under chroma_path
+        and raises if it is missing, empty or of the wrong dimension, unless
+        rebuild_from (step3 pickle or corpus directory) is given to build or
+        top it up incrementally. 'numpy' (exact),
+        'ivf' or 'hnsw' (approximate) and 'quantized' load the step3 embeddings
+        from embeddings_path (the pickle or the corpus directory) into an
+        in-process index. index_options carries the backend knobs, e.g.
+        {'nlist': 1024, 'nprobe': 16}, {'ef': 64} or
+        {'precision': 'int8', 'rescore_candidates': 50}.
+        
+        embedding_cache holds query embeddings keyed by normalized text
+        (defaults to an in-memory LRU; see make_embedding_cache for a
+        SQLite-backed one shared between workers).
+        
+        batch_window_ms enables a micro-batcher: concurrent encode calls wait
+        up to that long (or until max_batch_size texts) to share one forward
+        pass. None encodes each call directly.
+        
+        weighted_voting weights each neighbour's vote by its similarity
+        instead of counting every neighbour equally.
+        
+        encoder_backend 'torch' runs the SentenceTransformer; 'onnx' and
+        'onnx-int8' run the graph exported to onnx_dir (see
+        onnx_encoder.export_onnx) through onnxruntime on CPU.
+        """
         logger.info("🎯 Loading Simple RAG Detector...")
         
         try:
             # Load the embedding model
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("✅ Embedding model loaded")
+            self.model_name = model_name
+            self.model, self.encoder_name = load_encoder(model_name, encoder_backend, onnx_dir)
+            logger.info(f"✅ Embedding model loaded ({encoder_backend})")
+            self.embedding_cache = embedding_cache if embedding_cache is not None else make_embedding_cache()
+            self.weighted_voting = weighted_voting
+            self.batcher = None
+            if batch_window_ms is not None:
+                self.batcher = MicroBatchEncoder(self.model.encode, max_batch_size=max_batch_size,
+                                                 max_wait_ms=batch_window_ms)
+                logger.info(f"✅ Micro-batching encoder ready ({batch_window_ms} ms window)")
             
-            # Connect to ChromaDB
-            self.client = chromadb.Client()
-            try:
-                self.collection = self.client.get_collection("misogyny_chunks")
+            # Connect to the vector index
+            self.index_backend = index_backend
+            if index_backend in INDEX_BACKENDS:
+                self.index = INDEX_BACKENDS[index_backend].load(embeddings_path, **(index_options or {}))
+            elif index_backend == 'chroma':
+                self.collection = open_collection(
+                    chroma_path,
+                    expected_dimension=self.model.get_sentence_embedding_dimension(),
+                    rebuild_from=rebuild_from
+                )
                 logger.info("✅ Connected to database")
-            except:
-                logger.warning("⚠️ Database not found. Creating demo collection...")
-                self.collection = self.client.create_collection("misogyny_chunks_demo")
-                logger.info("✅ Created demo collection")
+                self.index = ChromaIndex(self.collection)
+            else:
+                raise ValueError(f"Unknown index backend: {index_backend}")
             
             # Load alternative suggestions
             self.alternatives = self._load_alternatives()
+            self.term_matcher = TermMatcher({'alternatives': self.alternatives.keys()})
             logger.info("✅ Alternatives loaded")
             
             logger.info("🎉 Simple RAG Detector ready!")
@@ -87,15 +140,11 @@ class SimpleRAGDetector:
         logger.info(f"🔍 Checking: {text[:50]}...")
         
         try:
-            # Generate embedding
-            embedding = self.model.encode([text])[0]
+            # Generate embedding (cached for repeated messages)
+            embedding = self.encode([text])[0]
             
             # Search database
-            results = self.collection.query(
-                query_embeddings=[embedding.tolist()],
-                n_results=5,
-                include=['documents', 'metadatas', 'distances']
-            )
+            results = self.index.query(embedding, n_results=5)
             
             # Analyze results
             analysis = self._analyze_results(text, results, threshold)
@@ -118,56 +167,125 @@ class SimpleRAGDetector:
                 'problematic_terms': []
             }
     
-    def _analyze_results(self, text: str, results: Dict, threshold: float) -> Dict:
-        """Analyze search results"""
-        documents = results['documents'][0]
-        metadatas = results['metadatas'][0]
-        distances = results['distances'][0]
+    def check_messages(self, texts: List[str], threshold: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Check many messages with a single encode call and a single database query
         
-        # Calculate similarities
-        similarities = [1 - dist for dist in distances]
+        Returns one result per text, in input order, shaped like check_message
+        """
+        if not texts:
+            return []
         
-        # Count misogyny vs non-misogyny
-        misogyny_count = 0
-        non_misogyny_count = 0
-        misogyny_similarities = []
-        non_misogyny_similarities = []
+        logger.info(f"🔍 Checking batch of {len(texts)} messages...")
         
-        for i, (doc, metadata, similarity) in enumerate(zip(documents, metadatas, similarities)):
-            if metadata.get('is_misogyny', 0) == 1:
-                misogyny_count += 1
-                misogyny_similarities.append(similarity)
-            else:
-                non_misogyny_count += 1
-                non_misogyny_similarities.append(similarity)
-        
-        # Calculate averages
-        avg_misogyny = np.mean(misogyny_similarities) if misogyny_similarities else 0
-        avg_non_misogyny = np.mean(non_misogyny_similarities) if non_misogyny_similarities else 0
-        
-        # Determine result
-        is_misogynistic = False
-        confidence = 0.0
-        
-        if misogyny_count > non_misogyny_count:
-            if avg_misogyny > threshold:
-                is_misogynistic = True
-                confidence = avg_misogyny
-        elif non_misogyny_count > misogyny_count:
-            confidence = avg_non_misogyny
-        else:
-            if avg_misogyny > avg_non_misogyny:
-                if avg_misogyny > threshold:
-                    is_misogynistic = True
-                    confidence = avg_misogyny
+        try:
+            scores = self.score_messages(texts, threshold)
+            
+            analyses = []
+            for i, text in enumerate(texts):
+                analysis = {
+                    'is_misogynistic': bool(scores['is_misogynistic'][i]),
+                    'confidence': float(scores['confidence'][i]),
+                    'threshold': threshold,
+                    'misogyny_votes': int(scores['misogyny_votes'][i]),
+                    'neighbour_count': int(scores['neighbour_count'][i])
+                }
+                analysis.update(self._generate_explanations(text, analysis))
+                analyses.append(analysis)
+            
+            blocked = sum(1 for analysis in analyses if analysis['is_misogynistic'])
+            logger.info(f"✅ Batch check complete: {blocked}/{len(texts)} blocked")
+            
+            return analyses
+            
+        except Exception as e:
+            logger.error(f"❌ Error checking batch: {str(e)}")
+            return [
+                {
+                    'is_misogynistic': False,
+                    'confidence': 0.0,
+                    'error': str(e),
+                    'explanations': ['Error occurred during analysis'],
+                    'suggestions': [],
+                    'problematic_terms': []
+                }
+                for _ in texts
+            ]
+    
+    def score_messages(self, texts: List[str], threshold: float = 0.3, n_results: int = 5) -> Dict[str, np.ndarray]:
+        """
+        Vectorized verdicts for many messages
+        
+        One encode, one index search and a few array operations for the
+        whole batch. Returns per-query arrays: is_misogynistic, confidence,
+        misogyny_votes, neighbour_count.
+        """
+        embeddings = self.encode(texts)
+        labels, distances = self._neighbour_arrays(embeddings, n_results)
+        return knn_verdicts(labels, distances, threshold, weighted=self.weighted_voting)
+    
+    def _neighbour_arrays(self, embeddings: np.ndarray, n_results: int):
+        """(queries, k) label and distance arrays for the nearest neighbours"""
+        if hasattr(self.index, 'top_k'):
+            # In-process indexes expose positions directly; no per-row dicts needed
+            positions, similarities = self.index.top_k(embeddings, n_results)
+            return self.index.labels[positions], self.index.distances(similarities)
+        
+        results = self.index.query(embeddings, n_results=n_results)
+        labels = np.full((len(embeddings), n_results), NO_NEIGHBOUR, dtype=np.int8)
+        distances = np.zeros((len(embeddings), n_results), dtype=np.float64)
+        for row, (metadatas, row_distances) in enumerate(zip(results['metadatas'], results['distances'])):
+            labels[row, :len(metadatas)] = [1 if metadata.get('is_misogyny', 0) == 1 else 0 for metadata in metadatas]
+            distances[row, :len(row_distances)] = row_distances
+        return labels, distances
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """float32 embeddings for texts, encoding only the ones not already cached"""
+        keys = [embedding_cache_key(self.encoder_name, text) for text in texts]
+        embeddings: List[Optional[np.ndarray]] = [self.embedding_cache.get(key) for key in keys]
+        
+        # Encode each distinct missing key once, even if it repeats within the batch
+        missing: Dict[str, str] = {}
+        for key, text, embedding in zip(keys, texts, embeddings):
+            if embedding is None and key not in missing:
+                missing[key] = text
+        
+        if missing:
+            texts_to_encode = list(missing.values())
+            if self.batcher is not None:
+                encoded = self.batcher.encode(texts_to_encode)
             else:
-                confidence = avg_non_misogyny
+                encoded = np.asarray(self.model.encode(texts_to_encode), dtype=np.float32)
+            fresh = dict(zip(missing.keys(), encoded))
+            for key, embedding in fresh.items():
+                self.embedding_cache.put(key, embedding)
+            embeddings = [embedding if embedding is not None else fresh[key] for key, embedding in zip(keys, embeddings)]
         
-        return {
-            'is_misogynistic': is_misogynistic,
-            'confidence': confidence,
-            'threshold': threshold
-        }
+        return np.vstack(embeddings)
+    
+    def warm_up(self):
+        """Dummy encode and search so the first real request skips lazy allocations"""
+        started = time.perf_counter()
+        embeddings = np.asarray(self.model.encode(["warm-up message for the embedding model"]), dtype=np.float32)
+        self.index.query(embeddings, n_results=5)
+        logger.info(f"✅ Detector warmed up in {(time.perf_counter() - started) * 1000:.0f} ms")
+    
+    def close(self):
+        """Stop the micro-batcher thread, if any"""
+        if self.batcher is not None:
+            self.batcher.shutdown()
+    
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Hit rate of the query-embedding cache"""
+        return self.embedding_cache.stats()
+    
+    def _analyze_results(self, text: str, results: Dict, threshold: float) -> Dict:
+        """Analyze search results"""
+        metadatas = results['metadatas'][0]
+        distances = results['distances'][0]
+        
+        labels = [1 if metadata.get('is_misogyny', 0) == 1 else 0 for metadata in metadatas]
+        return knn_verdict(labels, distances, threshold, weighted=self.weighted_voting)
     
     def _generate_explanations(self, text: str, analysis: Dict) -> Dict:
         """Generate explanations and suggestions"""
@@ -179,9 +297,9 @@ class SimpleRAGDetector:
             explanations.append("This text contains language that reinforces harmful stereotypes about women.")
             
             # Find problematic terms
-            text_lower = text.lower()
+            matched = self.term_matcher.matched_terms(text)
             for term in self.alternatives.keys():
-                if term in text_lower:
+                if term in matched:
                     problematic_terms.append(term)
                     suggestions.extend(self.alternatives[term])
             
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Vector Index Backends for the RAG Detector
+Chroma collection or an in-process NumPy matrix, both answering queries in Chroma's result layout
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .embedding_corpus import EmbeddingCorpus, StringColumn
+from .quantization import quantize
+
+# Optional graph index; IVF-flat below needs nothing beyond NumPy
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Result keys shared by every backend (the layout of chromadb's collection.query)
+RESULT_KEYS = ('ids', 'documents', 'metadatas', 'distances')
+
+
+def _as_column(values) -> List:
+    """Keep mapped string columns as they are; copy anything else into a list"""
+    return values if isinstance(values, StringColumn) else list(values)
+
+
+def _memory_bytes(*arrays) -> Dict[str, int]:
+    """Split array sizes into private (heap) and mapped (shared page cache) bytes"""
+    footprint = {'private_bytes': 0, 'mapped_bytes': 0}
+    for array in arrays:
+        if array is not None:
+            footprint['mapped_bytes' if isinstance(array, np.memmap) else 'private_bytes'] += array.nbytes
+    return footprint
+
+
+def _spill_to_memmap(array: np.ndarray) -> np.ndarray:
+    """
+    Copy an array into an unlinked temporary file and map it read-only
+
+    The OS can then evict its pages and page back in only the rows read, as
+    with a corpus directory. The file disappears with the last reference.
+    """
+    if array.size == 0:
+        # Empty files cannot be mapped
+        return array
+    with tempfile.TemporaryFile() as spill:
+        np.ascontiguousarray(array).tofile(spill)
+        spill.flush()
+        # The mapping keeps its own handle, so the file lives on after the block closes it
+        return np.memmap(spill, dtype=array.dtype, mode='r', shape=array.shape)
+
+
+class ChromaIndex:
+    """Thin wrapper so a Chroma collection can be swapped for another backend"""
+
+    name = 'chroma'
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def query(self, embeddings: np.ndarray, n_results: int = 5) -> Dict[str, List[List[Any]]]:
+        """Top n_results neighbours for each query row"""
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        return self.collection.query(
+            query_embeddings=embeddings.tolist(),
+            n_results=n_results,
+            include=['documents', 'metadatas', 'distances']
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+class NumpyIndex:
+    """
+    Exact nearest-neighbour search over a contiguous float32 matrix
+
+    Vectors are L2-normalized once at build time, so a single matrix product
+    gives every cosine similarity and argpartition picks the top-k without a
+    full sort. Distances are reported in the same space as the Chroma
+    collection (squared L2 by default) so _analyze_results sees identical
+    numbers whichever backend answered.
+    """
+
+    name = 'numpy'
+    # Exact search can run directly on the mapped corpus matrix
+    searches_mapped_vectors = True
+
+    def __init__(self, vectors: np.ndarray, documents: List[str], labels: np.ndarray,
+                 ids: Optional[List[str]] = None, sources: Optional[List[str]] = None,
+                 categories: Optional[List[str]] = None, chunk_lengths: Optional[np.ndarray] = None,
+                 space: str = 'l2'):
+        if space not in ('l2', 'cosine', 'ip'):
+            raise ValueError(f"Unsupported distance space: {space}")
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.vectors = vectors / norms
+        self._init_columns(len(self.vectors), documents, labels, ids, sources, categories, chunk_lengths, space)
+
+    def _init_columns(self, count: int, documents: List[str], labels: np.ndarray, ids: Optional[List[str]],
+                      sources: Optional[List[str]], categories: Optional[List[str]],
+                      chunk_lengths: Optional[np.ndarray], space: str):
+        """Label, id and metadata columns shared by every NumPy-backed index"""
+        self.documents = _as_column(documents)
+        self.labels = np.asarray(labels, dtype=np.int8)
+        self.ids = _as_column(ids) if ids is not None else [f"chunk_{i}" for i in range(count)]
+        self.sources = _as_column(sources) if sources is not None else ['unknown'] * count
+        self.categories = _as_column(categories) if categories is not None else ['unknown'] * count
+        self.chunk_lengths = (np.asarray(chunk_lengths, dtype=np.int32) if chunk_lengths is not None
+                              else np.array([len(doc) for doc in self.documents], dtype=np.int32))
+        self.space = space
+
+    @classmethod
+    def from_dataframe(cls, df, space: str = 'l2', **index_options) -> "NumpyIndex":
+        """Build from the step3 DataFrame (text, label, source, category, chunk_length, embedding)"""
+        labels = df['label'].fillna(0).astype(int).to_numpy()
+        return cls(
+            vectors=np.vstack(df['embedding'].to_numpy()),
+            documents=df['text'].astype(str).tolist(),
+            labels=labels,
+            ids=[f"chunk_{idx}" for idx in df.index],
+            sources=df['source'].astype(str).tolist() if 'source' in df else None,
+            categories=df['category'].astype(str).tolist() if 'category' in df else None,
+            chunk_lengths=df['chunk_length'].fillna(0).astype(int).to_numpy() if 'chunk_length' in df else None,
+            space=space,
+            **index_options
+        )
+
+    @classmethod
+    def from_embeddings_file(cls, path: str, space: str = 'l2', **index_options) -> "NumpyIndex":
+        """Build from the pickle written by step3 (EmbeddingGenerator.save_embeddings)"""
+        logger.info(f"📖 Loading embeddings for {cls.name} index from {path}...")
+        with open(path, 'rb') as f:
+            df = pickle.load(f)
+        index = cls.from_dataframe(df, space=space, **index_options)
+        logger.info(f"✅ {cls.name} index ready: {index.count()} vectors x {index.dimension}")
+        return index
+
+    @classmethod
+    def from_corpus_dir(cls, directory: str, space: str = 'l2', **index_options) -> "NumpyIndex":
+        """
+        Open a corpus directory (see EmbeddingCorpus)
+
+        The exact index searches the mapped float32 matrix in place, so
+        opening takes milliseconds and the pages are shared by every worker.
+        Approximate indexes copy the vectors in to build their structures.
+        """
+        corpus = EmbeddingCorpus.open(directory)
+        columns = corpus.columns
+
+        if cls.searches_mapped_vectors:
+            if index_options:
+                raise TypeError(f"Unexpected index options: {sorted(index_options)}")
+            index = cls.__new__(cls)
+            index.vectors = corpus.vectors('float32')
+            index._init_columns(corpus.count, columns['documents'], corpus.labels, columns['ids'],
+                                columns['sources'], columns['categories'], corpus.chunk_lengths, space)
+            return index
+
+        return cls(
+            vectors=corpus.vectors('float32'),
+            documents=columns['documents'],
+            labels=corpus.labels,
+            ids=columns['ids'],
+            sources=columns['sources'],
+            categories=columns['categories'],
+            chunk_lengths=corpus.chunk_lengths,
+            space=space,
+            **index_options
+        )
+
+    @classmethod
+    def load(cls, path: str, space: str = 'l2', **index_options) -> "NumpyIndex":
+        """Corpus directory or step3 pickle, whichever path points at"""
+        if os.path.isdir(path):
+            index = cls.from_corpus_dir(path, space=space, **index_options)
+            logger.info(f"✅ {cls.name} index ready: {index.count()} vectors x {index.dimension}")
+            return index
+        return cls.from_embeddings_file(path, space=space, **index_options)
+
+    def save_corpus_dir(self, directory: str, precisions=('int8', 'float16'),
+                        keep_full_precision: bool = True) -> Dict[str, int]:
+        """Write this index's corpus (normalized vectors, quantized variants and columns)"""
+        return EmbeddingCorpus.write(directory, self._corpus_vectors(), self.documents, self.labels, self.ids, self.sources,
+                                     self.categories, self.chunk_lengths, precisions, keep_full_precision)
+
+    def _corpus_vectors(self) -> np.ndarray:
+        """The normalized full-precision rows save_corpus_dir writes"""
+        return self.vectors
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Vector bytes held privately in this process vs mapped from the corpus files"""
+        return _memory_bytes(self.vectors)
+
+    @classmethod
+    def from_collection(cls, collection, batch_size: int = 5000, space: str = 'l2',
+                        **index_options) -> "NumpyIndex":
+        """Copy an existing Chroma collection into memory"""
+        total = collection.count()
+        ids, vectors, documents, metadatas = [], [], [], []
+
+        for offset in range(0, total, batch_size):
+            batch = collection.get(limit=batch_size, offset=offset,
+                                   include=['embeddings', 'documents', 'metadatas'])
+            ids.extend(batch['ids'])
+            vectors.extend(batch['embeddings'])
+            documents.extend(batch['documents'])
+            metadatas.extend(batch['metadatas'])
+
+        return cls(
+            vectors=np.asarray(vectors, dtype=np.float32),
+            documents=documents,
+            labels=np.array([metadata.get('is_misogyny', 0) for metadata in metadatas]),
+            ids=ids,
+            sources=[metadata.get('source', 'unknown') for metadata in metadatas],
+            categories=[metadata.get('category', 'unknown') for metadata in metadatas],
+            chunk_lengths=np.array([metadata.get('chunk_length', 0) for metadata in metadatas]),
+            space=space,
+            **index_options
+        )
+
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1]
+
+    def count(self) -> int:
+        return len(self.vectors)
+
+    def _normalize_queries(self, embeddings: np.ndarray) -> np.ndarray:
+        """Queries as unit float32 rows"""
+        queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return queries / norms
+
+    def _permute(self, order: np.ndarray):
+        """Reorder every column so rows follow order (used to make IVF lists contiguous)"""
+        self.vectors = np.ascontiguousarray(self.vectors[order])
+        self.labels = self.labels[order]
+        self.chunk_lengths = self.chunk_lengths[order]
+        self.documents = [self.documents[i] for i in order]
+        self.ids = [self.ids[i] for i in order]
+        self.sources = [self.sources[i] for i in order]
+        self.categories = [self.categories[i] for i in order]
+
+    def _metadata(self, position: int) -> Dict[str, Any]:
+        """Rebuild the metadata dict step4 stores in Chroma for one row"""
+        label = int(self.labels[position])
+        return {
+            'label': label,
+            'source': self.sources[position],
+            'category': self.categories[position],
+            'chunk_length': int(self.chunk_lengths[position]),
+            'is_misogyny': label
+        }
+
+    def distances(self, similarities: np.ndarray) -> np.ndarray:
+        """Convert top_k similarities into the configured distance, the numbers query() reports"""
+        if self.space == 'l2':
+            return np.maximum(2.0 - 2.0 * similarities, 0.0)
+        return 1.0 - similarities
+
+    def top_k(self, embeddings: np.ndarray, n_results: int = 5):
+        """(positions, similarities) arrays of shape (queries, k), best first; see distances()"""
+        queries = self._normalize_queries(embeddings)
+
+        k = min(n_results, self.count())
+        similarities = queries @ self.vectors.T
+
+        if k < self.count():
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(self.count()), (len(queries), 1))
+        candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+    def exact_top_k(self, embeddings: np.ndarray, n_results: int = 5):
+        """Brute-force top-k regardless of any approximate structure built on top"""
+        return NumpyIndex.top_k(self, embeddings, n_results)
+
+    def query(self, embeddings: np.ndarray, n_results: int = 5) -> Dict[str, List[List[Any]]]:
+        """Top n_results neighbours for each query row, in Chroma's result layout"""
+        positions, similarities = self.top_k(embeddings, n_results)
+        distances = self.distances(similarities)
+
+        return {
+            'ids': [[self.ids[p] for p in row] for row in positions],
+            'documents': [[self.documents[p] for p in row] for row in positions],
+            'metadatas': [[self._metadata(p) for p in row] for row in positions],
+            'distances': distances.tolist()
+        }
+
+
+class IVFIndex(NumpyIndex):
+    """
+    Inverted-file (IVF-flat) approximate index in plain NumPy
+
+    Spherical k-means splits the corpus into nlist cells; rows are stored
+    cell by cell so each cell is one contiguous slice. A query scans only
+    the nprobe cells whose centroids are closest. Raising nprobe trades
+    latency for recall; nprobe == nlist is exact search.
+    """
+
+    name = 'ivf'
+    searches_mapped_vectors = False
+
+    def __init__(self, vectors: np.ndarray, documents: List[str], labels: np.ndarray,
+                 nlist: Optional[int] = None, nprobe: int = 8, train_size: int = 50000,
+                 iterations: int = 10, seed: int = 0, **kwargs):
+        super().__init__(vectors, documents, labels, **kwargs)
+        count = self.count()
+        # k-means seeds its centroids from the training sample, so there can be no more cells than sampled rows
+        trained_rows = min(train_size, count)
+        requested = nlist or int(4 * np.sqrt(count))
+        self.nlist = max(1, min(requested, trained_rows))
+        if nlist and self.nlist < nlist:
+            logger.warning(f"⚠️ nlist {nlist} exceeds the {trained_rows} training rows; using {self.nlist}")
+        self.nprobe = nprobe
+
+        rng = np.random.default_rng(seed)
+        self.centroids = self._train_centroids(rng, train_size, iterations)
+
+        # Assign every row to its closest centroid, then store cells contiguously
+        assignments = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            block = self.vectors[start:start + 65536]
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind='stable')
+        self._permute(order)
+        self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=self.nlist))))
+
+    def _train_centroids(self, rng, train_size: int, iterations: int) -> np.ndarray:
+        """Spherical k-means on a sample of the corpus"""
+        sample = self.vectors[rng.choice(self.count(), min(train_size, self.count()), replace=False)]
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty cells keep their previous centroid
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+
+        return centroids
+
+    def top_k(self, embeddings: np.ndarray, n_results: int = 5):
+        """(positions, similarities) of the best candidates in the nprobe nearest cells"""
+        queries = self._normalize_queries(embeddings)
+        k = min(n_results, self.count())
+        cell_order = np.argsort(-(queries @ self.centroids.T), axis=1)
+
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        similarities = np.empty((len(queries), k), dtype=np.float32)
+
+        for row, query in enumerate(queries):
+            slices = []
+            found = 0
+            # Probe nprobe cells, more if they hold fewer than k rows between them
+            for probed, cell in enumerate(cell_order[row]):
+                if probed >= self.nprobe and found >= k:
+                    break
+                start, end = self.list_offsets[cell], self.list_offsets[cell + 1]
+                if end > start:
+                    slices.append((start, end))
+                    found += end - start
+
+            candidates = np.concatenate([np.arange(start, end) for start, end in slices])
+            scores = np.concatenate([self.vectors[start:end] @ query for start, end in slices])
+
+            best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            best = best[np.argsort(-scores[best])]
+            positions[row] = candidates[best]
+            similarities[row] = scores[best]
+
+        return positions, similarities
+
+
+class HNSWIndex(NumpyIndex):
+    """
+    HNSW graph index via hnswlib (optional dependency)
+
+    ef is the query-time beam width: higher is slower and more accurate.
+    M and ef_construction shape the graph at build time.
+    """
+
+    name = 'hnsw'
+    searches_mapped_vectors = False
+
+    def __init__(self, vectors: np.ndarray, documents: List[str], labels: np.ndarray,
+                 ef: int = 64, M: int = 16, ef_construction: int = 200, num_threads: int = -1,
+                 **kwargs):
+        if not HNSWLIB_AVAILABLE:
+            raise ImportError("hnswlib is required for the HNSW index (pip install hnswlib)")
+
+        super().__init__(vectors, documents, labels, **kwargs)
+        self.graph = hnswlib.Index(space='ip', dim=self.dimension)
+        self.graph.init_index(max_elements=self.count(), M=M, ef_construction=ef_construction)
+        self.graph.add_items(self.vectors, np.arange(self.count()), num_threads=num_threads)
+        self.ef = ef
+
+    def top_k(self, embeddings: np.ndarray, n_results: int = 5):
+        """(positions, similarities) from a beam search of width ef"""
+        queries = self._normalize_queries(embeddings)
+        k = min(n_results, self.count())
+        self.graph.set_ef(max(self.ef, k))
+        positions, distances = self.graph.knn_query(queries, k=k)
+        # hnswlib's 'ip' distance is 1 - dot product
+        return positions.astype(np.int64), 1.0 - distances
+
+
+class QuantizedIndex(NumpyIndex):
+    """
+    Exact search over int8 (per-vector scale) or float16 vectors
+
+    Only the quantized matrix stays resident: 1 byte per dimension plus one
+    scale per row for int8 (~4x smaller than float32), 2 bytes for float16.
+    Scores are computed block by block so no full float32 copy is ever
+    materialized. With rescore_candidates > 0 the best candidates are
+    re-ranked against full-precision vectors, always read through a memory
+    map so only the touched rows are paged in: the corpus directory's
+    float32 file, or for an index built from vectors (e.g. the step3
+    pickle) a temporary file they are spilled to. Building from vectors
+    still holds the full matrix once while quantizing; open a corpus
+    directory to avoid that peak too.
+    """
+
+    name = 'quantized'
+    block_rows = 16384
+
+    def __init__(self, vectors: np.ndarray, documents: List[str], labels: np.ndarray,
+                 precision: str = 'int8', rescore_candidates: int = 0, **kwargs):
+        super().__init__(vectors, documents, labels, **kwargs)
+        self.precision = precision
+        self.rescore_candidates = rescore_candidates
+        self.codes, self.scales = quantize(self.vectors, precision)
+        self.full_vectors = _spill_to_memmap(self.vectors) if rescore_candidates else None
+        self.vectors = None
+
+    @classmethod
+    def from_corpus_dir(cls, directory: str, space: str = 'l2', precision: str = 'int8',
+                        rescore_candidates: int = 0, **index_options) -> "QuantizedIndex":
+        """Map precomputed codes (and full-precision rows for rescoring) from a corpus directory"""
+        if index_options:
+            raise TypeError(f"Unexpected index options: {sorted(index_options)}")
+        corpus = EmbeddingCorpus.open(directory)
+        columns = corpus.columns
+
+        index = cls.__new__(cls)
+        index.precision = precision
+        index.rescore_candidates = rescore_candidates
+        index.codes = corpus.vectors(precision)
+        index.scales = corpus.scales(precision)
+        index.full_vectors = None
+        if rescore_candidates:
+            if corpus.has_precision('float32'):
+                index.full_vectors = corpus.vectors('float32')
+            else:
+                logger.warning(f"⚠️ No full-precision vectors in {directory}; rescoring disabled")
+                index.rescore_candidates = 0
+        index.vectors = None
+        index._init_columns(corpus.count, columns['documents'], corpus.labels, columns['ids'],
+                            columns['sources'], columns['categories'], corpus.chunk_lengths, space)
+        return index
+
+    @property
+    def dimension(self) -> int:
+        return self.codes.shape[1]
+
+    def count(self) -> int:
+        return len(self.codes)
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Quantized codes and scales, plus full-precision rows when kept for rescoring"""
+        return _memory_bytes(self.codes, self.scales, self.full_vectors)
+
+    def _corpus_vectors(self) -> np.ndarray:
+        """Full-precision rows kept for rescoring; the codes alone cannot be written back losslessly"""
+        if self.full_vectors is None:
+            raise TypeError("QuantizedIndex without rescore_candidates keeps no full-precision vectors; "
+                            "write the corpus with NumpyIndex.load(path).save_corpus_dir(directory)")
+        return self.full_vectors
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """(queries, rows) similarities computed from the quantized matrix"""
+        scores = np.empty((len(queries), self.count()), dtype=np.float32)
+        for start in range(0, self.count(), self.block_rows):
+            block = self.codes[start:start + self.block_rows].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def top_k(self, embeddings: np.ndarray, n_results: int = 5):
+        """(positions, similarities), optionally rescored in full precision"""
+        queries = self._normalize_queries(embeddings)
+        k = min(n_results, self.count())
+        pool = min(max(k, self.rescore_candidates), self.count())
+
+        scores = self._approximate_scores(queries)
+        if pool < self.count():
+            candidates = np.argpartition(-scores, pool - 1, axis=1)[:, :pool]
+        else:
+            candidates = np.tile(np.arange(self.count()), (len(queries), 1))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+        if self.rescore_candidates and self.full_vectors is not None:
+            candidate_scores = np.stack([
+                np.asarray(self.full_vectors[np.sort(row)], dtype=np.float32) @ query
+                for row, query in zip(candidates, queries)
+            ])
+            candidates = np.sort(candidates, axis=1)
+
+        order = np.argsort(-candidate_scores, axis=1)[:, :k]
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+    def exact_top_k(self, embeddings: np.ndarray, n_results: int = 5):
+        if self.full_vectors is None:
+            raise RuntimeError("Exact search needs full-precision vectors")
+        queries = self._normalize_queries(embeddings)
+        scores = queries @ np.asarray(self.full_vectors, dtype=np.float32).T
+        order = np.argsort(-scores, axis=1)[:, :n_results]
+        return order, np.take_along_axis(scores, order, axis=1)
+
+
+# Backends selectable by name in SimpleRAGDetector
+INDEX_BACKENDS = {
+    'numpy': NumpyIndex,
+    'ivf': IVFIndex,
+    'hnsw': HNSWIndex,
+    'quantized': QuantizedIndex
+}
+
+
+def benchmark(count: int = 74664, dimension: int = 384, queries: int = 200, n_results: int = 5,
+              seed: int = 0) -> Dict[str, float]:
+    """
+    Compare per-query latency of collection.query against the NumPy index
+
+    Uses a synthetic corpus of the production size so it runs without the
+    step3 data; pass a smaller count for a quick run.
+    """
+    import chromadb
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    labels = rng.integers(0, 2, count)
+    documents = [f"document {i}" for i in range(count)]
+    probes = rng.standard_normal((queries, dimension)).astype(np.float32)
+
+    numpy_index = NumpyIndex(vectors, documents, labels)
+
+    logger.info(f"📦 Loading {count} vectors into an ephemeral Chroma collection...")
+    client = chromadb.Client()
+    collection = client.create_collection(f"vector_index_benchmark_{int(time.time())}")
+    for start in range(0, count, 5000):
+        end = min(start + 5000, count)
+        collection.add(
+            ids=numpy_index.ids[start:end],
+            embeddings=vectors[start:end].tolist(),
+            documents=documents[start:end],
+            metadatas=[numpy_index._metadata(i) for i in range(start, end)]
+        )
+    chroma_index = ChromaIndex(collection)
+
+    results = {}
+    for index in (chroma_index, numpy_index):
+        index.query(probes[:1], n_results)
+        started = time.perf_counter()
+        for probe in probes:
+            index.query(probe, n_results)
+        results[f'{index.name}_ms_per_query'] = (time.perf_counter() - started) / queries * 1000
+
+    # Same neighbours from both backends (HNSW is approximate, so report overlap)
+    chroma_ids = chroma_index.query(probes, n_results)['ids']
+    numpy_ids = numpy_index.query(probes, n_results)['ids']
+    overlap = np.mean([len(set(a) & set(b)) / n_results for a, b in zip(chroma_ids, numpy_ids)])
+    results['neighbour_overlap'] = float(overlap)
+
+    logger.info(f"📊 {count} x {dimension} corpus, {queries} single-message queries, k={n_results}")
+    logger.info(f"   Chroma: {results['chroma_ms_per_query']:.2f} ms/query")
+    logger.info(f"   NumPy:  {results['numpy_ms_per_query']:.2f} ms/query")
+    logger.info(f"   Neighbour overlap: {results['neighbour_overlap']:.1%}")
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    benchmark()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Persistent Alternatives Store
+Memoizes AI-generated alternatives per (word, context type, tone, intent) across restarts
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .lru_cache import LRUCache, SQLiteCacheBackend
+
+# Seeded entries are stored with this timestamp so the refresher picks them up first
+SEED_TIMESTAMP = 0.0
+
+
+class AlternativesStore(LRUCache):
+    """
+    In-memory LRU over a SQLite table of alternatives
+
+    Drop-in replacement for the ContextAnalyzer alternatives cache. Entries
+    can be prewarmed from the rule tables and knowledge base, and a background
+    refresher tops up seeded or old entries with fresh LLM output while hits
+    keep being served from the store.
+    """
+
+    def __init__(self, db_path: str = "data/database/alternatives_cache.db", max_size: int = 5000,
+                 refresh_after_seconds: float = 7 * 24 * 3600):
+        super().__init__(max_size=max_size, ttl_seconds=None,
+                         backend=SQLiteCacheBackend(db_path, table="alternatives"))
+        self.refresh_after_seconds = refresh_after_seconds
+        self.refreshed = 0
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_refresh = threading.Event()
+
+    def seed(self, entries: Dict[str, List[str]]) -> int:
+        """Store rule-based alternatives without overwriting existing (LLM) entries"""
+        self.backend.put_many(
+            ((key, alternatives, SEED_TIMESTAMP) for key, alternatives in entries.items()),
+            replace=False
+        )
+        return len(entries)
+
+    def stale_keys(self, limit: int = 20) -> List[str]:
+        """Seeded or old entries due for a refresh, oldest first"""
+        return self.backend.keys_older_than(time.time() - self.refresh_after_seconds, limit)
+
+    def refresh(self, generate: Callable[[List[str]], Dict[str, List[str]]], limit: int = 20) -> int:
+        """
+        Regenerate up to limit stale entries; generate maps keys to new alternatives
+
+        Every attempted key is re-stamped, even when generation returned
+        nothing for it, so the refresher walks the whole store instead of
+        retrying the same oldest batch. Returns the number of entries whose
+        alternatives changed.
+        """
+        keys = self.stale_keys(limit)
+        if not keys:
+            return 0
+
+        try:
+            generated = generate(keys)
+        except Exception as e:
+            print(f"⚠️ Alternatives refresh failed: {e}")
+            return 0
+
+        changed = 0
+        for key in keys:
+            stored = self.backend.get(key)
+            current = stored[0] if stored is not None else None
+            alternatives = generated.get(key)
+            if alternatives and alternatives != current:
+                self.put(key, alternatives)
+                changed += 1
+            elif current is not None:
+                # Re-stamp what we have so the next cycle moves on to other stale keys
+                self.put(key, current)
+        self.refreshed += changed
+        return changed
+
+    def start_background_refresh(self, generate: Callable[[List[str]], Dict[str, List[str]]],
+                                 interval_seconds: float = 300.0, batch_size: int = 20):
+        """Periodically top up stale entries on a daemon thread"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+
+        def run():
+            while not self._stop_refresh.wait(interval_seconds):
+                self.refresh(generate, batch_size)
+
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(target=run, name="alternatives-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        """Stop the refresher thread"""
+        self._stop_refresh.set()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters plus refresh progress"""
+        stats = super().stats()
+        stats['refreshed'] = self.refreshed
+        return stats
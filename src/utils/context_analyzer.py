@@ -4,14 +4,38 @@ Context-Aware Alternative Generator
 Provides intelligent, tone-appropriate alternatives based on context
 """
 
+import json
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import ollama
+from .llm_json import extract_json_object
+from .lru_cache import LRUCache
+from .term_matcher import TermMatcher
 
 class ContextAnalyzer:
     """Analyzes message context and provides intelligent alternatives"""
     
-    def __init__(self):
+    # Coarse buckets returned by analyze_context (tones come from tone_indicators)
+    CONTEXT_TYPES = ['professional', 'friendly', 'casual', 'emphatic', 'general']
+    INTENTS = ['insult', 'compliment', 'playful', 'neutral']
+    
+    # Cue words per bucket, checked in order; the first bucket with a hit wins
+    CONTEXT_TYPE_CUES = {
+        'professional': ['work', 'office', 'professional', 'colleague'],
+        'friendly': ['friend', 'buddy', 'pal', 'mate'],
+        'casual': ['hey', 'yo', 'hi', 'hello'],
+        'emphatic': ['such', 'so', 'very', 'really']
+    }
+    INTENT_CUES = {
+        'insult': ['hate', 'terrible', 'awful', 'stupid'],
+        'compliment': ['love', 'great', 'amazing', 'wonderful'],
+        'playful': ['haha', 'lol', 'omg', 'wow']
+    }
+    
+    def __init__(self, alternatives_cache: Optional[LRUCache] = None):
+        self._async_client = None
+        # AI alternatives memoized per (word, context type, tone, intent)
+        self.alternatives_cache = alternatives_cache if alternatives_cache is not None else LRUCache(max_size=5000)
         self.tone_indicators = {
             'negative': ['such', 'so', 'very', 'really', 'totally', 'completely', 'absolutely'],
             'positive': ['great', 'amazing', 'wonderful', 'fantastic', 'awesome'],
@@ -21,6 +45,11 @@ class ContextAnalyzer:
             'aggressive': ['stupid', 'idiot', 'moron', 'hate', 'terrible', 'awful']
         }
         
+        # One automaton pass per lookup instead of a substring test per cue word
+        self._tone_matcher = TermMatcher(self.tone_indicators)
+        self._context_type_matcher = TermMatcher(self.CONTEXT_TYPE_CUES)
+        self._intent_matcher = TermMatcher(self.INTENT_CUES)
+        
         self.context_patterns = {
             'insult': r'\b(such|so|very|really|totally|completely|absolutely)\s+\w+\b',
             'compliment': r'\b(great|amazing|wonderful|fantastic|awesome)\s+\w+\b',
@@ -62,11 +91,14 @@ class ContextAnalyzer:
     
     def _determine_tone(self, context: str) -> str:
         """Determine the overall tone of the context"""
-        tone_scores = {}
+        tone_scores = {tone: 0 for tone in self.tone_indicators}
         
-        for tone, indicators in self.tone_indicators.items():
-            score = sum(1 for indicator in indicators if indicator in context)
-            tone_scores[tone] = score
+        # Each distinct indicator counts once, as before
+        seen = set()
+        for match in self._tone_matcher.find_all(context):
+            if (match.category, match.term) not in seen:
+                seen.add((match.category, match.term))
+                tone_scores[match.category] += 1
         
         # Find the dominant tone
         if tone_scores:
@@ -76,29 +108,24 @@ class ContextAnalyzer:
         
         return 'neutral'
     
+    @staticmethod
+    def _first_matching_bucket(matcher: TermMatcher, buckets: Dict[str, List[str]], context: str) -> Optional[str]:
+        """First bucket (in table order) with any cue word in the context"""
+        hits = {match.category for match in matcher.find_all(context)}
+        for bucket in buckets:
+            if bucket in hits:
+                return bucket
+        return None
+    
     def _determine_context_type(self, context: str, word: str) -> str:
         """Determine the type of context"""
-        if any(pattern in context for pattern in ['work', 'office', 'professional', 'colleague']):
-            return 'professional'
-        elif any(pattern in context for pattern in ['friend', 'buddy', 'pal', 'mate']):
-            return 'friendly'
-        elif any(pattern in context for pattern in ['hey', 'yo', 'hi', 'hello']):
-            return 'casual'
-        elif any(pattern in context for pattern in ['such', 'so', 'very', 'really']):
-            return 'emphatic'
-        else:
-            return 'general'
+        context_type = self._first_matching_bucket(self._context_type_matcher, self.CONTEXT_TYPE_CUES, context)
+        return context_type or 'general'
     
     def _determine_intent(self, context: str, word: str) -> str:
         """Determine the intent behind using the word"""
-        if any(word in context for word in ['hate', 'terrible', 'awful', 'stupid']):
-            return 'insult'
-        elif any(word in context for word in ['love', 'great', 'amazing', 'wonderful']):
-            return 'compliment'
-        elif any(word in context for word in ['haha', 'lol', 'omg', 'wow']):
-            return 'playful'
-        else:
-            return 'neutral'
+        intent = self._first_matching_bucket(self._intent_matcher, self.INTENT_CUES, context)
+        return intent or 'neutral'
     
     def get_contextual_alternatives(self, word: str, context_analysis: Dict) -> List[str]:
         """Get contextually appropriate alternatives"""
@@ -231,10 +258,227 @@ class ContextAnalyzer:
         
         return tone_alternatives[:5]  # Return top 5 alternatives
     
+    def alternatives_cache_key(self, word: str, context_analysis: Dict) -> str:
+        """Memo key: alternatives depend on the word and the coarse context buckets"""
+        return "|".join([
+            word.lower(),
+            context_analysis.get('context', 'unknown'),
+            context_analysis.get('tone', 'neutral'),
+            context_analysis.get('intent', 'unclear')
+        ])
+    
     def generate_ai_enhanced_alternatives(self, message: str, detected_word: str, context_analysis: Dict) -> List[str]:
         """Use AI to generate even more contextually appropriate alternatives"""
+        cache_key = self.alternatives_cache_key(detected_word, context_analysis)
+        cached = self.alternatives_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        prompt = self._build_alternatives_prompt(message, detected_word, context_analysis)
+        
+        try:
+            response = ollama.chat(model='llama3', messages=[
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ])
+            
+            alternatives = self._parse_alternatives_response(response['message']['content'])
+            if alternatives is not None:
+                self.alternatives_cache.put(cache_key, alternatives)
+                return alternatives
+            
+        except Exception as e:
+            print(f"AI alternative generation failed: {e}")
+        
+        # Fallback to rule-based alternatives
+        return self.get_contextual_alternatives(detected_word, context_analysis)
+    
+    async def generate_ai_enhanced_alternatives_async(self, message: str, detected_word: str, context_analysis: Dict) -> List[str]:
+        """Async counterpart of generate_ai_enhanced_alternatives using the Ollama AsyncClient"""
+        cache_key = self.alternatives_cache_key(detected_word, context_analysis)
+        cached = self.alternatives_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        prompt = self._build_alternatives_prompt(message, detected_word, context_analysis)
+        
+        try:
+            if self._async_client is None:
+                self._async_client = ollama.AsyncClient()
+            response = await self._async_client.chat(model='llama3', messages=[
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ])
+            
+            alternatives = self._parse_alternatives_response(response['message']['content'])
+            if alternatives is not None:
+                self.alternatives_cache.put(cache_key, alternatives)
+                return alternatives
+            
+        except Exception as e:
+            print(f"AI alternative generation failed: {e}")
         
-        prompt = f"""
+        # Fallback to rule-based alternatives
+        return self.get_contextual_alternatives(detected_word, context_analysis)
+    
+    def generate_ai_enhanced_alternatives_batch(self, message: str, word_contexts: Dict[str, Dict]) -> Dict[str, List[str]]:
+        """
+        Alternatives for every detected word in a message with at most one LLM call
+        
+        Args:
+            message: The original message
+            word_contexts: Mapping of detected word -> analyze_context result
+        
+        Returns:
+            Mapping of detected word -> alternatives
+        """
+        alternatives, missing = self._lookup_cached_alternatives(word_contexts)
+        if not missing:
+            return alternatives
+        
+        generated = self._request_batch_alternatives(message, missing)
+        return self._merge_generated_alternatives(alternatives, missing, generated)
+    
+    def _request_batch_alternatives(self, message: str, word_contexts: Dict[str, Dict]) -> Dict[str, List[str]]:
+        """One LLM call for several words, bypassing the cache; {} on failure"""
+        try:
+            response = ollama.chat(model='llama3', messages=[
+                {
+                    'role': 'user',
+                    'content': self._build_batch_alternatives_prompt(message, word_contexts)
+                }
+            ], format='json')
+            return self._parse_batch_alternatives_response(response['message']['content'], word_contexts)
+        except Exception as e:
+            print(f"AI alternative generation failed: {e}")
+            return {}
+    
+    def build_seed_alternatives(self, word_alternatives: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Rule-based alternatives for every (word, context type, tone, intent) bucket
+        
+        Used to prewarm a persistent alternatives store so common words never
+        need the LLM; word_alternatives supplies defaults for words that the
+        contextual rule tables do not cover.
+        """
+        generic = self.get_contextual_alternatives('', {'context': 'general', 'tone': 'neutral'})
+        seeds = {}
+        for word, defaults in word_alternatives.items():
+            for context_type in self.CONTEXT_TYPES:
+                for tone in list(self.tone_indicators) + ['neutral']:
+                    for intent in self.INTENTS:
+                        context_analysis = {'context': context_type, 'tone': tone, 'intent': intent}
+                        alternatives = self.get_contextual_alternatives(word, context_analysis)
+                        if alternatives == generic and defaults:
+                            alternatives = defaults[:5]
+                        seeds[self.alternatives_cache_key(word, context_analysis)] = alternatives
+        return seeds
+    
+    def regenerate_alternatives(self, cache_keys: List[str]) -> Dict[str, List[str]]:
+        """Fresh LLM alternatives for memo keys, one request per context bucket (used by the refresher)"""
+        buckets: Dict[Tuple[str, str, str], List[str]] = {}
+        for key in cache_keys:
+            word, context_type, tone, intent = key.rsplit('|', 3)
+            buckets.setdefault((context_type, tone, intent), []).append(word)
+        
+        regenerated = {}
+        for (context_type, tone, intent), words in buckets.items():
+            context_analysis = {'context': context_type, 'tone': tone, 'intent': intent}
+            generated = self._request_batch_alternatives(", ".join(words), {word: context_analysis for word in words})
+            for word, alternatives in generated.items():
+                regenerated[self.alternatives_cache_key(word, context_analysis)] = alternatives
+        return regenerated
+    
+    async def generate_ai_enhanced_alternatives_batch_async(self, message: str, word_contexts: Dict[str, Dict]) -> Dict[str, List[str]]:
+        """Async counterpart of generate_ai_enhanced_alternatives_batch"""
+        alternatives, missing = self._lookup_cached_alternatives(word_contexts)
+        if not missing:
+            return alternatives
+        
+        try:
+            if self._async_client is None:
+                self._async_client = ollama.AsyncClient()
+            response = await self._async_client.chat(model='llama3', messages=[
+                {
+                    'role': 'user',
+                    'content': self._build_batch_alternatives_prompt(message, missing)
+                }
+            ], format='json')
+            generated = self._parse_batch_alternatives_response(response['message']['content'], missing)
+        except Exception as e:
+            print(f"AI alternative generation failed: {e}")
+            generated = {}
+        
+        return self._merge_generated_alternatives(alternatives, missing, generated)
+    
+    def _lookup_cached_alternatives(self, word_contexts: Dict[str, Dict]) -> Tuple[Dict[str, List[str]], Dict[str, Dict]]:
+        """Split detected words into memoized alternatives and words still needing the LLM"""
+        alternatives = {}
+        missing = {}
+        for word, context_analysis in word_contexts.items():
+            cached = self.alternatives_cache.get(self.alternatives_cache_key(word, context_analysis))
+            if cached is not None:
+                alternatives[word] = list(cached)
+            else:
+                missing[word] = context_analysis
+        return alternatives, missing
+    
+    def _merge_generated_alternatives(self, alternatives: Dict[str, List[str]], missing: Dict[str, Dict],
+                                      generated: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Memoize LLM results and fill any gaps with rule-based alternatives"""
+        for word, context_analysis in missing.items():
+            if generated.get(word):
+                alternatives[word] = generated[word]
+                self.alternatives_cache.put(self.alternatives_cache_key(word, context_analysis), generated[word])
+            else:
+                alternatives[word] = self.get_contextual_alternatives(word, context_analysis)
+        return alternatives
+    
+    def _build_batch_alternatives_prompt(self, message: str, word_contexts: Dict[str, Dict]) -> str:
+        """Build one Llama prompt asking for alternatives to several detected words"""
+        word_lines = "\n".join(
+            f'- "{word}": context={analysis.get("context")}, tone={analysis.get("tone")}, intent={analysis.get("intent")}'
+            for word, analysis in word_contexts.items()
+        )
+        
+        return f"""
+You are an expert at providing contextually appropriate word alternatives for content moderation.
+
+Original message: "{message}"
+
+Detected words and their context analysis:
+{word_lines}
+
+For EACH detected word, provide 3-5 alternative words or phrases that:
+
+1. **Match the tone and intent** of the original message
+2. **Are appropriate for the context** (professional/friendly/casual)
+3. **Convey similar meaning** but without being problematic
+4. **Are specific and meaningful**, not generic like "person" or "individual"
+
+Respond with only a JSON object mapping each detected word to its alternatives:
+{{"word1": ["alternative1", "alternative2", "alternative3"]}}
+"""
+    
+    def _parse_batch_alternatives_response(self, content: str, word_contexts: Dict[str, Dict]) -> Dict[str, List[str]]:
+        """Extract the word -> alternatives mapping from a Llama reply"""
+        parsed = extract_json_object(content) or {}
+        by_lower = {str(key).lower(): value for key, value in parsed.items()}
+        
+        generated = {}
+        for word in word_contexts:
+            values = by_lower.get(word.lower())
+            if isinstance(values, list):
+                generated[word] = [str(value) for value in values if value][:5]
+        return generated
+    
+    def _build_alternatives_prompt(self, message: str, detected_word: str, context_analysis: Dict) -> str:
+        """Build the Llama prompt asking for alternatives to one detected word"""
+        return f"""
 You are an expert at providing contextually appropriate word alternatives for content moderation.
 
 Original message: "{message}"
@@ -266,28 +510,15 @@ Based on the context, provide 3-5 alternative words or phrases that:
 Respond with only a JSON array of alternatives:
 ["alternative1", "alternative2", "alternative3"]
 """
-        
+    
+    def _parse_alternatives_response(self, content: str) -> Optional[List[str]]:
+        """Extract the JSON array of alternatives from a Llama reply"""
         try:
-            response = ollama.chat(model='llama3', messages=[
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ])
-            
-            content = response['message']['content']
-            
-            # Try to extract JSON from response
-            import json
-            import re
-            
             json_match = re.search(r'\[.*\]', content, re.DOTALL)
             if json_match:
                 alternatives = json.loads(json_match.group())
                 return alternatives[:5]
-            
         except Exception as e:
             print(f"AI alternative generation failed: {e}")
         
-        # Fallback to rule-based alternatives
-        return self.get_contextual_alternatives(detected_word, context_analysis) 
\ No newline at end of file
+        return None
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tolerant JSON extraction for LLM replies
+Handles prose around the object, code fences, trailing commas and truncated output
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional
+
+_decoder = json.JSONDecoder()
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+
+def _close_truncated(fragment: str) -> str:
+    """Close any strings, arrays and objects left open by a truncated reply"""
+    closers = []
+    in_string = False
+    escaped = False
+
+    for char in fragment:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+        elif char in '}]' and closers:
+            closers.pop()
+
+    repaired = fragment + ('"' if in_string else '')
+    repaired = repaired.rstrip().rstrip(',').rstrip(':')
+    return repaired + ''.join(reversed(closers))
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the first JSON object found in text, or None
+
+    Tries a strict decode from the first '{' first, then progressively more
+    forgiving repairs (trailing commas, unterminated strings/brackets).
+    """
+    if not text:
+        return None
+
+    start = text.find('{')
+    while start != -1:
+        fragment = text[start:]
+
+        try:
+            parsed, _ = _decoder.raw_decode(fragment)
+            if isinstance(parsed, dict):
+                return parsed
+        except json.JSONDecodeError:
+            pass
+
+        for candidate in (_TRAILING_COMMA.sub(r'\1', fragment), _close_truncated(fragment)):
+            try:
+                parsed, _ = _decoder.raw_decode(_TRAILING_COMMA.sub(r'\1', candidate))
+                if isinstance(parsed, dict):
+                    return parsed
+            except json.JSONDecodeError:
+                continue
+
+        start = text.find('{', start + 1)
+
+    return None
+
+
+class JSONObjectScanner:
+    """
+    Incremental brace-balanced scanner for streamed LLM output
+
+    Feed chunks as they arrive; once the first top-level object closes,
+    `complete` becomes True and `text` holds the object so the caller can
+    stop generation instead of waiting for trailing prose.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk; returns True once a complete top-level object has been seen"""
+        if self.complete:
+            return True
+
+        offset = 0
+        for index, char in enumerate(chunk):
+            if not self._started:
+                if char != '{':
+                    continue
+                self._started = True
+                offset = index
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[offset:index + 1])
+                    self.complete = True
+                    return True
+
+        if self._started:
+            self._parts.append(chunk[offset:])
+        return False
+
+    @property
+    def text(self) -> str:
+        """Everything captured from the opening brace onwards"""
+        return ''.join(self._parts)
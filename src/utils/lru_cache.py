@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Bounded LRU + TTL cache with an optional SQLite backend
+Used to skip repeated work (verdicts, embeddings, alternatives) for repeated inputs
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class SQLiteCacheBackend:
+    """On-disk key/value store so cached entries survive process restarts"""
+
+    def __init__(self, db_path: str, table: str = "cache", max_rows: int = 100000,
+                 serializer: Callable[[Any], Any] = json.dumps,
+                 deserializer: Callable[[Any], Any] = json.loads):
+        self.db_path = db_path
+        self.table = table
+        self.max_rows = max_rows
+        self.serializer = serializer
+        self.deserializer = deserializer
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+
+        self._conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_stored_at ON {table} (stored_at)')
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, stored_at) or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value, stored_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return self.deserializer(row[0]), row[1]
+
+    def put(self, key: str, value: Any, stored_at: float):
+        """Insert or replace an entry, pruning the oldest rows once over max_rows"""
+        with self._lock:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)',
+                (key, self.serializer(value), stored_at)
+            )
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 1000:
+                self._prune()
+            self._conn.commit()
+
+    def put_many(self, entries: Iterable[Tuple[str, Any, float]], replace: bool = True):
+        """Write many (key, value, stored_at) entries in one transaction"""
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        with self._lock:
+            self._conn.executemany(
+                f'{verb} INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)',
+                [(key, self.serializer(value), stored_at) for key, value, stored_at in entries]
+            )
+            self._conn.commit()
+
+    def keys_older_than(self, cutoff: float, limit: int = 100) -> List[str]:
+        """Keys whose entries were stored before cutoff, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT key FROM {self.table} WHERE stored_at < ? ORDER BY stored_at LIMIT ?',
+                (cutoff, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, key: str):
+        """Remove one entry"""
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table}')
+            self._conn.commit()
+
+    def _prune(self):
+        """Drop the oldest rows beyond max_rows (caller holds the lock)"""
+        self._puts_since_prune = 0
+        self._conn.execute(f'''
+            DELETE FROM {self.table} WHERE key IN (
+                SELECT key FROM {self.table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_rows,))
+
+    def close(self):
+        """Close the underlying connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional TTL and an optional persistent backend
+
+    Entries live in memory up to max_size; the least recently used entry is
+    evicted first. When a backend is given, every put is written through and
+    memory misses are looked up there before counting as a miss.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = None,
+                 backend: Optional[SQLiteCacheBackend] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if not self._is_expired(stored_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.backend is not None:
+            try:
+                stored = self.backend.get(key)
+            except Exception as e:
+                print(f"⚠️ Cache backend read failed: {e}")
+                stored = None
+            if stored is not None and not self._is_expired(stored[1], now):
+                with self._lock:
+                    self._store(key, stored[0], stored[1])
+                    self.hits += 1
+                return stored[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any, stored_at: Optional[float] = None):
+        """Store a value in memory and, if configured, in the backend"""
+        if stored_at is None:
+            stored_at = time.time()
+
+        with self._lock:
+            self._store(key, value, stored_at)
+
+        if self.backend is not None:
+            try:
+                self.backend.put(key, value, stored_at)
+            except Exception as e:
+                print(f"⚠️ Cache backend write failed: {e}")
+
+    def _store(self, key: str, value: Any, stored_at: float):
+        """Insert into memory and evict beyond max_size (caller holds the lock)"""
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str):
+        """Drop one entry from memory and backend"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        """Drop every entry and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size
+            }
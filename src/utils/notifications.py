@@ -8,7 +8,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class NotificationSystem:
-    def __init__(self):
+    def __init__(self, db=None):
+        # Shared ContentModerationDB for review lookups; without one each lookup opens and closes its own
+        self.db = db
         # You can set these environment variables for WhatsApp integration
         self.whatsapp_api_key = os.getenv('WHATSAPP_API_KEY')
         self.reviewer_phone = os.getenv('REVIEWER_PHONE')
@@ -114,20 +116,28 @@ Review this challenge in the admin panel.
             print(f"Error sending fallback notification: {e}")
             return False
     
+    def _find_pending_challenge(self, challenge_id: int) -> Optional[Dict]:
+        """Look a challenge up among the pending ones"""
+        db = self.db
+        if db is None:
+            from ..core.database import ContentModerationDB
+            db = ContentModerationDB()
+        
+        try:
+            for challenge in db.iter_pending_challenges():
+                if challenge['challenge_id'] == challenge_id:
+                    return challenge
+            return None
+        finally:
+            if db is not self.db:
+                # A temporary database owns a writer thread and connections
+                db.close()
+    
     def send_review_notification(self, challenge_id: int, status: str, reviewer_notes: str = None) -> bool:
         """Send notification to user about challenge review result"""
         try:
             # Get challenge details from database
-            from ..core.database import ContentModerationDB
-            db = ContentModerationDB()
-            
-            # Get challenge details
-            challenges = db.get_pending_challenges()
-            challenge = None
-            for c in challenges:
-                if c['challenge_id'] == challenge_id:
-                    challenge = c
-                    break
+            challenge = self._find_pending_challenge(challenge_id)
             
             if not challenge:
                 return False
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Word-Boundary-Aware Multi-Pattern Matcher
+Aho-Corasick automaton that finds every keyword hit in a single pass over the text
+"""
+
+import json
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+# Optional C implementation of the same automaton; the pure-Python one is used otherwise
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Suffixes allowed between a term and its right word boundary ("bitch" -> "bitches")
+PLURAL_SUFFIXES = ("s", "es", "'s", "’s")
+# Also allowed for derivational_categories, e.g. slurs: "bitchy", "bitching", "slutty"; this also admits "hoeing"
+DERIVATIONAL_SUFFIXES = ("y", "ty", "ing", "ed")
+
+
+class TermMatch(NamedTuple):
+    """One keyword hit: the pattern, its offsets in the text and its category"""
+    term: str
+    start: int
+    end: int
+    category: str
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton over a table of category -> terms
+
+    Matching is case-insensitive and word-boundary aware: a hit must start at
+    a word boundary and end at one, optionally after a plural suffix. So
+    "hoe" matches "hoes" but not "shoe", and "so" does not match "also".
+    Terms in derivational_categories also take DERIVATIONAL_SUFFIXES, so
+    "bitch" matches "bitchy" and "bitching" as the old substring loops did.
+    """
+
+    def __init__(self, patterns: Dict[str, Iterable[str]], allow_plurals: bool = True,
+                 use_native: bool = True, derivational_categories: Iterable[str] = ()):
+        self.allow_plurals = allow_plurals
+        self._plural_suffixes = PLURAL_SUFFIXES if allow_plurals else ()
+        self._suffixes_by_category = {category: self._plural_suffixes + DERIVATIONAL_SUFFIXES
+                                      for category in derivational_categories}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[tuple]] = [[]]
+        self.pattern_count = 0
+
+        for category, terms in patterns.items():
+            for term in terms:
+                self._add(term.lower(), category)
+        self._build_failure_links()
+
+        self._native = None
+        if use_native and AHOCORASICK_AVAILABLE and self.pattern_count:
+            self._native = self._build_native()
+
+    def _build_native(self):
+        """Mirror the trie's terminal nodes into a pyahocorasick automaton"""
+        by_term: Dict[str, List[tuple]] = {}
+        for outputs in self._output:
+            for term, category in outputs:
+                if (term, category) not in by_term.setdefault(term, []):
+                    by_term[term].append((term, category))
+
+        automaton = ahocorasick.Automaton()
+        for term, outputs in by_term.items():
+            automaton.add_word(term, outputs)
+        automaton.make_automaton()
+        return automaton
+
+    @classmethod
+    def from_knowledge_base(cls, knowledge_base: Dict, extra_patterns: Optional[Dict[str, Iterable[str]]] = None,
+                            allow_plurals: bool = True, use_native: bool = True,
+                            derivational_categories: Iterable[str] = ()) -> "TermMatcher":
+        """Build from the knowledge base categories plus any hardcoded pattern tables"""
+        patterns: Dict[str, List[str]] = {}
+        for category, category_data in knowledge_base.get("categories", {}).items():
+            patterns.setdefault(category, []).extend(category_data.get("words", []))
+        for category, terms in (extra_patterns or {}).items():
+            patterns.setdefault(category, []).extend(terms)
+        return cls(patterns, allow_plurals=allow_plurals, use_native=use_native,
+                   derivational_categories=derivational_categories)
+
+    @classmethod
+    def from_knowledge_base_file(cls, path: str, extra_patterns: Optional[Dict[str, Iterable[str]]] = None,
+                                 allow_plurals: bool = True, derivational_categories: Iterable[str] = ()) -> "TermMatcher":
+        """Build from misogyny_knowledge_base.json plus any hardcoded pattern tables"""
+        with open(path, 'r') as f:
+            return cls.from_knowledge_base(json.load(f), extra_patterns, allow_plurals,
+                                           derivational_categories=derivational_categories)
+
+    def _add(self, term: str, category: str):
+        """Insert one pattern into the trie"""
+        if not term:
+            return
+
+        node = 0
+        for char in term:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+
+        if (term, category) not in self._output[node]:
+            self._output[node].append((term, category))
+            self.pattern_count += 1
+
+    def _build_failure_links(self):
+        """Breadth-first pass computing failure links and merged outputs"""
+        # Depth-1 nodes fail back to the root; deeper nodes follow their parent's chain
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def _right_boundary(self, text: str, end: int, suffixes: tuple) -> bool:
+        """True if a word boundary (optionally after one of suffixes) follows end"""
+        if end == len(text) or not _is_word_char(text[end]):
+            return True
+        for suffix in suffixes:
+            if text.startswith(suffix, end):
+                after = end + len(suffix)
+                if after == len(text) or not _is_word_char(text[after]):
+                    return True
+        return False
+
+    def find_all(self, text: str) -> List[TermMatch]:
+        """Every hit in the text, in order of where it ends"""
+        lowered = text.lower()
+        if self._native is not None:
+            hits = ((index, output) for index, outputs in self._native.iter(lowered) for output in outputs)
+        else:
+            hits = self._iter_hits(lowered)
+
+        matches = []
+        for index, (term, category) in hits:
+            start = index - len(term) + 1
+            end = index + 1
+            if start > 0 and _is_word_char(lowered[start - 1]):
+                continue
+            if not self._right_boundary(lowered, end, self._suffixes_by_category.get(category, self._plural_suffixes)):
+                continue
+            matches.append(TermMatch(term, start, end, category))
+
+        return matches
+
+    def _iter_hits(self, lowered: str):
+        """Yield (end index, (term, category)) for every raw hit, ignoring boundaries"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+
+        for index, char in enumerate(lowered):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for hit in output[node]:
+                yield index, hit
+
+    def matched_terms(self, text: str) -> Set[str]:
+        """Distinct patterns found in the text"""
+        return {match.term for match in self.find_all(text)}
+
+    def contains_any(self, text: str) -> bool:
+        """True if any pattern occurs in the text"""
+        return bool(self.find_all(text))
+
+
+def benchmark(knowledge_base_path: str = "data/knowledge_base/misogyny_knowledge_base.json",
+              iterations: int = 2000) -> Dict[str, float]:
+    """
+    Compare the automaton against the per-keyword `in` loops it replaces,
+    and list the recall differences between the two on the knowledge base
+    """
+    from ..core.knowledge_injection_moderator import FALLBACK_PATTERNS, SLUR_CATEGORIES
+
+    with open(knowledge_base_path, 'r') as f:
+        knowledge_base = json.load(f)
+
+    patterns: Dict[str, List[str]] = {}
+    for category, category_data in knowledge_base.get("categories", {}).items():
+        patterns.setdefault(category, []).extend(category_data.get("words", []))
+    for category, terms in FALLBACK_PATTERNS.items():
+        patterns.setdefault(category, []).extend(terms)
+
+    messages = [
+        "Women are too emotional for leadership",
+        "That slut is annoying and she is so bossy, such a drama queen",
+        "I bought new shoes and a hoe for the garden",
+        "She's a great leader and a wonderful colleague at work",
+        "you bitchy girl, stop bitching, you're so slutty",
+        "The photographer shot our honeymoon photos in the misty hills",
+        "Girls can't handle pressure, man up and stop being hysterical " * 5
+    ]
+
+    def naive(text: str) -> list:
+        text_lower = text.lower()
+        return [(category, word) for category, words in patterns.items() for word in words if word.lower() in text_lower]
+
+    def time_per_message(find) -> float:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for message in messages:
+                find(message)
+        return (time.perf_counter() - started) / (iterations * len(messages)) * 1e6
+
+    # The matcher KnowledgeInjectionModerator builds
+    matcher = TermMatcher.from_knowledge_base(knowledge_base, FALLBACK_PATTERNS, use_native=False,
+                                              derivational_categories=SLUR_CATEGORIES)
+    candidates = {'per-keyword loops': naive, 'pure-Python automaton': matcher.find_all}
+    if AHOCORASICK_AVAILABLE:
+        candidates['pyahocorasick automaton'] = TermMatcher.from_knowledge_base(
+            knowledge_base, FALLBACK_PATTERNS, derivational_categories=SLUR_CATEGORIES).find_all
+
+    results = {name: time_per_message(find) for name, find in candidates.items()}
+
+    print(f"📊 {sum(len(terms) for terms in patterns.values())} patterns over {len(messages)} messages x {iterations}")
+    for name, micros in results.items():
+        print(f"   {name:<24} {micros:7.1f} µs/message ({results['per-keyword loops'] / micros:.2f}x)")
+
+    # Word boundaries drop substring hits inside other words; derived slurs are kept
+    print("📊 Terms per message: automaton vs per-keyword loops (substring hits)")
+    for message in messages:
+        found = matcher.matched_terms(message)
+        only_naive = {word for _, word in naive(message)} - found
+        print(f"   {message[:50]!r}: {', '.join(sorted(found)) or '-'}"
+              f"{' | loops only: ' + ', '.join(sorted(only_naive)) if only_naive else ''}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
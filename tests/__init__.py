@@ -0,0 +1 @@
+# Tests for Content Moderation System
@@ -0,0 +1,57 @@
+"""Schema migrations and the EXPLAIN QUERY PLAN regression check for the hot queries"""
+
+import sqlite3
+
+import pytest
+
+from src.core.database_benchmark import seed_database
+from src.core.migrations import (HOT_QUERIES, LATEST_VERSION, QueryPlanRegression, check_query_plans,
+                                 migrate, schema_version)
+from src.core.sqlite_pool import connect
+
+
+@pytest.fixture
+def seeded_db(tmp_path):
+    """A small history written at schema version 1, then migrated to the latest version"""
+    path = str(tmp_path / "seeded.db")
+    seed_database(path, messages=5000, users=50, chunk_size=1000, schema_version=1)
+    conn = connect(path)
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def test_migrate_fresh_database_to_latest(tmp_path):
+    conn = connect(str(tmp_path / "fresh.db"))
+    assert migrate(conn) == list(range(1, LATEST_VERSION + 1))
+    assert schema_version(conn) == LATEST_VERSION
+    # Already current: nothing to apply
+    assert migrate(conn) == []
+    conn.close()
+
+
+def test_migrate_backfills_message_stats(seeded_db):
+    totals = seeded_db.execute(
+        "SELECT SUM(total_messages), SUM(flagged_messages), SUM(clean_messages) FROM user_message_stats"
+    ).fetchone()
+    assert totals == (5000, 500, 4500)
+
+
+def test_hot_queries_use_their_indexes(seeded_db):
+    plans = check_query_plans(seeded_db)
+    assert set(plans) == set(HOT_QUERIES)
+
+
+def test_check_query_plans_reports_a_dropped_index(seeded_db):
+    seeded_db.execute("DROP INDEX idx_challenge_requests_status_created")
+    with pytest.raises(QueryPlanRegression, match="get_pending_challenges"):
+        check_query_plans(seeded_db)
+
+
+def test_check_query_plans_reports_a_full_scan():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a INTEGER, b INTEGER)")
+    queries = {'scan': ("SELECT a FROM t WHERE b = ?", (1,), 'idx_t_b')}
+    with pytest.raises(QueryPlanRegression, match="scans a whole table"):
+        check_query_plans(conn, queries)
+    conn.close()
@@ -0,0 +1,35 @@
+"""Cosine parity of the exported ONNX encoder against the PyTorch SentenceTransformer"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+from src.rag_system.onnx_encoder import EncoderParityError, OnnxEncoder, export_onnx, parity_check
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    """all-MiniLM-L6-v2 exported once for the module, fp32 and int8"""
+    directory = str(tmp_path_factory.mktemp("onnx_encoder"))
+    export_onnx(directory=directory, quantize_int8=True)
+    return directory
+
+
+def test_onnx_matches_torch(onnx_dir):
+    report = parity_check(directory=onnx_dir, min_cosine=0.99)
+    assert set(report) == {'onnx', 'onnx-int8'}
+    assert report['onnx']['min_cosine'] >= 0.999
+
+
+def test_parity_check_raises_below_threshold(onnx_dir):
+    with pytest.raises(EncoderParityError, match="below"):
+        parity_check(directory=onnx_dir, min_cosine=1.01)
+
+
+def test_encode_returns_one_unit_row_per_text(onnx_dir):
+    embeddings = OnnxEncoder(onnx_dir).encode(["short", "a somewhat longer sentence to pad the batch"])
+    assert embeddings.shape == (2, 384)
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
@@ -0,0 +1,37 @@
+"""IVF index construction when the cell count outgrows the training sample"""
+
+import numpy as np
+
+from src.rag_system.vector_index import IVFIndex, NumpyIndex
+
+
+def _corpus(count: int, dimension: int = 16, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors, [f"doc {i}" for i in range(count)], rng.integers(0, 2, count)
+
+
+def test_default_nlist_is_clamped_to_train_size():
+    # Default nlist is 4 * sqrt(10000) = 400, above the 100 training rows
+    vectors, documents, labels = _corpus(10000)
+    index = IVFIndex(vectors, documents, labels, train_size=100, iterations=2)
+    assert index.nlist == 100
+    assert index.list_offsets[-1] == index.count() == 10000
+
+
+def test_explicit_nlist_is_clamped_to_train_size():
+    vectors, documents, labels = _corpus(2000)
+    index = IVFIndex(vectors, documents, labels, nlist=500, train_size=50, iterations=2)
+    assert index.nlist == 50
+
+
+def test_clamped_index_with_every_cell_probed_is_exact():
+    vectors, documents, labels = _corpus(3000)
+    index = IVFIndex(vectors, documents, labels, train_size=64, iterations=2)
+    index.nprobe = index.nlist
+
+    queries = vectors[:10]
+    positions, _ = index.top_k(queries, 5)
+    expected, _ = NumpyIndex(vectors, documents, labels).top_k(queries, 5)
+    # IVF stores rows cell by cell; compare by document instead of position
+    assert [[index.documents[p] for p in row] for row in positions] == [[documents[p] for p in row] for row in expected]